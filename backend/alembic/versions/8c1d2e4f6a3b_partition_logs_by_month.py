@@ -0,0 +1,121 @@
+"""Partition logs by month
+
+Revision ID: 8c1d2e4f6a3b
+Revises: 5f667e18976f
+Create Date: 2025-09-20 10:12:04.381297
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1d2e4f6a3b'
+down_revision: Union[str, Sequence[str], None] = '5f667e18976f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month(offset: int) -> datetime:
+    now = datetime.now(timezone.utc)
+    index = now.month - 1 + offset
+    return datetime(now.year + index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _create_partitioned_logs() -> None:
+    op.execute(
+        """
+        CREATE TABLE logs (
+            id integer NOT NULL DEFAULT nextval('logs_id_seq'),
+            entity_type varchar(50) NOT NULL,
+            entity_id integer NOT NULL,
+            level varchar(20) NOT NULL,
+            message text NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute("CREATE INDEX ix_logs_created_at ON logs (created_at)")
+    op.execute("CREATE INDEX ix_logs_entity ON logs (entity_type, entity_id)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    has_logs = sa.inspect(bind).has_table("logs")
+
+    if bind.dialect.name != "postgresql":
+        # SQLite/dev keeps a plain table; retention falls back to batched deletes.
+        if has_logs:
+            op.create_index("ix_logs_created_at", "logs", ["created_at"])
+        return
+
+    first_partition = _month(0)
+    if has_logs:
+        # Keep the existing rows in place: the old table becomes the partition
+        # covering everything before the current month ends, so no data is copied.
+        first_partition = _month(1)
+        op.execute("ALTER TABLE logs RENAME TO logs_legacy")
+        op.execute("ALTER TABLE logs_legacy RENAME CONSTRAINT logs_pkey TO logs_legacy_pkey")
+        op.execute("ALTER INDEX IF EXISTS ix_logs_id RENAME TO ix_logs_legacy_id")
+        op.execute("UPDATE logs_legacy SET created_at = now() WHERE created_at IS NULL")
+        op.execute("ALTER TABLE logs_legacy ALTER COLUMN created_at SET NOT NULL")
+        op.execute(
+            f"ALTER TABLE logs_legacy ADD CONSTRAINT logs_legacy_range "
+            f"CHECK (created_at < '{first_partition.isoformat()}') NOT VALID"
+        )
+        op.execute("ALTER TABLE logs_legacy VALIDATE CONSTRAINT logs_legacy_range")
+    else:
+        op.execute("CREATE SEQUENCE logs_id_seq")
+
+    _create_partitioned_logs()
+
+    if has_logs:
+        op.execute(
+            f"ALTER TABLE logs ATTACH PARTITION logs_legacy "
+            f"FOR VALUES FROM (MINVALUE) TO ('{first_partition.isoformat()}')"
+        )
+        op.execute("ALTER TABLE logs_legacy DROP CONSTRAINT logs_legacy_range")
+
+    start = first_partition
+    for _ in range(MONTHS_AHEAD + 1):
+        end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=timezone.utc)
+        op.execute(
+            f"CREATE TABLE logs_p{start:%Y_%m} PARTITION OF logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+    op.execute("CREATE TABLE logs_default PARTITION OF logs DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.drop_index("ix_logs_created_at", table_name="logs")
+        return
+
+    op.execute("ALTER TABLE logs RENAME TO logs_partitioned")
+    op.execute(
+        """
+        CREATE TABLE logs (
+            id integer PRIMARY KEY DEFAULT nextval('logs_id_seq'),
+            entity_type varchar(50) NOT NULL,
+            entity_id integer NOT NULL,
+            level varchar(20) NOT NULL,
+            message text NOT NULL,
+            created_at timestamptz DEFAULT now()
+        )
+        """
+    )
+    op.execute("INSERT INTO logs SELECT id, entity_type, entity_id, level, message, created_at FROM logs_partitioned")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute("DROP TABLE logs_partitioned")
+    op.execute("CREATE INDEX ix_logs_id ON logs (id)")
@@ -0,0 +1,51 @@
+"""Add post target publish leases
+
+Revision ID: a3c7e9d15b28
+Revises: f5a1d7b3c862
+Create Date: 2025-10-08 11:05:43.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e9d15b28'
+down_revision: Union[str, Sequence[str], None] = 'f5a1d7b3c862'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("post_targets", sa.Column("lease_owner", sa.String(length=255), nullable=True))
+    op.add_column("post_targets", sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        "ix_post_targets_publishing_lease_expires_at",
+        "post_targets",
+        ["lease_expires_at"],
+        postgresql_where=sa.text("platform_status = 'publishing'"),
+        sqlite_where=sa.text("platform_status = 'publishing'"),
+    )
+    # Targets already stuck in publishing predate leases: expire them now so
+    # the reaper recovers them, with the idempotency check run first
+    post_targets = sa.table(
+        "post_targets",
+        sa.column("platform_status", sa.String),
+        sa.column("lease_owner", sa.String),
+        sa.column("lease_expires_at", sa.DateTime(timezone=True)),
+    )
+    op.execute(
+        post_targets.update()
+        .where(post_targets.c.platform_status == "publishing")
+        .values(lease_owner="unknown", lease_expires_at=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_targets_publishing_lease_expires_at", table_name="post_targets")
+    op.drop_column("post_targets", "lease_expires_at")
+    op.drop_column("post_targets", "lease_owner")
@@ -0,0 +1,50 @@
+"""Scope media objects per user
+
+Revision ID: a6d3e1f7b925
+Revises: f8b2d5e9c174
+Create Date: 2025-10-20 15:02:44.871306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3e1f7b925'
+down_revision: Union[str, Sequence[str], None] = 'f8b2d5e9c174'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The hash's unique constraint was created unnamed; SQLite's batch mode finds
+# it through this convention, PostgreSQL under its default name
+NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _hash_constraint() -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        return "media_objects_content_sha256_key"
+    return "uq_media_objects_content_sha256"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing objects keep a NULL owner, so no new upload deduplicates against them
+    with op.batch_alter_table("media_objects", naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.add_column(sa.Column("user_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("fk_media_objects_user_id_users", "users", ["user_id"], ["id"])
+        batch_op.drop_constraint(_hash_constraint(), type_="unique")
+        batch_op.create_unique_constraint(
+            "uq_media_objects_user_id_content_sha256", ["user_id", "content_sha256"]
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fails while two users hold the same bytes; those rows need merging first
+    with op.batch_alter_table("media_objects", naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint("uq_media_objects_user_id_content_sha256", type_="unique")
+        batch_op.create_unique_constraint(_hash_constraint(), ["content_sha256"])
+        batch_op.drop_constraint("fk_media_objects_user_id_users", type_="foreignkey")
+        batch_op.drop_column("user_id")
@@ -0,0 +1,32 @@
+"""Index social account token expiry
+
+Revision ID: b7e3f91c2d40
+Revises: 8c1d2e4f6a3b
+Create Date: 2025-09-22 14:41:37.902155
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f91c2d40'
+down_revision: Union[str, Sequence[str], None] = '8c1d2e4f6a3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_social_accounts_provider_token_expires_at",
+        "social_accounts",
+        ["provider", "token_expires_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_social_accounts_provider_token_expires_at", table_name="social_accounts")
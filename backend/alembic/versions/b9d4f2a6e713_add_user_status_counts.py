@@ -0,0 +1,51 @@
+"""Add user status counts
+
+Revision ID: b9d4f2a6e713
+Revises: a3c7e9d15b28
+Create Date: 2025-10-10 09:17:52.481066
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4f2a6e713'
+down_revision: Union[str, Sequence[str], None] = 'a3c7e9d15b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_status_counts",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "kind", "status"),
+    )
+    op.create_index("ix_posts_user_id_status", "posts", ["user_id", "status"])
+    # Seed the counters; reconcile_status_counts corrects any drift later
+    op.execute(
+        "INSERT INTO user_status_counts (user_id, kind, status, count) "
+        "SELECT user_id, 'post', status, COUNT(*) FROM posts "
+        "WHERE status IS NOT NULL GROUP BY user_id, status"
+    )
+    op.execute(
+        "INSERT INTO user_status_counts (user_id, kind, status, count) "
+        "SELECT posts.user_id, 'target', post_targets.platform_status, COUNT(*) "
+        "FROM post_targets JOIN posts ON posts.id = post_targets.post_id "
+        "WHERE post_targets.platform_status IS NOT NULL "
+        "GROUP BY posts.user_id, post_targets.platform_status"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_posts_user_id_status", table_name="posts")
+    op.drop_table("user_status_counts")
@@ -0,0 +1,76 @@
+"""Add post target engagement metrics
+
+Revision ID: c2e8a4b7f391
+Revises: b9d4f2a6e713
+Create Date: 2025-10-13 15:32:09.270518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8a4b7f391'
+down_revision: Union[str, Sequence[str], None] = 'b9d4f2a6e713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("post_targets", sa.Column("published_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("post_targets", sa.Column("metrics_due_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        "ix_post_targets_published_metrics_due_at",
+        "post_targets",
+        ["metrics_due_at"],
+        postgresql_where=sa.text("platform_status = 'published'"),
+        sqlite_where=sa.text("platform_status = 'published'"),
+    )
+    op.create_table(
+        "post_target_metrics",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("collected_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("likes", sa.Integer(), nullable=True),
+        sa.Column("comments", sa.Integer(), nullable=True),
+        sa.Column("shares", sa.Integer(), nullable=True),
+        sa.Column("views", sa.Integer(), nullable=True),
+        sa.Column("reach", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["target_id"], ["post_targets.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_post_target_metrics_target_id_collected_at",
+        "post_target_metrics",
+        ["target_id", "collected_at"],
+    )
+    # Already-published targets get one refresh now; the schedule then
+    # continues or stops by their age
+    post_targets = sa.table(
+        "post_targets",
+        sa.column("platform_status", sa.String),
+        sa.column("created_at", sa.DateTime(timezone=True)),
+        sa.column("updated_at", sa.DateTime(timezone=True)),
+        sa.column("published_at", sa.DateTime(timezone=True)),
+        sa.column("metrics_due_at", sa.DateTime(timezone=True)),
+    )
+    op.execute(
+        post_targets.update()
+        .where(post_targets.c.platform_status == "published")
+        .values(
+            published_at=sa.func.coalesce(post_targets.c.updated_at, post_targets.c.created_at),
+            metrics_due_at=sa.func.now()
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_target_metrics_target_id_collected_at", table_name="post_target_metrics")
+    op.drop_table("post_target_metrics")
+    op.drop_index("ix_post_targets_published_metrics_due_at", table_name="post_targets")
+    op.drop_column("post_targets", "metrics_due_at")
+    op.drop_column("post_targets", "published_at")
@@ -0,0 +1,30 @@
+"""Add post media content hash
+
+Revision ID: c4a9d0e7b512
+Revises: b7e3f91c2d40
+Create Date: 2025-09-29 09:18:55.204716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9d0e7b512'
+down_revision: Union[str, Sequence[str], None] = 'b7e3f91c2d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("post_media", sa.Column("content_sha256", sa.String(length=64), nullable=True))
+    op.create_index("ix_post_media_content_sha256", "post_media", ["content_sha256"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_media_content_sha256", table_name="post_media")
+    op.drop_column("post_media", "content_sha256")
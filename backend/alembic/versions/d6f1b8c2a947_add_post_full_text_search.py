@@ -0,0 +1,73 @@
+"""Add post full-text search
+
+Revision ID: d6f1b8c2a947
+Revises: c2e8a4b7f391
+Create Date: 2025-10-16 10:47:31.604183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f1b8c2a947'
+down_revision: Union[str, Sequence[str], None] = 'c2e8a4b7f391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_post_targets_social_account_id_post_id",
+        "post_targets",
+        ["social_account_id", "post_id"],
+    )
+    if op.get_bind().dialect.name == "sqlite":
+        # External-content FTS5 table over posts.text, kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            "text, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN "
+            "INSERT INTO posts_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_update AFTER UPDATE OF text ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+            "INSERT INTO posts_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+        return
+    # The text search config must match TEXT_SEARCH_CONFIG in services/post_search.py.
+    # Adding a stored generated column rewrites posts once; run it off-peak.
+    op.execute(
+        "ALTER TABLE posts ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(text, ''))) STORED"
+    )
+    # btree_gin lets the scalar filters share the GIN index with the tsvector
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.execute(
+        "CREATE INDEX ix_posts_search ON posts "
+        "USING gin (user_id, status, created_at, search_vector)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_insert")
+        op.execute("DROP TABLE IF EXISTS posts_fts")
+    else:
+        op.execute("DROP INDEX IF EXISTS ix_posts_search")
+        op.execute("ALTER TABLE posts DROP COLUMN IF EXISTS search_vector")
+    op.drop_index("ix_post_targets_social_account_id_post_id", table_name="post_targets")
@@ -0,0 +1,45 @@
+"""Add media objects
+
+Revision ID: d81f5a3c9e27
+Revises: c4a9d0e7b512
+Create Date: 2025-10-01 14:06:12.480193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f5a3c9e27'
+down_revision: Union[str, Sequence[str], None] = 'c4a9d0e7b512'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "media_objects",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("content_sha256", sa.String(length=64), nullable=False),
+        sa.Column("s3_key", sa.String(length=500), nullable=False),
+        sa.Column("content_type", sa.String(length=255), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("content_sha256"),
+        sa.UniqueConstraint("s3_key"),
+    )
+    op.create_index("ix_media_objects_id", "media_objects", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_media_objects_id", table_name="media_objects")
+    op.drop_table("media_objects")
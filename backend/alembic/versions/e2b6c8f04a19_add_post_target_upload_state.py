@@ -0,0 +1,28 @@
+"""Add post target upload state
+
+Revision ID: e2b6c8f04a19
+Revises: d81f5a3c9e27
+Create Date: 2025-10-03 10:41:27.913584
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c8f04a19'
+down_revision: Union[str, Sequence[str], None] = 'd81f5a3c9e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("post_targets", sa.Column("upload_state", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("post_targets", "upload_state")
@@ -0,0 +1,30 @@
+"""Add user list versions
+
+Revision ID: f5a1d7b3c862
+Revises: e2b6c8f04a19
+Create Date: 2025-10-06 16:22:08.117420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a1d7b3c862'
+down_revision: Union[str, Sequence[str], None] = 'e2b6c8f04a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("posts_version", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("users", sa.Column("social_accounts_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "social_accounts_version")
+    op.drop_column("users", "posts_version")
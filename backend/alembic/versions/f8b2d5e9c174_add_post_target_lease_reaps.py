@@ -0,0 +1,31 @@
+"""Add post target lease reaps
+
+Revision ID: f8b2d5e9c174
+Revises: d6f1b8c2a947
+Create Date: 2025-10-19 09:12:05.318426
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8b2d5e9c174'
+down_revision: Union[str, Sequence[str], None] = 'd6f1b8c2a947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "post_targets",
+        sa.Column("lease_reaps", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("post_targets", "lease_reaps")
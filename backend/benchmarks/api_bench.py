@@ -0,0 +1,201 @@
+"""
+API load benchmark.
+
+Starts `main:app` under uvicorn against a seeded database and drives the main
+endpoints at a fixed concurrency, then prints p50/p95/p99 latency and
+throughput per scenario as JSON.
+
+    cd backend
+    python -m benchmarks.api_bench --concurrency 32 --requests 2000 --output bench.json
+
+Use --database-url postgresql://... to run against a local PostgreSQL
+instead of the default SQLite file. The database is dropped and re-seeded.
+
+Redis (REDIS_URL) must be running: the API publishes status events to it on
+every publish, and an unreachable one would add its timeouts to the measured
+latencies. upload_media needs a reachable S3_BUCKET_NAME (point
+S3_ENDPOINT_URL at a local MinIO) and is skipped when there is none.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    BENCH_PASSWORD,
+    DEFAULT_DATABASE_URL,
+    check_redis,
+    check_s3,
+    configure_environment,
+    seed,
+    summarize,
+    wait_for_server,
+    write_report,
+)
+
+SCENARIOS = ["login", "list_posts", "list_posts_conditional", "create_post", "publish_post", "upload_media"]
+
+async def run_scenario(
+    concurrency: int,
+    total: int,
+    request: Callable[[int], Awaitable[int]]
+) -> Dict[str, object]:
+    """Issue `total` requests with `concurrency` in flight and summarize latencies."""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            index = next(counter)
+            if index >= total:
+                return
+            start = time.perf_counter()
+            try:
+                status_code = await request(index)
+            except Exception:
+                errors += 1
+                continue
+            if status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def run(args, emails: List[str]) -> Dict[str, object]:
+    import httpx
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        tokens = []
+        for email in emails:
+            response = await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            tokens.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+        post_ids = []
+        for headers in tokens:
+            response = await client.get("/posts/", headers=headers, params={"limit": 100})
+            response.raise_for_status()
+            post_ids.append([post["id"] for post in response.json()])
+
+        def auth(index: int) -> Dict[str, str]:
+            return tokens[index % len(tokens)]
+
+        async def login(index: int) -> int:
+            email = emails[index % len(emails)]
+            response = await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+            return response.status_code
+
+        async def list_posts(index: int) -> int:
+            response = await client.get("/posts/", headers=auth(index), params={"limit": 100})
+            return response.status_code
+
+        etags = {}
+
+        async def list_posts_conditional(index: int) -> int:
+            key = index % len(tokens)
+            headers = {**auth(index), "If-None-Match": etags.get(key, "")}
+            response = await client.get("/posts/", headers=headers, params={"limit": 100})
+            etags[key] = response.headers.get("etag", "")
+            return response.status_code
+
+        async def create_post(index: int) -> int:
+            response = await client.post("/posts/", headers=auth(index), json={
+                "text": f"Benchmark create {index}",
+                "media": [{"s3_key": f"media/bench-{index}.jpg", "type": "image", "width": 1080, "height": 1080}]
+            })
+            return response.status_code
+
+        async def publish_post(index: int) -> int:
+            user_posts = post_ids[index % len(post_ids)]
+            post_id = user_posts[(index // len(post_ids)) % len(user_posts)]
+            response = await client.post(f"/posts/{post_id}/publish", headers=auth(index))
+            return response.status_code
+
+        payload = os.urandom(args.upload_size)
+
+        async def upload_media(index: int) -> int:
+            response = await client.post(
+                "/posts/upload-media",
+                headers=auth(index),
+                files={"file": (f"bench-{index}.jpg", payload, "image/jpeg")}
+            )
+            return response.status_code
+
+        requests_by_name = {
+            "login": login,
+            "list_posts": list_posts,
+            "list_posts_conditional": list_posts_conditional,
+            "create_post": create_post,
+            "publish_post": publish_post,
+            "upload_media": upload_media,
+        }
+        results = {}
+        for name in args.scenarios:
+            # bcrypt makes login orders of magnitude slower; keep its run short
+            total = min(args.requests, args.login_requests) if name == "login" else args.requests
+            results[name] = await run_scenario(args.concurrency, total, requests_by_name[name])
+        return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--accounts-per-user", type=int, default=3)
+    parser.add_argument("--posts-per-user", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--upload-size", type=int, default=256 * 1024, help="bytes per uploaded file")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = configure_environment(args.database_url)
+    problem = check_redis()
+    if problem:
+        parser.error(f"{problem}; start Redis or set REDIS_URL")
+    skipped = []
+    if "upload_media" in args.scenarios:
+        problem = check_s3()
+        if problem:
+            print(f"Skipping upload_media: {problem}", file=sys.stderr)
+            args.scenarios = [name for name in args.scenarios if name != "upload_media"]
+            skipped.append("upload_media")
+    emails = seed(args.users, args.accounts_per_user, args.posts_per_user)
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+    try:
+        wait_for_server(f"http://127.0.0.1:{args.port}")
+        results = asyncio.run(run(args, emails))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    config["skipped_scenarios"] = skipped
+    write_report("api", config, results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+BENCH_PASSWORD = "benchmark-password"
+
+def configure_environment(database_url: str) -> Dict[str, str]:
+    """Set the environment the app reads at import time and return it.
+
+    Must run before importing any backend module. Celery uses an in-memory
+    broker so the API can enqueue publish tasks without Redis. Status events
+    and the response cache still talk to REDIS_URL; see `check_redis`.
+    """
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    defaults = {
+        "DATABASE_URL": database_url,
+        "SECRET_KEY": "benchmark-secret",
+        "ENCRYPTION_KEYS": "YmVuY2htYXJrLWtleS1iZW5jaG1hcmsta2V5LTAwMDA=",
+        "S3_BUCKET_NAME": "benchmark-bucket",
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+        "WORKER_METRICS_PORT": "0",
+    }
+    os.environ["DATABASE_URL"] = database_url
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    return {key: os.environ[key] for key in defaults}
+
+def seed(users: int, accounts_per_user: int, posts_per_user: int) -> List[str]:
+    """Create tables and seed users, social accounts and posts. Returns user emails."""
+    from database import Base, engine, SessionLocal
+    from models import User, SocialAccount, Post, PostMedia, PostTarget
+    from auth import get_password_hash
+    from oauth import encrypt_token
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    providers = ["facebook", "instagram", "tiktok"]
+    emails = []
+    db = SessionLocal()
+    try:
+        for user_index in range(users):
+            email = f"bench{user_index}@example.com"
+            user = User(name=f"Bench {user_index}", email=email, password_hash=password_hash)
+            db.add(user)
+            db.flush()
+            emails.append(email)
+
+            accounts = []
+            for account_index in range(accounts_per_user):
+                account = SocialAccount(
+                    user_id=user.id,
+                    provider=providers[account_index % len(providers)],
+                    provider_account_id=f"{user.id}-{account_index}",
+                    access_token_encrypted=encrypt_token(f"token-{user.id}-{account_index}")
+                )
+                db.add(account)
+                accounts.append(account)
+            db.flush()
+
+            for post_index in range(posts_per_user):
+                post = Post(user_id=user.id, text=f"Benchmark post {post_index} for user {user.id}", status="draft")
+                db.add(post)
+                db.flush()
+                db.add(PostMedia(post_id=post.id, s3_key=f"media/{post.id}.jpg", type="image", width=1080, height=1080))
+                for account in accounts:
+                    db.add(PostTarget(post_id=post.id, social_account_id=account.id, platform_status="pending"))
+            db.commit()
+    finally:
+        db.close()
+    return emails
+
+def check_redis(timeout: float = 1.0) -> Optional[str]:
+    """Return why REDIS_URL is unusable, or None if it answers a PING."""
+    import redis
+    url = os.environ.get("REDIS_URL", "redis://localhost:6379")
+    try:
+        redis.Redis.from_url(url, socket_connect_timeout=timeout, socket_timeout=timeout).ping()
+    except redis.RedisError as e:
+        return f"Redis at {url} is unreachable ({e})"
+    return None
+
+def check_s3(timeout: float = 2.0) -> Optional[str]:
+    """Return why the configured S3 bucket is unusable, or None if it can be reached."""
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import BotoCoreError, ClientError
+    bucket = os.environ.get("S3_BUCKET_NAME")
+    try:
+        boto3.client(
+            "s3",
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL"),
+            region_name=os.environ.get("AWS_REGION", "us-east-1"),
+            config=Config(connect_timeout=timeout, read_timeout=timeout, retries={"max_attempts": 1})
+        ).head_bucket(Bucket=bucket)
+    except (BotoCoreError, ClientError) as e:
+        return f"S3 bucket {bucket} is unreachable ({e})"
+    return None
+
+def summarize(latencies: List[float], errors: int, wall_time: float) -> Dict[str, Any]:
+    """Latency percentiles (milliseconds) and throughput for one scenario."""
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> Optional[float]:
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "requests": len(ordered) + errors,
+        "errors": errors,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+        "throughput_rps": round(len(ordered) / wall_time, 2) if wall_time > 0 else None,
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_report(name: str, config: Dict[str, Any], results: Dict[str, Any], output: Optional[str]) -> None:
+    """Print the JSON report and optionally write it to `output` for comparing commits."""
+    report = {
+        "benchmark": name,
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+
+def wait_for_server(base_url: str, timeout: float = 30.0) -> None:
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout}s")
@@ -0,0 +1,140 @@
+"""
+Tenant fairness simulation.
+
+Replays one platform queue in virtual time: a heavy tenant drops a large
+campaign at t=0 while small tenants keep publishing single posts, and
+`--slots` workers process tasks with lognormal service times. The same
+arrival trace runs through plain FIFO (one Celery queue, as without fair
+scheduling) and through services.fair_scheduler.FairScheduler, and the
+report compares how long small tenants' posts wait to start.
+
+    cd backend
+    python -m benchmarks.fairness_sim --heavy-targets 5000 --small-tenants 20
+
+The fair run uses the real scheduler against Redis (REDIS_URL), under a
+throwaway key prefix that is removed afterwards. Latencies are virtual
+seconds reported in the usual *_ms fields.
+"""
+import argparse
+import heapq
+import itertools
+import random
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import DEFAULT_DATABASE_URL, configure_environment, summarize, write_report
+
+HEAVY_TENANT = 1
+
+def arrival_trace(args) -> List[Tuple[float, int, int, str]]:
+    """(time, tenant, target_id, lane) for every submitted target."""
+    rng = random.Random(args.seed)
+    ids = itertools.count(1)
+    trace = [(0.0, HEAVY_TENANT, next(ids), args.heavy_lane) for _ in range(args.heavy_targets)]
+    for tenant in range(2, args.small_tenants + 2):
+        now = rng.uniform(0, args.small_interval)
+        while now < args.duration:
+            trace.append((now, tenant, next(ids), "immediate"))
+            now += rng.expovariate(1 / args.small_interval)
+    return sorted(trace)
+
+def simulate(args, trace, scheduler=None) -> Dict[str, Any]:
+    """Run the trace through FIFO (scheduler=None) or the fair scheduler."""
+    rng = random.Random(args.seed + 1)
+    clock = [0.0]
+    broker: deque = deque()
+    submitted_at: Dict[int, Tuple[float, int]] = {}
+    waits: Dict[str, List[float]] = {"heavy": [], "small": []}
+    free_slots = args.slots
+    events: List[Tuple[float, int, str, Tuple]] = []
+    sequence = itertools.count()
+    finished_at = 0.0
+
+    if scheduler is not None:
+        scheduler.send = lambda provider, item: broker.append(int(item))
+        scheduler.queue_depth = lambda provider: len(broker)
+        scheduler.clock = lambda: clock[0]
+
+    for at, tenant, target_id, lane in trace:
+        heapq.heappush(events, (at, next(sequence), "submit", (tenant, target_id, lane)))
+
+    def start_work():
+        nonlocal free_slots
+        while free_slots and broker:
+            target_id = broker.popleft()
+            at, tenant = submitted_at[target_id]
+            waits["heavy" if tenant == HEAVY_TENANT else "small"].append(clock[0] - at)
+            free_slots -= 1
+            service = rng.lognormvariate(0, args.service_sigma) * args.service_seconds
+            heapq.heappush(events, (clock[0] + service, next(sequence), "complete", (tenant, target_id)))
+
+    while events:
+        clock[0], _, kind, payload = heapq.heappop(events)
+        if kind == "submit":
+            tenant, target_id, lane = payload
+            submitted_at[target_id] = (clock[0], tenant)
+            if scheduler is None:
+                broker.append(target_id)
+            else:
+                scheduler.submit("sim", tenant, str(target_id), lane)
+                scheduler.dispatch("sim")
+        else:
+            tenant, target_id = payload
+            free_slots += 1
+            finished_at = clock[0]
+            if scheduler is not None:
+                scheduler.release("sim", tenant, str(target_id))
+                scheduler.dispatch("sim")
+        start_work()
+
+    return {
+        "small_tenant_wait": summarize(waits["small"], 0, finished_at),
+        "heavy_tenant_wait": summarize(waits["heavy"], 0, finished_at),
+        "makespan_seconds": round(finished_at, 1),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy-targets", type=int, default=5000)
+    parser.add_argument("--heavy-lane", choices=["immediate", "backfill"], default="immediate")
+    parser.add_argument("--small-tenants", type=int, default=20)
+    parser.add_argument("--small-interval", type=float, default=120.0, help="mean seconds between a small tenant's posts")
+    parser.add_argument("--duration", type=float, default=1800.0, help="seconds of small-tenant arrivals")
+    parser.add_argument("--slots", type=int, default=8, help="worker slots consuming the platform queue")
+    parser.add_argument("--service-seconds", type=float, default=2.0, help="median publish task duration")
+    parser.add_argument("--service-sigma", type=float, default=0.5)
+    parser.add_argument("--tenant-cap", type=int, default=4, help="max in-flight tasks per tenant")
+    parser.add_argument("--queue-depth", type=int, default=8, help="tasks kept ready on the platform queue")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    configure_environment(DEFAULT_DATABASE_URL)
+    from services.fair_scheduler import FairScheduler
+
+    trace = arrival_trace(args)
+    scheduler = FairScheduler(
+        send=None,
+        target_depth=args.queue_depth,
+        max_in_flight=args.tenant_cap,
+        max_in_flight_overrides={},
+        in_flight_ttl=10 ** 9,
+        key_prefix=f"fair-sim:{uuid.uuid4().hex}"
+    )
+    try:
+        results = {
+            "fifo": simulate(args, trace),
+            "fair": simulate(args, trace, scheduler),
+        }
+    finally:
+        keys = list(scheduler.client.scan_iter(f"{scheduler.key_prefix}:*"))
+        if keys:
+            scheduler.client.delete(*keys)
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    config["targets"] = len(trace)
+    write_report("fairness", config, results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Local stand-in for the Meta Graph and TikTok APIs.
+
+Implements the endpoints the backend calls, with configurable latency,
+injected 429/5xx errors and rate-limit headers, so OAuth and publish paths
+can be load-tested without touching the real platforms.
+
+    cd backend
+    python -m benchmarks.fake_platform_server --port 9100 --latency lognormal --latency-ms 80 --error-rate-5xx 0.01
+
+then point the backend at it:
+
+    FACEBOOK_GRAPH_URL=http://127.0.0.1:9100/graph
+    TIKTOK_OPEN_API_URL=http://127.0.0.1:9100/tiktok-open
+    TIKTOK_API_URL=http://127.0.0.1:9100/tiktok
+
+GET /_stats returns per-endpoint call and error counts.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Dict
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# Path segments containing digits are object ids; collapse them for stats keys
+_ID_SEGMENT_RE = re.compile(r"/[^/]*\d[^/]*")
+
+# Byte range the fake Graph API asks for per chunked video transfer
+FACEBOOK_TRANSFER_CHUNK = 4 * 1024 * 1024
+
+@dataclass
+class FakePlatformSettings:
+    latency: str = "fixed"  # fixed, uniform, exponential or lognormal
+    latency_ms: float = 50.0  # fixed value, uniform/exponential mean, lognormal median
+    latency_sigma: float = 0.5  # lognormal shape
+    error_rate_429: float = 0.0
+    error_rate_5xx: float = 0.0
+    rate_limit: int = 0  # calls per window per app; 0 disables
+    rate_window: float = 60.0
+    seed: int = 0
+
+class FakePlatformState:
+    """Shared counters, id generator and the sliding rate-limit window."""
+
+    def __init__(self, settings: FakePlatformSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed or None)
+        self.ids = itertools.count(10**15)
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.window: deque = deque()
+        self.uploads: Dict[str, int] = {}  # upload session/publish id -> video size
+
+    def next_id(self) -> str:
+        return str(next(self.ids))
+
+    def delay(self) -> float:
+        settings = self.settings
+        mean = settings.latency_ms / 1000
+        if settings.latency == "uniform":
+            return self.random.uniform(0, 2 * mean)
+        if settings.latency == "exponential":
+            return self.random.expovariate(1 / mean) if mean > 0 else 0.0
+        if settings.latency == "lognormal":
+            return self.random.lognormvariate(0, settings.latency_sigma) * mean
+        return mean
+
+    def usage(self) -> float:
+        """Fraction of the rate-limit window used, after dropping expired calls."""
+        now = time.monotonic()
+        while self.window and self.window[0] <= now - self.settings.rate_window:
+            self.window.popleft()
+        if not self.settings.rate_limit:
+            return 0.0
+        return len(self.window) / self.settings.rate_limit
+
+def create_app(settings: FakePlatformSettings) -> FastAPI:
+    state = FakePlatformState(settings)
+    app = FastAPI(title="Fake Graph/TikTok API")
+
+    @app.middleware("http")
+    async def simulate_platform(request: Request, call_next):
+        if request.url.path == "/_stats":
+            return await call_next(request)
+        key = f"{request.method} {_ID_SEGMENT_RE.sub('/{id}', request.url.path)}"
+        state.calls[key] += 1
+        await asyncio.sleep(state.delay())
+
+        usage = state.usage()
+        state.window.append(time.monotonic())
+        percent = min(int(usage * 100), 100)
+        headers = {
+            "X-App-Usage": json.dumps({"call_count": percent, "total_time": percent, "total_cputime": percent}),
+            "X-RateLimit-Limit": str(settings.rate_limit),
+            "X-RateLimit-Remaining": str(max(settings.rate_limit - len(state.window), 0)),
+            "X-RateLimit-Reset": str(int(settings.rate_window)),
+        }
+
+        roll = state.random.random()
+        if (settings.rate_limit and usage >= 1) or roll < settings.error_rate_429:
+            state.errors[f"{key} 429"] += 1
+            headers["Retry-After"] = "1"
+            return JSONResponse(
+                {"error": {"message": "Application request limit reached", "code": 4, "type": "OAuthException"}},
+                status_code=429, headers=headers
+            )
+        if roll < settings.error_rate_429 + settings.error_rate_5xx:
+            status_code = state.random.choice([500, 502, 503])
+            state.errors[f"{key} {status_code}"] += 1
+            return JSONResponse(
+                {"error": {"message": "An unexpected error has occurred", "code": 2, "is_transient": True}},
+                status_code=status_code, headers=headers
+            )
+
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+
+    @app.get("/_stats")
+    async def stats() -> Dict[str, Dict[str, int]]:
+        return {"calls": dict(state.calls), "errors": dict(state.errors)}
+
+    graph = APIRouter(prefix="/graph")
+
+    @graph.api_route("/oauth/access_token", methods=["GET", "POST"])
+    async def graph_access_token():
+        return {"access_token": f"fb-token-{state.next_id()}", "token_type": "bearer", "expires_in": 5184000}
+
+    @graph.get("/me/accounts")
+    async def graph_me_accounts():
+        return {"data": [
+            {"id": state.next_id(), "name": f"Fake Page {index}", "category": "Brand",
+             "access_token": f"page-token-{state.next_id()}"}
+            for index in range(3)
+        ]}
+
+    @graph.post("/{page_id}/feed")
+    async def graph_feed(page_id: str):
+        return {"id": f"{page_id}_{state.next_id()}"}
+
+    @graph.post("/{page_id}/photos")
+    async def graph_photos(page_id: str):
+        photo_id = state.next_id()
+        return {"id": photo_id, "post_id": f"{page_id}_{photo_id}"}
+
+    @graph.post("/{page_id}/videos")
+    async def graph_videos(page_id: str, request: Request):
+        form = await request.form()
+        phase = form.get("upload_phase")
+        if phase == "start":
+            size = int(form["file_size"])
+            session_id = state.next_id()
+            state.uploads[session_id] = size
+            return {"video_id": state.next_id(), "upload_session_id": session_id,
+                    "start_offset": "0", "end_offset": str(min(size, FACEBOOK_TRANSFER_CHUNK))}
+        if phase in ("transfer", "finish") and form.get("upload_session_id") not in state.uploads:
+            return JSONResponse({"error": {"message": "Invalid upload session", "code": 6000}}, status_code=400)
+        if phase == "transfer":
+            size = state.uploads[form["upload_session_id"]]
+            next_offset = int(form["start_offset"]) + len(await form["video_file_chunk"].read())
+            return {"start_offset": str(next_offset), "end_offset": str(min(size, next_offset + FACEBOOK_TRANSFER_CHUNK))}
+        if phase == "finish":
+            del state.uploads[form["upload_session_id"]]
+            return {"success": True}
+        return {"id": state.next_id()}
+
+    @graph.post("/{ig_user_id}/media")
+    async def instagram_media(ig_user_id: str):
+        return {"id": state.next_id()}
+
+    @graph.post("/{ig_user_id}/media_publish")
+    async def instagram_media_publish(ig_user_id: str):
+        return {"id": state.next_id()}
+
+    @graph.get("/{object_id}")
+    async def graph_object(object_id: str, fields: str = ""):
+        body = {"id": object_id}
+        if "instagram_business_account" in fields:
+            body["instagram_business_account"] = {"id": f"17{object_id[-15:]}"}
+        if "status_code" in fields:
+            body["status_code"] = "FINISHED"
+        return body
+
+    tiktok_open = APIRouter(prefix="/tiktok-open")
+
+    @tiktok_open.post("/oauth/access_token/")
+    @tiktok_open.post("/oauth/refresh_token/")
+    async def tiktok_token():
+        return {"message": "success", "data": {
+            "open_id": f"tt-{state.next_id()}",
+            "access_token": f"act.{state.next_id()}",
+            "expires_in": 86400,
+            "refresh_token": f"rft.{state.next_id()}",
+            "refresh_expires_in": 31536000,
+            "scope": "user.info.basic,video.publish",
+        }}
+
+    tiktok = APIRouter(prefix="/tiktok")
+
+    @tiktok.post("/post/publish/video/init/")
+    async def tiktok_video_init(request: Request):
+        source_info = (await request.json()).get("source_info", {})
+        if source_info.get("source") == "FILE_UPLOAD":
+            publish_id = f"v_inbox_file~v2.{state.next_id()}"
+            state.uploads[publish_id] = int(source_info["video_size"])
+            data = {"publish_id": publish_id, "upload_url": f"{request.base_url}tiktok-upload/{publish_id}"}
+        else:
+            data = {"publish_id": f"v_pub_url~v2.{state.next_id()}"}
+        return {"data": data, "error": {"code": "ok", "message": "", "log_id": state.next_id()}}
+
+    @app.put("/tiktok-upload/{publish_id}")
+    async def tiktok_upload_chunk(publish_id: str, request: Request):
+        if publish_id not in state.uploads:
+            return JSONResponse({"error": {"code": "invalid_params", "message": "Unknown upload"}}, status_code=404)
+        await request.body()
+        last_byte, total = request.headers["Content-Range"].split(" ")[1].split("-")[1].split("/")
+        if int(last_byte) + 1 >= int(total):
+            del state.uploads[publish_id]
+            return Response(status_code=201)
+        return Response(status_code=206)
+
+    app.include_router(graph)
+    app.include_router(tiktok_open)
+    app.include_router(tiktok)
+    return app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "exponential", "lognormal"], default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="calls per window before 429s; 0 disables")
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    settings = FakePlatformSettings(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Publish pipeline benchmark.
+
+Seeds posts with one target per linked account and runs the Celery publish
+tasks eagerly (in-process, no broker) against the fake platform server in
+benchmarks/fake_platform_server.py, with `--concurrency` threads standing in
+for worker slots. Prints per-platform p50/p95/p99 task latency and overall
+throughput as JSON.
+
+    cd backend
+    python -m benchmarks.pipeline_bench --concurrency 8 --posts-per-user 50
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from benchmarks.common import DEFAULT_DATABASE_URL, configure_environment, seed, summarize, write_report
+from benchmarks.fake_platform_server import FakePlatformSettings, create_app
+
+def start_fake_platforms(settings: FakePlatformSettings) -> Tuple[object, str]:
+    """Run the fake Graph/TikTok server on a free port in a background thread."""
+    import socket
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(create_app(settings), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--accounts-per-user", type=int, default=3)
+    parser.add_argument("--posts-per-user", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="simulated worker slots")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "exponential", "lognormal"], default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake platform latency")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    server, fake_url = start_fake_platforms(FakePlatformSettings(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+    ))
+    os.environ["FACEBOOK_GRAPH_URL"] = f"{fake_url}/graph"
+    os.environ["TIKTOK_OPEN_API_URL"] = f"{fake_url}/tiktok-open"
+    os.environ["TIKTOK_API_URL"] = f"{fake_url}/tiktok"
+    # Chunked uploads read from S3, which the benchmark does not have
+    os.environ.setdefault("CHUNKED_VIDEO_UPLOADS", "false")
+    # Tasks are applied directly, so there is no fair-scheduling dispatcher to feed
+    os.environ.setdefault("FAIR_SCHEDULING_ENABLED", "false")
+    seed(args.users, args.accounts_per_user, args.posts_per_user)
+
+    from celery_app import celery_app
+    from database import SessionLocal
+    from models import PostMedia, PostTarget, SocialAccount
+    from services import publishers
+    from services.log_sink import log_sink
+    from services.media_variants import media_variant_service
+    from tasks import publish_tasks
+
+    publishers.INSTAGRAM_CONTAINER_POLL_INTERVAL = 0
+    # There is no S3 behind the benchmark; publish the seeded keys as they are
+    media_variant_service.variants_for = lambda db, media_items, platform, **kwargs: {
+        media.id: media.s3_key for media in media_items
+    }
+    celery_app.conf.task_always_eager = True
+
+    db = SessionLocal()
+    try:
+        # Videos exercise every platform (TikTok only accepts video)
+        db.query(PostMedia).update({PostMedia.type: "video"})
+        db.commit()
+        targets = db.query(PostTarget.id, SocialAccount.provider).join(SocialAccount).all()
+    finally:
+        db.close()
+
+    tasks = {
+        "facebook": publish_tasks.publish_to_facebook,
+        "instagram": publish_tasks.publish_to_instagram,
+        "tiktok": publish_tasks.publish_to_tiktok,
+    }
+    latencies: Dict[str, List[float]] = {provider: [] for provider in tasks}
+    errors: Dict[str, int] = {provider: 0 for provider in tasks}
+    lock = threading.Lock()
+
+    def publish(target: Tuple[int, str]) -> None:
+        target_id, provider = target
+        start = time.perf_counter()
+        result = tasks[provider].apply(args=[target_id])
+        elapsed = time.perf_counter() - start
+        with lock:
+            if result.failed() or result.result.get("platform_status") != "published":
+                errors[provider] += 1
+            else:
+                latencies[provider].append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(publish, targets))
+    wall_time = time.perf_counter() - start
+    log_sink.close()
+    server.should_exit = True
+
+    results = {
+        provider: summarize(latencies[provider], errors[provider], wall_time)
+        for provider in tasks
+    }
+    results["all"] = summarize(
+        [value for values in latencies.values() for value in values],
+        sum(errors.values()),
+        wall_time
+    )
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    write_report("pipeline", config, results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Web server scaling benchmark.
+
+Starts the production launcher (start.py) with 1, 2, 4, ... workers against
+a seeded database and measures throughput at each size, showing how the API
+scales with cores. Prints requests per second, latency percentiles and
+scaling efficiency (throughput / (workers * single-worker throughput)).
+
+    cd backend
+    python -m benchmarks.scaling_bench --workers 1 2 4 8 --requests 5000
+
+The load generator is a single asyncio process on the same machine. For core
+counts close to the machine's, run it from another host with --host to keep
+it from competing with the workers.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.api_bench import run_scenario
+from benchmarks.common import (
+    BACKEND_DIR,
+    BENCH_PASSWORD,
+    DEFAULT_DATABASE_URL,
+    configure_environment,
+    seed,
+    wait_for_server,
+    write_report,
+)
+
+ENDPOINTS = {
+    "list_posts": ("/posts/", {"limit": 100}),
+    "list_social_accounts": ("/social-accounts/", {}),
+    "health": ("/health", {}),
+}
+
+async def measure(base_url: str, args, emails: List[str]) -> Dict[str, object]:
+    import httpx
+
+    path, params = ENDPOINTS[args.endpoint]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        tokens = []
+        for email in emails:
+            response = await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            tokens.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+        async def request(index: int) -> int:
+            response = await client.get(path, headers=tokens[index % len(tokens)], params=params)
+            return response.status_code
+
+        # Warm every worker's connections and caches before timing
+        await run_scenario(args.concurrency, args.concurrency * 10, request)
+        return await run_scenario(args.concurrency, args.requests, request)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--posts-per-user", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="list_posts")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000, help="timed requests per worker count")
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--host", default="127.0.0.1", help="address the load generator connects to")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if not args.workers:
+        cores = os.cpu_count() or 1
+        args.workers = [1]
+        while args.workers[-1] * 2 <= cores:
+            args.workers.append(args.workers[-1] * 2)
+
+    env = configure_environment(args.database_url)
+    emails = seed(args.users, 3, args.posts_per_user)
+    base_url = f"http://{args.host}:{args.port}"
+
+    results = {}
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "start.py"],
+            cwd=BACKEND_DIR,
+            env={
+                **os.environ,
+                **env,
+                "PORT": str(args.port),
+                "WEB_CONCURRENCY": str(workers),
+                "WEB_SERVER": args.server,
+                "WEB_MAX_REQUESTS": "0",
+                "LOG_LEVEL": "warning",
+                "WEB_ACCESS_LOG": "",
+            },
+        )
+        try:
+            wait_for_server(base_url)
+            results[str(workers)] = asyncio.run(measure(base_url, args, emails))
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    baseline = results[str(args.workers[0])]["throughput_rps"] / args.workers[0]
+    for workers in args.workers:
+        result = results[str(workers)]
+        result["efficiency"] = round(result["throughput_rps"] / (workers * baseline), 3) if baseline else None
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    write_report("scaling", config, results, args.output)
+
+if __name__ == "__main__":
+    main()
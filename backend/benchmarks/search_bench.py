@@ -0,0 +1,182 @@
+"""
+Post search benchmark.
+
+Bulk-seeds a post history (a million posts by default) with captions drawn
+from a skewed vocabulary, builds the search index, and times
+services.post_search.search_posts for one user's history:
+
+    relevance    ranked full-text match on a common and a rare word
+    filtered     the same words narrowed by status, platform and date range
+    recent       newest-first full-text match
+    next_page    the page after the first relevance page, via its cursor
+    ilike        the unindexed ILIKE '%word%' scan search replaces
+
+Runs against SQLite (FTS5) by default; pass a PostgreSQL URL to measure the
+GIN index.
+
+    cd backend
+    python -m benchmarks.search_bench --posts 1000000 --iterations 50
+    python -m benchmarks.search_bench --database-url postgresql://localhost/bench --skip-seed
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from benchmarks.common import DEFAULT_DATABASE_URL, configure_environment, summarize, write_report
+
+COMMON_WORDS = ["launch", "sale", "new", "today", "team", "weekend", "summer", "event", "video", "live"]
+RARE_WORDS = ["anniversary", "giveaway", "behindthescenes", "webinar", "unboxing", "collab"]
+FILLER = ["our", "the", "with", "for", "and", "check", "out", "this", "join", "us", "at", "now"]
+STATUSES = ["draft", "scheduled", "published", "published", "published", "failed"]
+PROVIDERS = ["facebook", "instagram", "tiktok"]
+
+def caption(rng: random.Random) -> str:
+    words = rng.choices(FILLER, k=rng.randint(6, 18))
+    words += rng.choices(COMMON_WORDS, k=rng.randint(1, 3))
+    if rng.random() < 0.01:
+        words.append(rng.choice(RARE_WORDS))
+    rng.shuffle(words)
+    return " ".join(words)
+
+def seed_history(users: int, posts: int, chunk_size: int, rng: random.Random) -> None:
+    """Create tables and bulk-insert users, one account per provider, posts and targets."""
+    from sqlalchemy import insert
+    from database import Base, engine, SessionLocal
+    from models import User, SocialAccount, Post, PostTarget
+    from oauth import encrypt_token
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [
+            {"id": user_id, "name": f"Search {user_id}", "email": f"search{user_id}@example.com", "password_hash": "x"}
+            for user_id in range(1, users + 1)
+        ])
+        token = encrypt_token("benchmark-token")
+        db.execute(insert(SocialAccount), [
+            {
+                "id": (user_id - 1) * len(PROVIDERS) + index + 1,
+                "user_id": user_id,
+                "provider": provider,
+                "provider_account_id": f"{user_id}-{provider}",
+                "access_token_encrypted": token
+            }
+            for user_id in range(1, users + 1)
+            for index, provider in enumerate(PROVIDERS)
+        ])
+        for chunk_start in range(0, posts, chunk_size):
+            post_rows = []
+            target_rows = []
+            for post_id in range(chunk_start + 1, min(posts, chunk_start + chunk_size) + 1):
+                user_id = post_id % users + 1
+                post_rows.append({
+                    "id": post_id,
+                    "user_id": user_id,
+                    "text": caption(rng),
+                    "status": rng.choice(STATUSES),
+                    "created_at": start + timedelta(seconds=post_id * 365 * 86400 // posts)
+                })
+                target_rows.append({
+                    "post_id": post_id,
+                    "social_account_id": (user_id - 1) * len(PROVIDERS) + rng.randrange(len(PROVIDERS)) + 1,
+                    "platform_status": "pending"
+                })
+            db.execute(insert(Post), post_rows)
+            db.execute(insert(PostTarget), target_rows)
+            db.commit()
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10, help="history is spread evenly across these users")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the posts already in the database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    from sqlalchemy import text
+    from database import engine, SessionLocal
+    from models import Post
+    from services.post_search import ensure_search_index, search_posts
+
+    rng = random.Random(args.seed)
+    if not args.skip_seed:
+        seed_start = time.perf_counter()
+        seed_history(args.users, args.posts, args.chunk_size, rng)
+        seed_seconds = time.perf_counter() - seed_start
+        index_start = time.perf_counter()
+        ensure_search_index(engine)
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+        index_seconds = time.perf_counter() - index_start
+    else:
+        seed_seconds = index_seconds = None
+
+    user_id = 1
+    since = datetime.now(timezone.utc) - timedelta(days=90)
+    db = SessionLocal()
+    try:
+        first_page, cursor = search_posts(db, user_id, COMMON_WORDS[0], limit=args.limit)
+
+        def ilike(word: str) -> List[object]:
+            return (
+                db.query(Post)
+                .filter(Post.user_id == user_id, Post.text.ilike(f"%{word}%"))
+                .order_by(Post.created_at.desc(), Post.id.desc())
+                .limit(args.limit)
+                .all()
+            )
+
+        scenarios: Dict[str, Callable[[], object]] = {}
+        for label, word in (("common", COMMON_WORDS[0]), ("rare", RARE_WORDS[0])):
+            scenarios[f"relevance_{label}"] = lambda word=word: search_posts(db, user_id, word, limit=args.limit)
+            scenarios[f"filtered_{label}"] = lambda word=word: search_posts(
+                db, user_id, word, status="published", platform="instagram", since=since, limit=args.limit
+            )
+            scenarios[f"recent_{label}"] = lambda word=word: search_posts(db, user_id, word, sort="recent", limit=args.limit)
+            scenarios[f"ilike_{label}"] = lambda word=word: ilike(word)
+        if cursor:
+            scenarios["next_page_common"] = lambda: search_posts(db, user_id, COMMON_WORDS[0], cursor=cursor, limit=args.limit)
+
+        results = {}
+        for name, run in scenarios.items():
+            for _ in range(min(5, args.iterations)):
+                run()
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                iteration_start = time.perf_counter()
+                run()
+                latencies.append(time.perf_counter() - iteration_start)
+                # Keep identity-map hits from flattering later iterations
+                db.expunge_all()
+            results[name] = summarize(latencies, 0, time.perf_counter() - start)
+    finally:
+        db.close()
+
+    for label in ("common", "rare"):
+        baseline = results[f"ilike_{label}"]["p50_ms"]
+        for name in (f"relevance_{label}", f"filtered_{label}", f"recent_{label}"):
+            p50 = results[name]["p50_ms"]
+            results[name]["speedup_vs_ilike"] = round(baseline / p50, 2) if p50 else None
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    config["dialect"] = engine.dialect.name
+    config["first_page_rows"] = len(first_page)
+    config["seed_seconds"] = round(seed_seconds, 2) if seed_seconds is not None else None
+    config["index_seconds"] = round(index_seconds, 2) if index_seconds is not None else None
+    write_report("search", config, results, args.output)
+
+if __name__ == "__main__":
+    main()
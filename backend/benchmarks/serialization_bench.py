@@ -0,0 +1,111 @@
+"""
+List serialization microbenchmark.
+
+Times turning a page of Post rows (with media) into a JSON body along each
+path the API can take, without HTTP or a database:
+
+    fastapi_json       validate + dump_python + json.dumps (FastAPI's default JSONResponse)
+    fastapi_orjson     validate + dump_python + orjson.dumps (default_response_class=ORJSONResponse)
+    model_jsonable     per-row model_validate + jsonable_encoder + json.dumps
+    type_adapter_json  validate + TypeAdapter.dump_json (services.serialization.dump_list_json)
+
+    cd backend
+    python -m benchmarks.serialization_bench --page-size 100 --iterations 2000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from benchmarks.common import DEFAULT_DATABASE_URL, configure_environment, summarize, write_report
+
+def build_posts(page_size: int, media_per_post: int) -> List[object]:
+    """Transient ORM rows shaped like a page of GET /posts/."""
+    from models import Post, PostMedia
+
+    now = datetime.now(timezone.utc)
+    posts = []
+    for index in range(page_size):
+        post = Post(
+            id=index + 1,
+            user_id=1,
+            text=f"Benchmark post {index} with a caption long enough to look like a real one #launch",
+            scheduled_at=now + timedelta(hours=index),
+            status="draft",
+            created_at=now
+        )
+        post.media = [
+            PostMedia(
+                id=index * media_per_post + media_index + 1,
+                post_id=index + 1,
+                s3_key=f"media/{index}-{media_index}.jpg",
+                type="image",
+                width=1080,
+                height=1350,
+                created_at=now
+            )
+            for media_index in range(media_per_post)
+        ]
+        posts.append(post)
+    return posts
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--media-per-post", type=int, default=2)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    configure_environment(DEFAULT_DATABASE_URL)
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from schemas import PostResponse
+    from services.serialization import dump_list_json
+
+    posts = build_posts(args.page_size, args.media_per_post)
+    adapter = TypeAdapter(List[PostResponse])
+
+    def fastapi_json() -> bytes:
+        content = adapter.dump_python(adapter.validate_python(posts, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def fastapi_orjson() -> bytes:
+        content = adapter.dump_python(adapter.validate_python(posts, from_attributes=True), mode="json")
+        return orjson.dumps(content)
+
+    def model_jsonable() -> bytes:
+        return json.dumps(jsonable_encoder([PostResponse.model_validate(post) for post in posts])).encode()
+
+    def type_adapter_json() -> bytes:
+        return dump_list_json(PostResponse, posts)
+
+    paths: Dict[str, Callable[[], bytes]] = {
+        "fastapi_json": fastapi_json,
+        "fastapi_orjson": fastapi_orjson,
+        "model_jsonable": model_jsonable,
+        "type_adapter_json": type_adapter_json,
+    }
+    results = {}
+    for name, serialize in paths.items():
+        for _ in range(min(50, args.iterations)):
+            serialize()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            iteration_start = time.perf_counter()
+            body = serialize()
+            latencies.append(time.perf_counter() - iteration_start)
+        results[name] = {**summarize(latencies, 0, time.perf_counter() - start), "body_bytes": len(body)}
+
+    baseline = results["fastapi_json"]["p50_ms"]
+    for result in results.values():
+        result["speedup_vs_fastapi_json"] = round(baseline / result["p50_ms"], 2) if result["p50_ms"] else None
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    write_report("serialization", config, results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 from celery import Celery
-from config import REDIS_URL
+from celery.signals import worker_init, worker_process_shutdown
+from config import (
+    CELERY_BROKER_URL,
+    CELERY_RESULT_BACKEND,
+    WORKER_METRICS_PORT,
+    FAIR_DISPATCH_INTERVAL_SECONDS,
+    LEASE_REAPER_INTERVAL_SECONDS,
+    METRICS_INGEST_INTERVAL_SECONDS
+)
+from services.metrics import instrument_celery, start_metrics_exporter
 
 # Create Celery instance
 celery_app = Celery(
     "multipost_worker",
-    broker=REDIS_URL,
-    backend=REDIS_URL,
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
     include=["tasks.publish_tasks"]
 )
 
@@ -28,11 +37,34 @@ celery_app.conf.task_routes = {
     "tasks.publish_tasks.publish_to_facebook": {"queue": "facebook"},
     "tasks.publish_tasks.publish_to_instagram": {"queue": "instagram"},
     "tasks.publish_tasks.publish_to_tiktok": {"queue": "tiktok"},
-    "tasks.publish_tasks.refresh_tokens": {"queue": "maintenance"},
+    "tasks.publish_tasks.prepare_media_variants": {"queue": "media"},
+    "tasks.publish_tasks.dispatch_publish_queues": {"queue": "scheduler"},
+    "tasks.publish_tasks.reap_expired_publish_leases": {"queue": "scheduler"},
+    "tasks.publish_tasks.ingest_engagement_metrics": {"queue": "maintenance"},
+    "tasks.publish_tasks.refresh_expired_tokens": {"queue": "maintenance"},
+    "tasks.publish_tasks.cleanup_old_logs": {"queue": "maintenance"},
+    "tasks.publish_tasks.rotate_token_encryption": {"queue": "maintenance"},
+    "tasks.publish_tasks.reconcile_dashboard_counts": {"queue": "maintenance"},
 }
 
 # Beat schedule for periodic tasks
 celery_app.conf.beat_schedule = {
+    "dispatch-publish-queues": {
+        "task": "tasks.publish_tasks.dispatch_publish_queues",
+        "schedule": FAIR_DISPATCH_INTERVAL_SECONDS,
+        # A dispatch that waited longer than a few intervals is superseded
+        "options": {"expires": FAIR_DISPATCH_INTERVAL_SECONDS * 5},
+    },
+    "reap-expired-publish-leases": {
+        "task": "tasks.publish_tasks.reap_expired_publish_leases",
+        "schedule": LEASE_REAPER_INTERVAL_SECONDS,
+        "options": {"expires": LEASE_REAPER_INTERVAL_SECONDS},
+    },
+    "ingest-engagement-metrics": {
+        "task": "tasks.publish_tasks.ingest_engagement_metrics",
+        "schedule": METRICS_INGEST_INTERVAL_SECONDS,
+        "options": {"expires": METRICS_INGEST_INTERVAL_SECONDS},
+    },
     "refresh-expired-tokens": {
         "task": "tasks.publish_tasks.refresh_expired_tokens",
         "schedule": 3600.0,  # Every hour
@@ -41,7 +73,26 @@ celery_app.conf.beat_schedule = {
         "task": "tasks.publish_tasks.cleanup_old_logs",
         "schedule": 86400.0,  # Every day
     },
+    "reconcile-dashboard-counts": {
+        "task": "tasks.publish_tasks.reconcile_dashboard_counts",
+        "schedule": 86400.0,  # Every day
+    },
 }
 
+# Queue wait, run time and retry metrics for every task
+instrument_celery(celery_app)
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    """Expose worker metrics for Prometheus to scrape."""
+    if WORKER_METRICS_PORT:
+        start_metrics_exporter(WORKER_METRICS_PORT)
+
+@worker_process_shutdown.connect
+def flush_log_sink(**kwargs):
+    """Write out buffered log rows before a worker process exits."""
+    from services.log_sink import log_sink
+    log_sink.close()
+
 if __name__ == "__main__":
     celery_app.start()
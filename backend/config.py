@@ -16,9 +16,66 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # S3-compatible storage (MinIO, LocalStack); unset for AWS
+
+# Web server (start.py / gunicorn.conf.py)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+WEB_PRELOAD_APP = os.getenv("WEB_PRELOAD_APP", "true").lower() == "true"
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "60"))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "10000"))  # recycle workers; 0 disables
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "1000"))
 
 # Redis configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+
+# Tenant-fair publish scheduling: targets wait in per-user Redis queues and
+# are released round-robin onto the platform queues
+FAIR_SCHEDULING_ENABLED = os.getenv("FAIR_SCHEDULING_ENABLED", "true").lower() == "true"
+FAIR_QUEUE_DEPTH = int(os.getenv("FAIR_QUEUE_DEPTH", "32"))  # tasks kept ready on each platform queue
+FAIR_LANE_WEIGHTS = {
+    "immediate": int(os.getenv("FAIR_IMMEDIATE_WEIGHT", "4")),
+    "backfill": int(os.getenv("FAIR_BACKFILL_WEIGHT", "1")),
+}
+FAIR_TENANT_MAX_IN_FLIGHT = int(os.getenv("FAIR_TENANT_MAX_IN_FLIGHT", "4"))  # per user and platform
+# Per-user overrides, e.g. "42:16,77:1"
+FAIR_TENANT_MAX_IN_FLIGHT_OVERRIDES = {
+    int(user_id): int(cap)
+    for user_id, cap in (
+        item.split(":") for item in os.getenv("FAIR_TENANT_MAX_IN_FLIGHT_OVERRIDES", "").split(",") if item.strip()
+    )
+}
+FAIR_IN_FLIGHT_TTL_SECONDS = int(os.getenv("FAIR_IN_FLIGHT_TTL_SECONDS", "1800"))  # matches task_time_limit
+FAIR_DISPATCH_INTERVAL_SECONDS = float(os.getenv("FAIR_DISPATCH_INTERVAL_SECONDS", "1.0"))
+
+# Per-account publish batching: one task publishes an account's queued targets
+# in order, sharing its token, DB session and HTTP connection
+PUBLISH_BATCHING_ENABLED = os.getenv("PUBLISH_BATCHING_ENABLED", "false").lower() == "true"
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", "25"))  # targets per task execution
+
+# Publish leases: a worker's claim on a target expires unless renewed by
+# heartbeats, and the reaper requeues targets whose worker died, up to
+# LEASE_REAPER_MAX_REAPS times before failing them
+PUBLISH_LEASE_SECONDS = int(os.getenv("PUBLISH_LEASE_SECONDS", "300"))
+LEASE_REAPER_INTERVAL_SECONDS = float(os.getenv("LEASE_REAPER_INTERVAL_SECONDS", "60"))
+LEASE_REAPER_BATCH_SIZE = int(os.getenv("LEASE_REAPER_BATCH_SIZE", "200"))
+LEASE_REAPER_MAX_BATCHES = int(os.getenv("LEASE_REAPER_MAX_BATCHES", "10"))  # per run
+LEASE_REAPER_MAX_REAPS = int(os.getenv("LEASE_REAPER_MAX_REAPS", "3"))  # per target
+
+# Metrics: port for the Celery worker exporter (0 disables it). With prefork
+# workers or multiple API workers, also set PROMETHEUS_MULTIPROC_DIR.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9808"))
+
+# List response cache (Redis), keyed by the per-user list versions
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+# Publish status streaming
+STATUS_STREAM_QUEUE_SIZE = int(os.getenv("STATUS_STREAM_QUEUE_SIZE", "100"))
+STATUS_STREAM_KEEPALIVE_SECONDS = float(os.getenv("STATUS_STREAM_KEEPALIVE_SECONDS", "15"))
 
 # Social media API keys
 FACEBOOK_APP_ID = os.getenv("FACEBOOK_APP_ID")
@@ -27,3 +84,84 @@ INSTAGRAM_APP_ID = os.getenv("INSTAGRAM_APP_ID")
 INSTAGRAM_APP_SECRET = os.getenv("INSTAGRAM_APP_SECRET")
 TIKTOK_APP_KEY = os.getenv("TIKTOK_APP_KEY")
 TIKTOK_APP_SECRET = os.getenv("TIKTOK_APP_SECRET")
+
+# Social platform base URLs; override to point at a local fake server
+# (see benchmarks/fake_platform_server.py) for development and load tests.
+FACEBOOK_GRAPH_URL = os.getenv("FACEBOOK_GRAPH_URL", "https://graph.facebook.com/v18.0")
+FACEBOOK_DIALOG_URL = os.getenv("FACEBOOK_DIALOG_URL", "https://www.facebook.com/v18.0/dialog/oauth")
+TIKTOK_AUTH_URL = os.getenv("TIKTOK_AUTH_URL", "https://www.tiktok.com/v2/auth/authorize/")
+TIKTOK_OPEN_API_URL = os.getenv("TIKTOK_OPEN_API_URL", "https://open-api.tiktok.com")
+TIKTOK_API_URL = os.getenv("TIKTOK_API_URL", "https://open.tiktokapis.com/v2")
+
+# Token encryption keyring: comma-separated Fernet keys, newest first.
+# The first key encrypts; every key can decrypt. ENCRYPTION_KEY is still
+# accepted as a single-key keyring.
+ENCRYPTION_KEYS = [
+    key.strip()
+    for key in os.getenv("ENCRYPTION_KEYS", os.getenv("ENCRYPTION_KEY", "")).split(",")
+    if key.strip()
+]
+TOKEN_REENCRYPT_BATCH_SIZE = int(os.getenv("TOKEN_REENCRYPT_BATCH_SIZE", "1000"))
+TOKEN_REENCRYPT_TIME_BUDGET_SECONDS = int(os.getenv("TOKEN_REENCRYPT_TIME_BUDGET_SECONDS", "1200"))
+
+# Engagement metrics: published targets are re-polled on a schedule that
+# decays with post age, and stop being polled after METRICS_MAX_AGE_DAYS
+METRICS_INGEST_ENABLED = os.getenv("METRICS_INGEST_ENABLED", "true").lower() == "true"
+METRICS_INGEST_INTERVAL_SECONDS = float(os.getenv("METRICS_INGEST_INTERVAL_SECONDS", "300"))
+METRICS_INGEST_BATCH_SIZE = int(os.getenv("METRICS_INGEST_BATCH_SIZE", "1000"))  # targets per run
+METRICS_MAX_AGE_DAYS = int(os.getenv("METRICS_MAX_AGE_DAYS", "30"))
+
+# Dashboard counter reconciliation: users rebuilt per transaction, and seconds
+# per run before it re-queues itself
+STATUS_COUNTS_RECONCILE_BATCH_SIZE = int(os.getenv("STATUS_COUNTS_RECONCILE_BATCH_SIZE", "100"))
+STATUS_COUNTS_RECONCILE_TIME_BUDGET_SECONDS = int(os.getenv("STATUS_COUNTS_RECONCILE_TIME_BUDGET_SECONDS", "600"))
+
+# Log retention
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+LOG_PARTITION_MONTHS_AHEAD = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", "2"))
+LOG_CLEANUP_BATCH_SIZE = int(os.getenv("LOG_CLEANUP_BATCH_SIZE", "5000"))
+LOG_CLEANUP_MAX_BATCHES = int(os.getenv("LOG_CLEANUP_MAX_BATCHES", "20"))
+
+# Buffered log writer
+LOG_SINK_BATCH_SIZE = int(os.getenv("LOG_SINK_BATCH_SIZE", "500"))
+LOG_SINK_FLUSH_INTERVAL = float(os.getenv("LOG_SINK_FLUSH_INTERVAL", "2.0"))
+LOG_SINK_MAX_BUFFER = int(os.getenv("LOG_SINK_MAX_BUFFER", "10000"))
+LOG_SINK_BLOCK_TIMEOUT = float(os.getenv("LOG_SINK_BLOCK_TIMEOUT", "0.05"))
+
+# Token refresh engine
+TOKEN_REFRESH_WINDOW_HOURS = {
+    "facebook": int(os.getenv("FACEBOOK_TOKEN_REFRESH_WINDOW_HOURS", "168")),
+    "instagram": int(os.getenv("INSTAGRAM_TOKEN_REFRESH_WINDOW_HOURS", "168")),
+    "tiktok": int(os.getenv("TIKTOK_TOKEN_REFRESH_WINDOW_HOURS", "3")),
+}
+# Tokens expired longer than this are treated as dead (the user must re-link) and no longer retried
+TOKEN_REFRESH_GIVE_UP_HOURS = {
+    "facebook": int(os.getenv("FACEBOOK_TOKEN_REFRESH_GIVE_UP_HOURS", "0")),
+    "instagram": int(os.getenv("INSTAGRAM_TOKEN_REFRESH_GIVE_UP_HOURS", "0")),
+    "tiktok": int(os.getenv("TIKTOK_TOKEN_REFRESH_GIVE_UP_HOURS", "720")),
+}
+TOKEN_REFRESH_CONCURRENCY = int(os.getenv("TOKEN_REFRESH_CONCURRENCY", "8"))
+TOKEN_REFRESH_BATCH_SIZE = int(os.getenv("TOKEN_REFRESH_BATCH_SIZE", "500"))
+
+# Decrypted token cache (per worker process)
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1024"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "900"))
+
+# Per-platform media variants
+MEDIA_VARIANT_WORKERS = int(os.getenv("MEDIA_VARIANT_WORKERS", str(os.cpu_count() or 2)))
+MEDIA_VARIANT_TIMEOUT_SECONDS = int(os.getenv("MEDIA_VARIANT_TIMEOUT_SECONDS", "900"))
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+# Publish tasks waiting on a video variant retry on their own budget, apart
+# from the platform error retries: every MEDIA_VARIANT_WAIT_SECONDS, at most
+# MEDIA_VARIANT_MAX_WAITS times
+MEDIA_VARIANT_WAIT_SECONDS = int(os.getenv("MEDIA_VARIANT_WAIT_SECONDS", "60"))
+MEDIA_VARIANT_MAX_WAITS = int(os.getenv("MEDIA_VARIANT_MAX_WAITS", "30"))
+# Variant keys known to exist in S3, remembered per worker process
+MEDIA_VARIANT_KNOWN_KEYS_MAX = int(os.getenv("MEDIA_VARIANT_KNOWN_KEYS_MAX", "4096"))
+
+# Chunked video uploads streamed from S3 (Facebook and TikTok); when disabled
+# the platforms pull the video from a presigned URL instead
+CHUNKED_VIDEO_UPLOADS = os.getenv("CHUNKED_VIDEO_UPLOADS", "true").lower() == "true"
+VIDEO_UPLOAD_CHUNK_SIZE = int(os.getenv("VIDEO_UPLOAD_CHUNK_SIZE", str(16 * 1024 * 1024)))
+VIDEO_UPLOAD_MAX_IN_FLIGHT = int(os.getenv("VIDEO_UPLOAD_MAX_IN_FLIGHT", "3"))
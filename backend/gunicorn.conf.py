@@ -0,0 +1,51 @@
+import gc
+import os
+from config import (
+    WEB_CONCURRENCY,
+    WEB_PRELOAD_APP,
+    WEB_TIMEOUT,
+    WEB_GRACEFUL_TIMEOUT,
+    WEB_KEEPALIVE,
+    WEB_MAX_REQUESTS,
+    WEB_MAX_REQUESTS_JITTER
+)
+
+# Gunicorn settings for serving main:app; see start.py.
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = WEB_CONCURRENCY
+# Picks uvloop and httptools automatically when installed (uvicorn[standard])
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master so workers share its pages copy-on-write
+preload_app = WEB_PRELOAD_APP
+
+# On SIGTERM workers stop accepting and drain in-flight requests for up to
+# graceful_timeout seconds before being killed
+timeout = WEB_TIMEOUT
+graceful_timeout = WEB_GRACEFUL_TIMEOUT
+keepalive = WEB_KEEPALIVE
+
+# Recycle workers after a jittered number of requests to bound slow leaks
+max_requests = WEB_MAX_REQUESTS
+max_requests_jitter = WEB_MAX_REQUESTS_JITTER
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-") or None  # empty disables
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+def when_ready(server):
+    # Keep objects allocated during preload out of the collector's reach, so
+    # GC passes in the workers don't touch (and copy) the shared pages
+    if preload_app:
+        gc.freeze()
+
+def post_fork(server, worker):
+    if preload_app:
+        # Connections must never be shared across processes
+        from database import engine
+        engine.dispose(close=False)
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routes.auth import router as auth_router
 from routes.social_accounts import router as social_accounts_router
 from routes.posts import router as posts_router
+from routes.events import router as events_router
+from services.log_sink import log_sink
+from services.status_events import status_broker
+from services.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE_LATEST
 
-app = FastAPI(title="Multi-Platform Posting System", version="1.0.0")
+# orjson encodes every response_model and dict response; list endpoints
+# serialize ORM rows directly (services/serialization.py)
+app = FastAPI(title="Multi-Platform Posting System", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -13,21 +20,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Per-route latency and DB query metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(social_accounts_router)
 app.include_router(posts_router)
+app.include_router(events_router)
 
 @app.get("/")
 async def root():
     return {"message": "Multi-Platform Posting System API"}
 
+@app.on_event("startup")
+async def start_status_broker():
+    status_broker.start()
+
+@app.on_event("shutdown")
+async def stop_status_broker():
+    await status_broker.stop()
+
+@app.on_event("shutdown")
+def flush_log_sink():
+    log_sink.close()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
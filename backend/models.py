@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Boolean, ForeignKey, JSON, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -11,6 +11,9 @@ class User(Base):
     email = Column(String(255), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
+    # Bumped on every write that changes a list response; keys ETags and cached lists
+    posts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    social_accounts_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -19,6 +22,10 @@ class User(Base):
 
 class SocialAccount(Base):
     __tablename__ = "social_accounts"
+    __table_args__ = (
+        # Used by the token refresh engine to find accounts expiring soon per provider
+        Index("ix_social_accounts_provider_token_expires_at", "provider", "token_expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -36,10 +43,14 @@ class SocialAccount(Base):
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Serves dashboard counter reconciliation (and per-user listing) without scanning posts
+        Index("ix_posts_user_id_status", "user_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    text = Column(Text)
+    text = Column(Text)  # Searchable through the migration-managed search_vector column or posts_fts table; see services/post_search.py
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     scheduled_at = Column(DateTime(timezone=True))
     status = Column(String(50), default="draft")  # 'draft', 'scheduled', 'publishing', 'published', 'failed'
@@ -55,6 +66,7 @@ class PostMedia(Base):
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     s3_key = Column(String(500), nullable=False)
+    content_sha256 = Column(String(64), index=True)  # Hash of the source bytes; keys derived media variants
     type = Column(String(50), nullable=False)  # 'image', 'video'
     width = Column(Integer)
     height = Column(Integer)
@@ -64,8 +76,47 @@ class PostMedia(Base):
     # Relationships
     post = relationship("Post", back_populates="media")
 
+class MediaObject(Base):
+    # One row per distinct file a user uploaded; that user's uploads of identical
+    # bytes share the S3 object. Never shared across users, so an upload cannot
+    # reveal what anyone else has stored.
+    __tablename__ = "media_objects"
+    __table_args__ = (
+        UniqueConstraint("user_id", "content_sha256", name="uq_media_objects_user_id_content_sha256"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))  # NULL for objects uploaded before per-user scoping
+    content_sha256 = Column(String(64), nullable=False)
+    s3_key = Column(String(500), unique=True, nullable=False)
+    content_type = Column(String(255), nullable=False)
+    size = Column(Integer, nullable=False)
+    width = Column(Integer)
+    height = Column(Integer)
+    ref_count = Column(Integer, nullable=False, default=0)  # Post media rows using this key
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
 class PostTarget(Base):
     __tablename__ = "post_targets"
+    __table_args__ = (
+        # Used by the lease reaper to find publishes whose worker died
+        Index(
+            "ix_post_targets_publishing_lease_expires_at",
+            "lease_expires_at",
+            postgresql_where=text("platform_status = 'publishing'"),
+            sqlite_where=text("platform_status = 'publishing'")
+        ),
+        # Used by metrics ingestion to find published targets due for a refresh
+        Index(
+            "ix_post_targets_published_metrics_due_at",
+            "metrics_due_at",
+            postgresql_where=text("platform_status = 'published'"),
+            sqlite_where=text("platform_status = 'published'")
+        ),
+        # Used by post search to filter posts by the platform they target
+        Index("ix_post_targets_social_account_id_post_id", "social_account_id", "post_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
@@ -73,6 +124,12 @@ class PostTarget(Base):
     platform_status = Column(String(50), default="pending")  # 'pending', 'publishing', 'published', 'failed'
     platform_post_id = Column(String(255))  # ID returned by the platform
     last_error = Column(Text)
+    upload_state = Column(JSON)  # Chunked video upload checkpoint, so retries resume
+    lease_owner = Column(String(255))  # Worker publishing the target; kept after a reap to flag recovery
+    lease_expires_at = Column(DateTime(timezone=True))  # Renewed by heartbeats while publishing
+    lease_reaps = Column(Integer, nullable=False, default=0, server_default="0")  # Attempts whose worker died; bounds requeues
+    published_at = Column(DateTime(timezone=True))
+    metrics_due_at = Column(DateTime(timezone=True))  # Next engagement metrics refresh; NULL once the post is too old
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -80,7 +137,38 @@ class PostTarget(Base):
     post = relationship("Post", back_populates="targets")
     social_account = relationship("SocialAccount", back_populates="post_targets")
 
+class PostTargetMetric(Base):
+    # Append-only engagement samples: one row per published target per
+    # refresh, written in bulk by services/engagement_metrics.py. Counts a
+    # platform does not report are NULL.
+    __tablename__ = "post_target_metrics"
+    __table_args__ = (
+        Index("ix_post_target_metrics_target_id_collected_at", "target_id", "collected_at"),
+    )
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    target_id = Column(Integer, ForeignKey("post_targets.id"), nullable=False)
+    collected_at = Column(DateTime(timezone=True), nullable=False)
+    likes = Column(Integer)
+    comments = Column(Integer)
+    shares = Column(Integer)
+    views = Column(Integer)
+    reach = Column(Integer)
+
+class UserStatusCount(Base):
+    # Dashboard counters: posts per status and targets per platform_status for
+    # each user, kept up to date by every status transition; see
+    # services/status_counts.py.
+    __tablename__ = "user_status_counts"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String(20), primary_key=True)  # 'post' or 'target'
+    status = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
 class Log(Base):
+    # On PostgreSQL this table is range-partitioned by month on created_at
+    # (primary key (id, created_at)); see services/log_partitions.py.
     __tablename__ = "logs"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -88,4 +176,4 @@ class Log(Base):
     entity_id = Column(Integer, nullable=False)
     level = Column(String(20), nullable=False)  # 'info', 'warning', 'error'
     message = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -9,15 +9,36 @@ from config import (
     INSTAGRAM_APP_ID, 
     INSTAGRAM_APP_SECRET,
     TIKTOK_APP_KEY,
-    TIKTOK_APP_SECRET
+    TIKTOK_APP_SECRET,
+    FACEBOOK_GRAPH_URL,
+    FACEBOOK_DIALOG_URL,
+    TIKTOK_AUTH_URL,
+    TIKTOK_OPEN_API_URL,
+    TOKEN_CACHE_MAX_ENTRIES,
+    TOKEN_CACHE_TTL_SECONDS,
+    ENCRYPTION_KEYS
 )
-from cryptography.fernet import Fernet
+from services.token_cache import TokenCache
+from services.response_cache import bump_list_version
+from services.metrics import register_stats_source
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 import base64
 import os
 
-# Encryption key for storing tokens securely
-ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", Fernet.generate_key())
-cipher_suite = Fernet(ENCRYPTION_KEY)
+# Encryption keyring for storing tokens securely. A per-process random key
+# would make tokens written by one process unreadable by every other one,
+# so a configured key is required.
+if not ENCRYPTION_KEYS:
+    raise RuntimeError(
+        "ENCRYPTION_KEYS (or ENCRYPTION_KEY) must be set to one or more Fernet keys; "
+        "generate one with: python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())'"
+    )
+primary_cipher = Fernet(ENCRYPTION_KEYS[0])
+cipher_suite = MultiFernet([Fernet(key) for key in ENCRYPTION_KEYS])
+
+# Decrypted tokens, so publish workers don't re-run Fernet for every post
+token_cache = TokenCache(max_entries=TOKEN_CACHE_MAX_ENTRIES, ttl=TOKEN_CACHE_TTL_SECONDS)
+register_stats_source("token_cache", token_cache.stats)
 
 def encrypt_token(token: str) -> str:
     """Encrypt a token for secure storage."""
@@ -27,6 +48,15 @@ def decrypt_token(encrypted_token: str) -> str:
     """Decrypt a token for use."""
     return cipher_suite.decrypt(encrypted_token.encode()).decode()
 
+def rotate_encrypted_token(encrypted_token: str) -> Optional[str]:
+    """Re-encrypt a token under the primary key, or return None if it already uses it."""
+    try:
+        # Only verifies the HMAC; no AES decryption is needed for the check.
+        primary_cipher.extract_timestamp(encrypted_token.encode())
+        return None
+    except InvalidToken:
+        return cipher_suite.rotate(encrypted_token.encode()).decode()
+
 class FacebookOAuth:
     """Facebook OAuth handler."""
     
@@ -40,12 +70,12 @@ class FacebookOAuth:
             "response_type": "code",
             "scope": "pages_manage_posts,pages_read_engagement,instagram_basic,instagram_content_publish"
         }
-        return f"https://www.facebook.com/v18.0/dialog/oauth?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+        return f"{FACEBOOK_DIALOG_URL}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
     
     @staticmethod
     def exchange_code_for_token(code: str, redirect_uri: str) -> Dict[str, Any]:
         """Exchange authorization code for access token."""
-        url = "https://graph.facebook.com/v18.0/oauth/access_token"
+        url = f"{FACEBOOK_GRAPH_URL}/oauth/access_token"
         data = {
             "client_id": FACEBOOK_APP_ID,
             "client_secret": FACEBOOK_APP_SECRET,
@@ -59,7 +89,7 @@ class FacebookOAuth:
     @staticmethod
     def get_long_lived_token(short_lived_token: str) -> Dict[str, Any]:
         """Exchange short-lived token for long-lived token."""
-        url = "https://graph.facebook.com/v18.0/oauth/access_token"
+        url = f"{FACEBOOK_GRAPH_URL}/oauth/access_token"
         params = {
             "grant_type": "fb_exchange_token",
             "client_id": FACEBOOK_APP_ID,
@@ -73,7 +103,7 @@ class FacebookOAuth:
     @staticmethod
     def get_user_pages(access_token: str) -> Dict[str, Any]:
         """Get user's Facebook pages."""
-        url = "https://graph.facebook.com/v18.0/me/accounts"
+        url = f"{FACEBOOK_GRAPH_URL}/me/accounts"
         params = {"access_token": access_token}
         response = requests.get(url, params=params)
         response.raise_for_status()
@@ -82,7 +112,7 @@ class FacebookOAuth:
     @staticmethod
     def get_instagram_accounts(page_id: str, access_token: str) -> Dict[str, Any]:
         """Get Instagram Business accounts connected to a Facebook page."""
-        url = f"https://graph.facebook.com/v18.0/{page_id}"
+        url = f"{FACEBOOK_GRAPH_URL}/{page_id}"
         params = {
             "fields": "instagram_business_account",
             "access_token": access_token
@@ -104,12 +134,12 @@ class TikTokOAuth:
             "redirect_uri": redirect_uri,
             "state": state
         }
-        return f"https://www.tiktok.com/v2/auth/authorize/?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+        return f"{TIKTOK_AUTH_URL}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
     
     @staticmethod
     def exchange_code_for_token(code: str, redirect_uri: str) -> Dict[str, Any]:
         """Exchange authorization code for access token."""
-        url = "https://open-api.tiktok.com/oauth/access_token/"
+        url = f"{TIKTOK_OPEN_API_URL}/oauth/access_token/"
         data = {
             "client_key": TIKTOK_APP_KEY,
             "client_secret": TIKTOK_APP_SECRET,
@@ -120,6 +150,19 @@ class TikTokOAuth:
         response = requests.post(url, data=data)
         response.raise_for_status()
         return response.json()
+    
+    @staticmethod
+    def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
+        """Obtain a new access token using a refresh token."""
+        url = f"{TIKTOK_OPEN_API_URL}/oauth/refresh_token/"
+        data = {
+            "client_key": TIKTOK_APP_KEY,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token
+        }
+        response = requests.post(url, data=data)
+        response.raise_for_status()
+        return response.json()
 
 def save_social_account(
     db: Session, 
@@ -141,6 +184,7 @@ def save_social_account(
     
     if existing_account:
         # Update existing account
+        token_cache.invalidate(existing_account.id)
         existing_account.access_token_encrypted = encrypt_token(access_token)
         if refresh_token:
             existing_account.refresh_token_encrypted = encrypt_token(refresh_token)
@@ -163,6 +207,7 @@ def save_social_account(
             meta=meta
         )
         db.add(social_account)
+        bump_list_version(db, user_id, "social_accounts")
         db.commit()
         db.refresh(social_account)
         return social_account
@@ -170,8 +215,17 @@ def save_social_account(
 def get_decrypted_token(social_account: SocialAccount, token_type: str = "access") -> str:
     """Get decrypted token from social account."""
     if token_type == "access":
-        return decrypt_token(social_account.access_token_encrypted)
+        encrypted_token = social_account.access_token_encrypted
     elif token_type == "refresh" and social_account.refresh_token_encrypted:
-        return decrypt_token(social_account.refresh_token_encrypted)
+        encrypted_token = social_account.refresh_token_encrypted
     else:
         raise ValueError("Invalid token type or refresh token not available")
+    if social_account.id is None:
+        return decrypt_token(encrypted_token)
+    return token_cache.get_or_decrypt(
+        social_account.id,
+        token_type,
+        encrypted_token,
+        social_account.token_expires_at,
+        decrypt_token
+    )
@@ -0,0 +1,66 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from database import SessionLocal
+from models import Post
+from auth import oauth2_scheme, get_current_user, get_current_active_user
+from services.status_events import status_broker
+from config import STATUS_STREAM_KEEPALIVE_SECONDS
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+def _authorize_stream(token: str, post_id: Optional[int]) -> int:
+    """Resolve the user for a stream with a short-lived session.
+
+    Streams stay open for a long time, so they must not hold a pooled
+    database connection the way a `Depends(get_db)` session would.
+    """
+    db = SessionLocal()
+    try:
+        user = get_current_active_user(get_current_user(token=token, db=db))
+        if post_id is not None:
+            post = db.query(Post.id).filter(Post.id == post_id, Post.user_id == user.id).first()
+            if not post:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Post not found"
+                )
+        return user.id
+    finally:
+        db.close()
+
+@router.get("/posts")
+async def stream_post_status(
+    post_id: Optional[int] = None,
+    token: str = Depends(oauth2_scheme)
+):
+    """Stream publish status transitions as server-sent events.
+
+    Streams every post of the current user, or only `post_id` when given.
+    """
+    user_id = await run_in_threadpool(_authorize_stream, token, post_id)
+    queue = status_broker.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STATUS_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if post_id is not None and event["post_id"] != post_id:
+                    continue
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
+        finally:
+            status_broker.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
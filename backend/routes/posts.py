@@ -1,23 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime
 from typing import List, Optional
 from database import get_db
-from models import Post, PostMedia, PostTarget, SocialAccount, User, Log
-from schemas import PostCreate, PostResponse, PostUpdate, PostMediaResponse, FileUploadResponse
+from collections import Counter
+from models import Post, PostMedia, PostTarget, PostTargetMetric, SocialAccount, User, Log, MediaObject
+from schemas import (
+    PostCreate, PostResponse, PostUpdate, PostMediaResponse, FileUploadResponse, PostStatsResponse,
+    PostSearchResponse, PostSearchResult
+)
 from auth import get_current_active_user
+from services.post_search import SORTS, InvalidCursor, search_posts
+from services.publishing import enqueue_publish, enqueue_media_variants
+from services.response_cache import bump_list_version, cached_list_response
+from services.s3 import s3_service
+from services.serialization import dump_list_json
+from services.status_counts import POST, TARGET, adjust_status_counts, count_transition, status_counts
+from services.status_events import publish_status_event
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
 @router.get("/", response_model=List[PostResponse])
 def get_posts(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get all posts for the current user."""
-    posts = db.query(Post).filter(Post.user_id == current_user.id).offset(skip).limit(limit).all()
-    return posts
+    """Get all posts for the current user; answers 304 while the list is unchanged."""
+    def build() -> bytes:
+        posts = (
+            db.query(Post)
+            .options(selectinload(Post.media))
+            .filter(Post.user_id == current_user.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return dump_list_json(PostResponse, posts)
+    return cached_list_response(request, current_user, "posts", build)
+
+@router.get("/stats", response_model=PostStatsResponse)
+def get_post_stats(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Posts per status and targets per platform status, from the user's dashboard counters."""
+    counts = status_counts(db, current_user.id)
+    return PostStatsResponse(
+        total_posts=sum(counts[POST].values()),
+        posts=counts[POST],
+        targets=counts[TARGET]
+    )
+
+@router.get("/search", response_model=PostSearchResponse)
+def search_post_history(
+    q: str = Query(..., min_length=1, max_length=256, description="Words to find in post text"),
+    post_status: Optional[str] = Query(None, alias="status"),
+    platform: Optional[str] = Query(None, description="Only posts targeting this provider"),
+    since: Optional[datetime] = Query(None, description="Created at or after"),
+    until: Optional[datetime] = Query(None, description="Created before"),
+    sort: str = Query("relevance", description="'relevance' or 'recent'"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over the current user's posts, best match first."""
+    if sort not in SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort must be one of: {', '.join(SORTS)}"
+        )
+    try:
+        results, next_cursor = search_posts(
+            db, current_user.id, q,
+            status=post_status,
+            platform=platform,
+            since=since,
+            until=until,
+            sort=sort,
+            cursor=cursor,
+            limit=limit
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    items = [
+        PostSearchResult(**PostResponse.model_validate(post).model_dump(), rank=rank)
+        for post, rank in results
+    ]
+    return PostSearchResponse(items=items, next_cursor=next_cursor)
 
 @router.post("/", response_model=PostResponse)
 def create_post(
@@ -34,23 +110,34 @@ def create_post(
         status="draft"
     )
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    db.flush()
     
     # Add media if provided
     if post.media:
+        # Carry over hashes of uploaded objects so variants skip re-hashing
+        hashes = dict(
+            db.query(MediaObject.s3_key, MediaObject.content_sha256)
+            .filter(
+                MediaObject.user_id == current_user.id,
+                MediaObject.s3_key.in_([media_data.s3_key for media_data in post.media])
+            )
+            .all()
+        )
         for media_data in post.media:
             db_media = PostMedia(
                 post_id=db_post.id,
                 s3_key=media_data.s3_key,
+                content_sha256=hashes.get(media_data.s3_key),
                 type=media_data.type,
                 width=media_data.width,
                 height=media_data.height,
                 duration=media_data.duration
             )
             db.add(db_media)
+        s3_service.add_references(db, current_user.id, [media_data.s3_key for media_data in post.media])
     
     # Add target accounts if provided
+    targets_added = 0
     if post.target_accounts:
         for account_id in post.target_accounts:
             # Verify the account belongs to the user
@@ -66,35 +153,93 @@ def create_post(
                     platform_status="pending"
                 )
                 db.add(db_target)
+                targets_added += 1
     
+    # Counters change in the same transaction as the rows they count
+    adjust_status_counts(db, current_user.id, POST, {db_post.status: 1})
+    adjust_status_counts(db, current_user.id, TARGET, {"pending": targets_added})
+    bump_list_version(db, current_user.id, "posts")
     db.commit()
     db.refresh(db_post)
     
+    # Start building platform variants so they are ready by publish time
+    if db_post.media and db_post.targets:
+        enqueue_media_variants(db_post.id)
+    
     return db_post
 
 @router.post("/upload-media", response_model=FileUploadResponse)
 def upload_media(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
-    """Upload media file to S3."""
-    # For now, return mock data - in production, integrate with S3
-    return FileUploadResponse(
-        filename=file.filename,
-        s3_key=f"media/{file.filename}",
-        url=f"https://example.com/media/{file.filename}",
-        size=1024,
-        content_type=file.content_type or "application/octet-stream"
-    )
+    """Upload media file to S3, reusing the user's stored object for identical content."""
+    return FileUploadResponse(**s3_service.upload_file(file, db, current_user.id))
+
+@router.delete("/{post_id}")
+def delete_post(
+    post_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Delete a post and reclaim media objects no other post refers to."""
+    # Lock the post so a concurrent publish cannot queue targets mid-delete
+    post = db.query(Post).filter(
+        Post.id == post_id,
+        Post.user_id == current_user.id
+    ).with_for_update().first()
+    
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found"
+        )
+    
+    if any(target.platform_status in ("publishing", "published") for target in post.targets):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Post has been published or is publishing"
+        )
+    
+    s3_keys = [media.s3_key for media in post.media]
+    target_ids = [target.id for target in post.targets]
+    
+    # Counters change in the same transaction as the rows they count
+    adjust_status_counts(db, current_user.id, POST, {post.status: -1})
+    adjust_status_counts(db, current_user.id, TARGET, {
+        platform_status: -count
+        for platform_status, count in Counter(target.platform_status for target in post.targets).items()
+    })
+    if target_ids:
+        db.query(PostTargetMetric).filter(PostTargetMetric.target_id.in_(target_ids)).delete(synchronize_session=False)
+    for child in post.targets + post.media:
+        db.delete(child)
+    db.delete(post)
+    unreferenced = s3_service.release_references(db, current_user.id, s3_keys)
+    bump_list_version(db, current_user.id, "posts")
+    db.commit()
+    
+    # Objects are removed only after the post is gone; delete_file re-checks
+    # the count in case another post picked the object up in between
+    for s3_key in unreferenced:
+        s3_service.delete_file(s3_key, db)
+    
+    return {"message": "Post deleted successfully"}
 
 @router.post("/{post_id}/publish")
 def publish_post(
     post_id: int,
     target_accounts: Optional[List[int]] = None,
+    backfill: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Publish a post to selected social accounts."""
+    """Publish a post to selected social accounts.
+
+    Set `backfill` for bulk campaigns and catch-up work: those targets yield
+    to immediate publishes from every user.
+    """
     post = db.query(Post).filter(
         Post.id == post_id,
         Post.user_id == current_user.id
@@ -110,12 +255,57 @@ def publish_post(
     if not target_accounts:
         target_accounts = [account.id for account in current_user.social_accounts]
     
+    accounts = db.query(SocialAccount).filter(
+        SocialAccount.id.in_(target_accounts),
+        SocialAccount.user_id == current_user.id
+    ).all()
+    existing_targets = {target.social_account_id: target for target in post.targets}
+    
+    queued = []
+    for account in accounts:
+        target = existing_targets.get(account.id)
+        if target is None:
+            target = PostTarget(
+                post_id=post.id,
+                social_account_id=account.id,
+                platform_status="pending"
+            )
+            db.add(target)
+            count_transition(db, current_user.id, TARGET, None, "pending")
+        elif target.platform_status in ("publishing", "published"):
+            continue
+        else:
+            count_transition(db, current_user.id, TARGET, target.platform_status, "pending")
+            target.platform_status = "pending"
+            target.last_error = None
+            target.lease_reaps = 0
+        queued.append((target, account.provider))
+    
+    if not queued:
+        # Every target is already publishing or published (or no account
+        # matched): nothing would move the post out of "publishing" again
+        return {
+            "message": "Post has no accounts left to publish to",
+            "post_id": post_id,
+            "target_accounts": []
+        }
+    
     # Update post status
+    count_transition(db, current_user.id, POST, post.status, "publishing")
     post.status = "publishing"
+    bump_list_version(db, current_user.id, "posts")
     db.commit()
     
+    # Video variants are encoded on the media queue, not by the publish tasks
+    if post.media:
+        enqueue_media_variants(post.id)
+    lane = "backfill" if backfill else "immediate"
+    for target, provider in queued:
+        enqueue_publish(target.id, provider, current_user.id, lane, social_account_id=target.social_account_id)
+    publish_status_event(current_user.id, post.id, post.status)
+    
     return {
-        "message": f"Post queued for publishing to {len(target_accounts)} accounts",
+        "message": f"Post queued for publishing to {len(queued)} accounts",
         "post_id": post_id,
-        "target_accounts": target_accounts
+        "target_accounts": [target.social_account_id for target, _ in queued]
     }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 # User schemas
@@ -90,6 +90,18 @@ class PostUpdate(BaseModel):
     scheduled_at: Optional[datetime] = None
     status: Optional[str] = None
 
+class PostStatsResponse(BaseModel):
+    total_posts: int
+    posts: Dict[str, int]
+    targets: Dict[str, int]
+
+class PostSearchResult(PostResponse):
+    rank: float
+
+class PostSearchResponse(BaseModel):
+    items: List[PostSearchResult]
+    next_cursor: Optional[str] = None
+
 # Post Target schemas
 class PostTargetBase(BaseModel):
     social_account_id: int
@@ -128,3 +140,7 @@ class FileUploadResponse(BaseModel):
     url: str
     size: int
     content_type: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    content_sha256: Optional[str] = None
+    deduplicated: bool = False
@@ -0,0 +1,128 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Optional
+from sqlalchemy.orm import Session
+from models import PostTarget
+from services.publish_leases import LeaseLost, renew_leases
+from config import VIDEO_UPLOAD_CHUNK_SIZE, VIDEO_UPLOAD_MAX_IN_FLIGHT
+
+class S3RangeReader:
+    """Forward-only reader over an S3 object, fed by ranged GETs fetched in parallel.
+
+    Up to `max_in_flight` blocks are requested ahead of the consumer, so the
+    next chunk is usually already downloaded when the platform acknowledges
+    the current one, and memory stays around (max_in_flight + 1) * block_size
+    regardless of the object size.
+    """
+
+    def __init__(
+        self,
+        s3_key: str,
+        size: int,
+        offset: int = 0,
+        block_size: int = VIDEO_UPLOAD_CHUNK_SIZE,
+        max_in_flight: int = VIDEO_UPLOAD_MAX_IN_FLIGHT
+    ):
+        self.s3_key = s3_key
+        self.size = size
+        self.block_size = block_size
+        self.max_in_flight = max(1, max_in_flight)
+        self.position = offset
+        self._next_offset = offset  # First byte not yet requested
+        self._buffer = bytearray()
+        self._pending: Deque[Future] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="s3-range")
+
+    @property
+    def s3(self):
+        from services.s3 import s3_service
+        return s3_service
+
+    def _fill(self) -> None:
+        while len(self._pending) < self.max_in_flight and self._next_offset < self.size:
+            end = min(self._next_offset + self.block_size, self.size)
+            self._pending.append(self._executor.submit(self.s3.get_range, self.s3_key, self._next_offset, end - 1))
+            self._next_offset = end
+
+    def _discard_ahead(self, offset: int) -> None:
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._buffer.clear()
+        self.position = self._next_offset = offset
+
+    def read(self, start: int, end: int) -> bytes:
+        """Return bytes [start, end); `start` must not precede the previous read's end."""
+        if start < self.position:
+            raise ValueError(f"S3RangeReader reads forward only ({start} < {self.position})")
+        end = min(end, self.size)
+        if start >= self._next_offset:
+            self._discard_ahead(start)
+        while self.position + len(self._buffer) < end:
+            self._fill()
+            if not self._pending:
+                break
+            self._buffer += self._pending.popleft().result()
+        self._fill()
+
+        del self._buffer[:start - self.position]
+        chunk = bytes(self._buffer[:end - start])
+        del self._buffer[:end - start]
+        self.position = start + len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._buffer.clear()
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self) -> "S3RangeReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class UploadCheckpoint:
+    """Chunked-upload progress for one PostTarget, committed after every acknowledged chunk.
+
+    A retried publish task loads the checkpoint and continues the platform
+    upload session from the last acknowledged chunk instead of starting over.
+    Each save also renews the publishing worker's lease on the target, so long
+    uploads heartbeat without extra writes.
+    """
+
+    def __init__(self, db: Session, target: PostTarget, lease_owner: Optional[str] = None):
+        self.db = db
+        self.target = target
+        self.lease_owner = lease_owner
+
+    def load(self, s3_key: str) -> Optional[Dict[str, Any]]:
+        """Return the saved state for this media, unless it belongs to other media or has expired."""
+        state = self.target.upload_state
+        if not state or state.get("s3_key") != s3_key or state.get("expires_at", 0) <= time.time():
+            return None
+        return dict(state)
+
+    def _renew_lease(self) -> None:
+        if self.lease_owner and not renew_leases(self.db, [self.target.id], self.lease_owner):
+            self.db.rollback()
+            raise LeaseLost(f"Target {self.target.id} was taken over by another worker")
+
+    def heartbeat(self) -> None:
+        """Renew the lease on the target, raising LeaseLost if it has been reaped."""
+        self._renew_lease()
+        self.db.commit()
+
+    def save(self, state: Dict[str, Any]) -> None:
+        self._renew_lease()
+        # Assign a new dict so the JSON column is flagged dirty
+        self.target.upload_state = dict(state)
+        self.db.commit()
+
+    def clear(self) -> None:
+        if self.target.upload_state is not None:
+            self.target.upload_state = None
+            self.db.commit()
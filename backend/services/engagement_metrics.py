@@ -0,0 +1,168 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from cryptography.fernet import InvalidToken
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from config import METRICS_MAX_AGE_DAYS
+from models import PostTarget, PostTargetMetric, SocialAccount
+from oauth import get_decrypted_token
+from services.publishers import PUBLISHERS, PublishError, TikTokPublisher
+
+logger = logging.getLogger(__name__)
+
+# (post age below, refresh interval): fresh posts move fast, older ones are
+# sampled less and less often, and daily until METRICS_MAX_AGE_DAYS
+REFRESH_SCHEDULE = (
+    (timedelta(hours=6), timedelta(minutes=15)),
+    (timedelta(days=2), timedelta(hours=1)),
+    (timedelta(days=7), timedelta(hours=6)),
+)
+DEFAULT_REFRESH_INTERVAL = timedelta(days=1)
+
+# Targets whose platform call failed outright (rate limit, outage) are retried after this
+RETRY_DELAY = timedelta(minutes=10)
+
+def next_refresh(published_at: Optional[datetime], now: datetime) -> Optional[datetime]:
+    """When to sample a target next, or None once it is too old to follow."""
+    if published_at is None:
+        published_at = now
+    elif published_at.tzinfo is None:
+        # SQLite hands timestamps back without their zone
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    age = now - published_at
+    if age >= timedelta(days=METRICS_MAX_AGE_DAYS):
+        return None
+    for max_age, interval in REFRESH_SCHEDULE:
+        if age < max_age:
+            return now + interval
+    return now + DEFAULT_REFRESH_INTERVAL
+
+def ingest_due_metrics(db: Session, limit: int) -> Dict[str, Any]:
+    """Sample engagement for up to `limit` published targets that are due.
+
+    Due targets are claimed by pushing their due time out, then fetched per
+    platform in the largest batches it allows (Graph API batch requests of
+    50, TikTok video queries of 20 per account). The samples are appended
+    with one bulk INSERT and the next due times written with one bulk UPDATE.
+    """
+    now = datetime.now(timezone.utc)
+    rows = (
+        db.query(
+            PostTarget.id,
+            PostTarget.platform_post_id,
+            PostTarget.published_at,
+            PostTarget.social_account_id,
+            SocialAccount.provider
+        )
+        .join(SocialAccount, SocialAccount.id == PostTarget.social_account_id)
+        .filter(
+            PostTarget.platform_status == "published",
+            PostTarget.metrics_due_at <= now,
+            PostTarget.platform_post_id.isnot(None)
+        )
+        .order_by(PostTarget.metrics_due_at)
+        .limit(limit)
+        .with_for_update(of=PostTarget, skip_locked=True)
+        .all()
+    )
+    stats = {"due": len(rows), "sampled": 0, "unavailable": 0, "deferred": 0}
+    if not rows:
+        db.rollback()
+        return stats
+    # An overlapping run skips these, and a crashed one leaves them to be retried
+    db.execute(update(PostTarget), [{"id": row.id, "metrics_due_at": now + RETRY_DELAY} for row in rows])
+    db.commit()
+
+    tokens = {}
+    for account in db.query(SocialAccount).filter(SocialAccount.id.in_({row.social_account_id for row in rows})):
+        try:
+            tokens[account.id] = get_decrypted_token(account)
+        except InvalidToken:
+            logger.warning("Cannot decrypt the token of social account %s; skipping its metrics", account.id)
+    post_ids = {row.id: row.platform_post_id for row in rows}
+    schedule: Dict[int, Optional[datetime]] = {}
+    resolved: List[Dict[str, Any]] = []
+
+    # One unreadable token must not sink the run: its rows wait for their next sample
+    for row in rows:
+        if row.social_account_id not in tokens:
+            schedule[row.id] = next_refresh(row.published_at, now)
+            stats["unavailable"] += 1
+
+    # Rows of a rate-limited platform keep their retry due time and get no more calls this run
+    throttled = set()
+    deferred = set()
+
+    # TikTok returns a publish id when posting; metrics need the public video id
+    for row in rows:
+        if row.provider != "tiktok" or row.platform_post_id.isdigit() or row.id in schedule:
+            continue
+        if row.provider in throttled:
+            deferred.add(row.id)
+            continue
+        try:
+            video_id = TikTokPublisher.resolve_video_id(row.platform_post_id, tokens[row.social_account_id])
+        except PublishError as e:
+            logger.warning("Resolving TikTok publish %s failed: %s", row.platform_post_id, e)
+            if e.retryable:
+                throttled.add(row.provider)
+                deferred.add(row.id)
+                continue
+            video_id = None
+        if video_id is None:
+            schedule[row.id] = next_refresh(row.published_at, now)
+            stats["unavailable"] += 1
+        else:
+            post_ids[row.id] = video_id
+            resolved.append({"id": row.id, "platform_post_id": video_id})
+
+    batches: Dict[Any, List[Any]] = defaultdict(list)
+    for row in rows:
+        if row.id in schedule or row.id in deferred:
+            continue
+        publisher = PUBLISHERS[row.provider]
+        key = (row.provider, row.social_account_id) if publisher.METRICS_BATCH_PER_ACCOUNT else row.provider
+        batches[key].append(row)
+
+    samples: List[Dict[str, Any]] = []
+    for batch_rows in batches.values():
+        provider = batch_rows[0].provider
+        publisher = PUBLISHERS[provider]
+        for start in range(0, len(batch_rows), publisher.METRICS_BATCH_SIZE):
+            chunk = batch_rows[start:start + publisher.METRICS_BATCH_SIZE]
+            if provider in throttled:
+                deferred.update(row.id for row in chunk)
+                continue
+            try:
+                metrics = publisher.fetch_metrics([(post_ids[row.id], tokens[row.social_account_id]) for row in chunk])
+            except PublishError as e:
+                logger.warning("Fetching %s metrics for %d targets failed: %s", provider, len(chunk), e)
+                if e.retryable:
+                    throttled.add(provider)
+                    deferred.update(row.id for row in chunk)
+                else:
+                    # Retrying soon would fail the same way: wait for the normal schedule
+                    for row in chunk:
+                        schedule[row.id] = next_refresh(row.published_at, now)
+                    stats["unavailable"] += len(chunk)
+                continue
+            for row, values in zip(chunk, metrics):
+                schedule[row.id] = next_refresh(row.published_at, now)
+                if values is None:
+                    # Deleted, hidden or not yet visible: try again on the normal schedule
+                    stats["unavailable"] += 1
+                    continue
+                samples.append({"target_id": row.id, "collected_at": now, **values})
+
+    if samples:
+        db.execute(insert(PostTargetMetric), samples)
+    if resolved:
+        db.execute(update(PostTarget), resolved)
+    if schedule:
+        db.execute(update(PostTarget), [{"id": target_id, "metrics_due_at": due} for target_id, due in schedule.items()])
+    db.commit()
+    stats["sampled"] = len(samples)
+    stats["deferred"] = len(deferred)
+    return stats
@@ -0,0 +1,207 @@
+import time
+import uuid
+from typing import Callable, Dict, Optional
+import redis
+from config import (
+    REDIS_URL,
+    CELERY_BROKER_URL,
+    FAIR_QUEUE_DEPTH,
+    FAIR_LANE_WEIGHTS,
+    FAIR_TENANT_MAX_IN_FLIGHT,
+    FAIR_TENANT_MAX_IN_FLIGHT_OVERRIDES,
+    FAIR_IN_FLIGHT_TTL_SECONDS
+)
+
+LANES = ("immediate", "backfill")
+
+# Append a target to a tenant's queue and put the tenant on the ring if it
+# was idle. Atomic with _RETIRE_TENANT so a tenant can never be left off the
+# ring while it still has work.
+_SUBMIT = """
+redis.call('RPUSH', KEYS[1], ARGV[1])
+if redis.call('SADD', KEYS[2], ARGV[2]) == 1 then
+    redis.call('RPUSH', KEYS[3], ARGV[2])
+end
+"""
+
+_RETIRE_TENANT = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+    redis.call('LREM', KEYS[3], 0, ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class FairScheduler:
+    """Weighted round-robin dispatch of publish work across tenants.
+
+    Work items (target ids, or account batches) wait in per-user Redis lists,
+    one set per platform and lane. `dispatch` keeps each platform's Celery
+    queue topped up to a small depth by taking one item per tenant in turn, so a tenant with thousands of
+    queued targets gets the same share as one with a single post. Lanes are
+    interleaved by weight (immediate ahead of backfill, which is never
+    starved), and a tenant with `max_in_flight` tasks already dispatched is
+    skipped until some finish. In-flight entries expire after `in_flight_ttl`
+    so a killed worker cannot hold a tenant's slots forever.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, str], None],
+        redis_url: str = REDIS_URL,
+        queue_depth: Optional[Callable[[str], int]] = None,
+        target_depth: int = FAIR_QUEUE_DEPTH,
+        lane_weights: Dict[str, int] = FAIR_LANE_WEIGHTS,
+        max_in_flight: int = FAIR_TENANT_MAX_IN_FLIGHT,
+        max_in_flight_overrides: Dict[int, int] = FAIR_TENANT_MAX_IN_FLIGHT_OVERRIDES,
+        in_flight_ttl: int = FAIR_IN_FLIGHT_TTL_SECONDS,
+        key_prefix: str = "fair",
+        clock: Callable[[], float] = time.time
+    ):
+        self.send = send
+        self.redis_url = redis_url
+        self.queue_depth = queue_depth or self._broker_queue_depth
+        self.target_depth = target_depth
+        self.lane_weights = {lane: max(1, lane_weights.get(lane, 1)) for lane in LANES}
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_overrides = max_in_flight_overrides
+        self.in_flight_ttl = in_flight_ttl
+        self.key_prefix = key_prefix
+        self.clock = clock
+        self._client: Optional[redis.Redis] = None
+        self._broker: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url, decode_responses=True)
+            self._submit = self._client.register_script(_SUBMIT)
+            self._retire = self._client.register_script(_RETIRE_TENANT)
+            self._release_lock = self._client.register_script(_RELEASE_LOCK)
+        return self._client
+
+    def _broker_queue_depth(self, provider: str) -> int:
+        # With the Redis transport each Celery queue is a list named after it
+        if not CELERY_BROKER_URL.startswith(("redis://", "rediss://")):
+            return 0
+        if self._broker is None:
+            self._broker = redis.Redis.from_url(CELERY_BROKER_URL)
+        return self._broker.llen(provider)
+
+    def _key(self, provider: str, *parts: str) -> str:
+        return ":".join((self.key_prefix, provider) + parts)
+
+    def cap_for(self, user_id: int) -> int:
+        return self.max_in_flight_overrides.get(user_id, self.max_in_flight)
+
+    def submit(self, provider: str, user_id: int, item: str, lane: str = "immediate") -> None:
+        """Queue a work item (a target id, or an account batch) behind its tenant's earlier work."""
+        client = self.client
+        self._submit(
+            keys=[
+                self._key(provider, lane, "q", str(user_id)),
+                self._key(provider, lane, "active"),
+                self._key(provider, lane, "ring"),
+            ],
+            args=[item, user_id],
+            client=client
+        )
+
+    def in_flight(self, provider: str, user_id: int) -> int:
+        key = self._key(provider, "inflight", str(user_id))
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, "-inf", self.clock())
+        pipe.zcard(key)
+        return pipe.execute()[1]
+
+    def release(self, provider: str, user_id: int, item: str) -> None:
+        """Free the tenant slot held by a finished work item."""
+        self.client.zrem(self._key(provider, "inflight", str(user_id)), item)
+
+    def backlog(self, provider: str) -> Dict[str, int]:
+        """Queued targets per lane (for metrics and the simulation)."""
+        client = self.client
+        totals = {}
+        for lane in LANES:
+            tenants = client.smembers(self._key(provider, lane, "active"))
+            pipe = client.pipeline()
+            for tenant in tenants:
+                pipe.llen(self._key(provider, lane, "q", tenant))
+            totals[lane] = sum(pipe.execute()) if tenants else 0
+        return totals
+
+    def dispatch(self, provider: str, budget: Optional[int] = None) -> int:
+        """Move up to `budget` items (default: the platform queue's free depth) to Celery."""
+        if budget is None:
+            budget = self.target_depth - self.queue_depth(provider)
+        if budget <= 0:
+            return 0
+        client = self.client
+        lock_key = self._key(provider, "dispatch-lock")
+        token = uuid.uuid4().hex
+        if not client.set(lock_key, token, nx=True, px=10_000):
+            return 0  # Another dispatcher is filling this queue
+        try:
+            sent = 0
+            exhausted = set()
+            while sent < budget and len(exhausted) < len(LANES):
+                for lane in LANES:
+                    if lane in exhausted or sent >= budget:
+                        continue
+                    taken = self._take(provider, lane, min(self.lane_weights[lane], budget - sent))
+                    if not taken:
+                        exhausted.add(lane)
+                    sent += taken
+            return sent
+        finally:
+            self._release_lock(keys=[lock_key], args=[token], client=client)
+
+    def _take(self, provider: str, lane: str, limit: int) -> int:
+        """Take up to `limit` items from a lane, one per tenant per pass over its ring."""
+        taken = 0
+        while taken < limit:
+            passed = self._pass(provider, lane, limit - taken)
+            if not passed:
+                break
+            taken += passed
+        return taken
+
+    def _pass(self, provider: str, lane: str, limit: int) -> int:
+        client = self.client
+        ring = self._key(provider, lane, "ring")
+        active = self._key(provider, lane, "active")
+        taken = 0
+        for _ in range(client.llen(ring)):
+            if taken >= limit:
+                break
+            user_id = client.lmove(ring, ring, "LEFT", "RIGHT")
+            if user_id is None:
+                break
+            if self.in_flight(provider, int(user_id)) >= self.cap_for(int(user_id)):
+                continue
+            queue = self._key(provider, lane, "q", user_id)
+            item = client.lpop(queue)
+            if item is None:
+                self._retire(keys=[queue, active, ring], args=[user_id], client=client)
+                continue
+            in_flight = self._key(provider, "inflight", user_id)
+            client.zadd(in_flight, {item: self.clock() + self.in_flight_ttl})
+            try:
+                self.send(provider, item)
+            except Exception:
+                # Put the item back at the head of its tenant's queue so it is not lost
+                client.lpush(queue, item)
+                client.zrem(in_flight, item)
+                raise
+            taken += 1
+            if client.llen(queue) == 0:
+                self._retire(keys=[queue, active, ring], args=[user_id], client=client)
+        return taken
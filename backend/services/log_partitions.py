@@ -0,0 +1,152 @@
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import text, select, delete, table, column
+from sqlalchemy.orm import Session
+from models import Log
+
+PARTITION_PREFIX = "logs_p"
+DEFAULT_PARTITION = "logs_default"
+
+# Matches the bounds of a range partition, e.g.
+# "FOR VALUES FROM ('2025-01-01 00:00:00+00') TO ('2025-02-01 00:00:00+00')"
+# or "FOR VALUES FROM (MINVALUE) TO ('2025-02-01 00:00:00+00')"
+_BOUNDS_RE = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+def is_partitioned(db: Session) -> bool:
+    """Return True when the logs table is natively partitioned (PostgreSQL only)."""
+    if db.bind.dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'logs')"
+    )).scalar())
+
+def month_start(value: datetime) -> datetime:
+    """Truncate a datetime to the first instant of its month (UTC)."""
+    return value.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month-aligned datetime by a number of months."""
+    month_index = value.month - 1 + months
+    return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+
+def partition_name(start: datetime) -> str:
+    """Name of the monthly partition starting at `start`."""
+    return f"{PARTITION_PREFIX}{start:%Y_%m}"
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    parsed = datetime.fromisoformat(value.strip("'"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def list_range_partitions(db: Session) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+    """Return (name, lower, upper) for every range partition of logs; None means unbounded."""
+    rows = db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'logs'::regclass"
+    )).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUNDS_RE.search(bound or "")
+        if match:  # the DEFAULT partition has no bounds
+            partitions.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return partitions
+
+def ensure_log_partitions(db: Session, now: Optional[datetime] = None, months_ahead: int = 2) -> List[str]:
+    """Create monthly partitions for the current month and `months_ahead` months after it.
+
+    Months already covered by an existing range (such as the legacy partition
+    attached by the migration) are skipped. Rows of a new month that already
+    landed in the default partition are moved into the month's partition
+    first, since PostgreSQL refuses to create a partition while the default
+    one holds rows in its range. All of this runs in the caller's transaction.
+    """
+    now = now or datetime.now(timezone.utc)
+    existing = list_range_partitions(db)
+    has_default = db.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}
+    ).scalar()
+    created = []
+    current = month_start(now)
+    for offset in range(months_ahead + 1):
+        start = add_months(current, offset)
+        end = add_months(start, 1)
+        overlaps = any(
+            (lower is None or lower < end) and (upper is None or upper > start)
+            for _, lower, upper in existing
+        )
+        if overlaps:
+            continue
+        name = partition_name(start)
+        bounds = {"start": start, "end": end}
+        stranded = has_default and db.execute(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= :start AND created_at < :end)"
+        ), bounds).scalar()
+        if stranded:
+            db.execute(text(f"ALTER TABLE logs DETACH PARTITION {DEFAULT_PARTITION}"))
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        if stranded:
+            # With the default detached, re-inserted rows route to the new partition
+            db.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                f"INSERT INTO logs SELECT * FROM moved"
+            ), bounds)
+            db.execute(text(f"ALTER TABLE logs ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        existing.append((name, start, end))
+        created.append(name)
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF logs DEFAULT"))
+    return created
+
+def drop_expired_log_partitions(db: Session, cutoff: datetime) -> List[str]:
+    """Drop every range partition whose upper bound is at or before `cutoff`.
+
+    This is a catalog operation, so its cost depends on the number of
+    partitions rather than the number of rows they hold.
+    """
+    dropped = []
+    for name, _, upper in list_range_partitions(db):
+        if upper is not None and upper <= cutoff:
+            db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            dropped.append(name)
+    return dropped
+
+def delete_expired_logs_batched(
+    db: Session,
+    cutoff: datetime,
+    batch_size: int,
+    max_batches: int,
+    partition: Optional[str] = None
+) -> int:
+    """Delete logs older than `cutoff` in bounded chunks, committing after each one.
+
+    With `partition` set, only that partition is touched; on a partitioned
+    table this is the default partition, since expired monthly partitions are
+    dropped whole instead. At most `max_batches * batch_size` rows are removed
+    per call; whatever is left over is picked up by the next scheduled run.
+    """
+    logs = Log.__table__ if partition is None else table(partition, column("id"), column("created_at"))
+    deleted = 0
+    for _ in range(max_batches):
+        expired_ids = (
+            select(logs.c.id)
+            .where(logs.c.created_at < cutoff)
+            .order_by(logs.c.created_at)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            delete(logs).where(logs.c.id.in_(expired_ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    return deleted
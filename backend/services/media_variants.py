@@ -0,0 +1,421 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models import PostMedia
+from config import (
+    MEDIA_VARIANT_WORKERS,
+    MEDIA_VARIANT_TIMEOUT_SECONDS,
+    MEDIA_VARIANT_KNOWN_KEYS_MAX,
+    FFMPEG_BINARY,
+    FFPROBE_BINARY
+)
+
+logger = logging.getLogger(__name__)
+
+# Target profiles per platform and media type. Aspect ratios are width/height.
+MEDIA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "facebook_image": {
+        "kind": "image", "max_width": 2048, "max_height": 2048,
+        "min_aspect": None, "max_aspect": None, "quality": 85, "max_bytes": 4 * 1024 * 1024,
+    },
+    "instagram_image": {
+        "kind": "image", "max_width": 1440, "max_height": 1800,
+        "min_aspect": 4 / 5, "max_aspect": 1.91, "quality": 85, "max_bytes": 8 * 1024 * 1024,
+    },
+    "facebook_video": {
+        "kind": "video", "max_width": 1920, "max_height": 1920, "max_duration": 14400,
+        "video_bitrate": "8M", "audio_bitrate": "128k",
+    },
+    "instagram_video": {
+        "kind": "video", "max_width": 1080, "max_height": 1920, "max_duration": 900,
+        "video_bitrate": "5M", "audio_bitrate": "128k",
+    },
+    "tiktok_video": {
+        "kind": "video", "max_width": 1080, "max_height": 1920, "max_duration": 600,
+        "video_bitrate": "6M", "audio_bitrate": "128k",
+    },
+}
+
+PLATFORM_PROFILES: Dict[str, Dict[str, str]] = {
+    "facebook": {"image": "facebook_image", "video": "facebook_video"},
+    "instagram": {"image": "instagram_image", "video": "instagram_video"},
+    "tiktok": {"video": "tiktok_video"},
+}
+
+VARIANT_FORMATS = {"image": ("jpg", "image/jpeg"), "video": ("mp4", "video/mp4")}
+
+# How often a caller waiting on transforms gets its heartbeat called (publish leases last minutes)
+HEARTBEAT_INTERVAL_SECONDS = 30
+
+class VariantRejected(ValueError):
+    """Raised when media cannot be made to fit a platform profile, e.g. a video over its length limit."""
+
+class VariantPending(Exception):
+    """Raised when a video variant is not built yet; building it is left to the media queue."""
+
+def variant_key(content_sha256: str, profile: str) -> str:
+    """S3 key of a variant; the same source bytes and profile always map to the same key."""
+    extension = VARIANT_FORMATS[MEDIA_PROFILES[profile]["kind"]][0]
+    return f"variants/{content_sha256}/{profile}.{extension}"
+
+def source_marker_key(content_sha256: str, profile: str) -> str:
+    """S3 key of the empty marker recording that the last build published the source unchanged."""
+    return f"variants/{content_sha256}/{profile}.source"
+
+def transform_image(source_path: str, output_path: str, profile: Dict[str, Any]) -> bool:
+    """Crop to the allowed aspect range, downscale and recompress an image as JPEG."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as opened:
+        image = ImageOps.exif_transpose(opened)
+        width, height = image.size
+        aspect = width / height
+        if profile["min_aspect"] and aspect < profile["min_aspect"]:
+            new_height = int(width / profile["min_aspect"])
+            top = (height - new_height) // 2
+            image = image.crop((0, top, width, top + new_height))
+        elif profile["max_aspect"] and aspect > profile["max_aspect"]:
+            new_width = int(height * profile["max_aspect"])
+            left = (width - new_width) // 2
+            image = image.crop((left, 0, left + new_width, height))
+        image.thumbnail((profile["max_width"], profile["max_height"]), Image.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        quality = profile["quality"]
+        while True:
+            image.save(output_path, "JPEG", quality=quality, optimize=True, progressive=True)
+            if os.path.getsize(output_path) <= profile["max_bytes"] or quality <= 50:
+                return True
+            quality -= 10
+
+def probe_duration(source_path: str) -> Optional[float]:
+    """Duration of a video in seconds, or None when ffprobe is missing or cannot tell."""
+    if shutil.which(FFPROBE_BINARY) is None:
+        return None
+    result = subprocess.run(
+        [
+            FFPROBE_BINARY, "-v", "error", "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", source_path,
+        ],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+def transform_video(source_path: str, output_path: str, profile: Dict[str, Any]) -> bool:
+    """Re-encode a video to H.264/AAC MP4 within the profile limits using ffmpeg.
+
+    Returns False when ffmpeg is not installed, in which case the source is
+    published unchanged. Videos longer than the profile allows are rejected
+    rather than cut short.
+    """
+    if shutil.which(FFMPEG_BINARY) is None:
+        return False
+    duration = probe_duration(source_path)
+    if duration is not None and duration > profile["max_duration"]:
+        raise VariantRejected(f"video is {duration:.0f}s long; the limit is {profile['max_duration']}s")
+    max_width, max_height = profile["max_width"], profile["max_height"]
+    scale = (
+        f"scale='min({max_width},iw)':'min({max_height},ih)':force_original_aspect_ratio=decrease,"
+        "scale=trunc(iw/2)*2:trunc(ih/2)*2"
+    )
+    subprocess.run(
+        [
+            FFMPEG_BINARY, "-y", "-loglevel", "error", "-i", source_path,
+            "-vf", scale,
+            "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "high", "-pix_fmt", "yuv420p",
+            "-maxrate", profile["video_bitrate"], "-bufsize", profile["video_bitrate"],
+            "-c:a", "aac", "-b:a", profile["audio_bitrate"], "-ar", "44100",
+            "-movflags", "+faststart",
+            output_path,
+        ],
+        check=True,
+        timeout=MEDIA_VARIANT_TIMEOUT_SECONDS,
+    )
+    return True
+
+def _transform(source_path: str, output_path: str, profile_name: str) -> bool:
+    # Runs in a pool process: must stay a top-level, picklable function.
+    profile = MEDIA_PROFILES[profile_name]
+    if profile["kind"] == "image":
+        return transform_image(source_path, output_path, profile)
+    return transform_video(source_path, output_path, profile)
+
+class MediaVariantService:
+    """Produces and caches platform-compliant variants of post media.
+
+    Transformations run in a process pool so image resampling and video
+    encoding use every core without holding the worker's GIL. Variants are
+    stored in S3 under keys derived from the source hash and profile, so each
+    one is computed once and then reused by every post and retry that needs it.
+    """
+
+    def __init__(self, max_workers: int = MEDIA_VARIANT_WORKERS, known_keys_max: int = MEDIA_VARIANT_KNOWN_KEYS_MAX):
+        self.max_workers = max_workers
+        self.known_keys_max = known_keys_max
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # LRU of keys seen in S3, and the keys this process is building right
+        # now; neither grows past its bound for the life of the worker
+        self._known_keys: "OrderedDict[str, None]" = OrderedDict()
+        self._building: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    @property
+    def s3(self):
+        from services.s3 import s3_service
+        return s3_service
+
+    def _remember(self, key: str) -> None:
+        with self._lock:
+            self._known_keys[key] = None
+            self._known_keys.move_to_end(key)
+            while len(self._known_keys) > self.known_keys_max:
+                self._known_keys.popitem(last=False)
+
+    def _exists(self, key: str) -> bool:
+        with self._lock:
+            if key in self._known_keys:
+                self._known_keys.move_to_end(key)
+                return True
+        if self.s3.object_exists(key):
+            self._remember(key)
+            return True
+        return False
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """The future resolving to `key`'s published S3 key, and whether the caller must build it."""
+        with self._lock:
+            building = self._building.get(key)
+            if building is not None:
+                return building, False
+            building = self._building[key] = Future()
+            return building, True
+
+    def _settle(self, key: str, claim: Future, result: Optional[str] = None, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            self._building.pop(key, None)
+        if error is not None:
+            claim.set_exception(error)
+        else:
+            claim.set_result(result)
+
+    def _cached_key(self, media: PostMedia, profile: str, accept_source: bool = False) -> Optional[str]:
+        """The built variant's key, or with `accept_source` the source key when the last build fell back to it."""
+        if not media.content_sha256:
+            return None
+        if self._exists(variant_key(media.content_sha256, profile)):
+            return variant_key(media.content_sha256, profile)
+        if accept_source and self._exists(source_marker_key(media.content_sha256, profile)):
+            return media.s3_key
+        return None
+
+    def _fall_back(self, media: PostMedia, profile: str) -> str:
+        """Publish the source unchanged, and record that so publish tasks stop waiting for a variant.
+
+        Builds ignore the marker, so the next one (say, once ffmpeg is
+        installed) still tries to produce the real variant.
+        """
+        if media.content_sha256:
+            marker = source_marker_key(media.content_sha256, profile)
+            try:
+                self.s3.upload_bytes(b"", marker, "application/octet-stream")
+                self._remember(marker)
+            except Exception as e:
+                logger.warning("Could not record source fallback for %s: %s", media.s3_key, e)
+        return media.s3_key
+
+    def build_variants(
+        self,
+        db: Session,
+        jobs: List[Tuple[PostMedia, str]],
+        heartbeat: Optional[Callable[[], None]] = None
+    ) -> Tuple[Dict[Tuple[int, str], str], Dict[Tuple[int, str], str]]:
+        """Build the variants for (media, profile) pairs, all in parallel.
+
+        Each source is downloaded once and every transform is submitted to the
+        pool before any is waited on; a variant another thread of this process
+        is already building is awaited instead of built twice. `heartbeat` is
+        called while waiting. Returns the S3 key per pair (the original key
+        when a variant could not be built) and the reason per rejected pair.
+        """
+        keys: Dict[Tuple[int, str], str] = {}
+        rejected: Dict[Tuple[int, str], str] = {}
+        missing = []
+        for media, profile in dict.fromkeys(jobs):
+            cached = self._cached_key(media, profile)
+            if cached:
+                keys[(media.id, profile)] = cached
+            else:
+                missing.append((media, profile))
+        if not missing:
+            return keys, rejected
+
+        with tempfile.TemporaryDirectory(prefix="variant-") as workdir:
+            sources: Dict[int, Optional[str]] = {}
+            rehashed = False
+            for media, _ in missing:
+                if media.id in sources:
+                    continue
+                source_path = os.path.join(workdir, f"source-{media.id}")
+                try:
+                    with open(source_path, "wb") as source:
+                        content_sha256 = self.s3.download_to_file(media.s3_key, source)
+                except Exception as e:
+                    logger.warning("Could not download %s for variants: %s", media.s3_key, e)
+                    sources[media.id] = None
+                    continue
+                if media.content_sha256 != content_sha256:
+                    media.content_sha256 = content_sha256
+                    rehashed = True
+                sources[media.id] = source_path
+            if rehashed:
+                db.commit()
+
+            claims: Dict[Tuple[int, str], Future] = {}
+            builds = []
+            for media, profile in missing:
+                if sources[media.id] is None:
+                    keys[(media.id, profile)] = self._fall_back(media, profile)
+                    continue
+                key = variant_key(media.content_sha256, profile)
+                if self._exists(key):
+                    keys[(media.id, profile)] = key
+                    continue
+                claim, owner = self._claim(key)
+                claims[(media.id, profile)] = claim
+                if owner:
+                    extension, content_type = VARIANT_FORMATS[MEDIA_PROFILES[profile]["kind"]]
+                    output_path = os.path.join(workdir, f"{media.id}-{profile}.{extension}")
+                    try:
+                        transform = self.pool.submit(_transform, sources[media.id], output_path, profile)
+                    except Exception as e:
+                        logger.warning("Could not build %s variant of %s: %s", profile, media.s3_key, e)
+                        self._settle(key, claim, self._fall_back(media, profile))
+                        continue
+                    builds.append((transform, claim, key, output_path, content_type, media, profile))
+
+            deadline = time.monotonic() + MEDIA_VARIANT_TIMEOUT_SECONDS
+            running = {build[0] for build in builds}
+            while running and time.monotonic() < deadline:
+                _, running = wait(running, timeout=HEARTBEAT_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                if heartbeat is not None:
+                    heartbeat()
+
+            for transform, claim, key, output_path, content_type, media, profile in builds:
+                try:
+                    if not transform.done():
+                        transform.cancel()
+                        raise TimeoutError(f"not built within {MEDIA_VARIANT_TIMEOUT_SECONDS}s")
+                    if not transform.result():
+                        self._settle(key, claim, self._fall_back(media, profile))
+                        continue
+                    self.s3.upload_path(output_path, key, content_type)
+                    self._remember(key)
+                    self._settle(key, claim, key)
+                except VariantRejected as e:
+                    self._settle(key, claim, error=e)
+                except Exception as e:
+                    logger.warning("Could not build %s variant of %s: %s", profile, media.s3_key, e)
+                    self._settle(key, claim, self._fall_back(media, profile))
+
+            media_keys = {media.id: media.s3_key for media, _ in missing}
+            for (media_id, profile), claim in claims.items():
+                try:
+                    keys[(media_id, profile)] = claim.result(timeout=MEDIA_VARIANT_TIMEOUT_SECONDS)
+                except VariantRejected as e:
+                    rejected[(media_id, profile)] = str(e)
+                    keys[(media_id, profile)] = media_keys[media_id]
+                except Exception as e:
+                    logger.warning("Waiting for %s variant of media %s failed: %s", profile, media_id, e)
+                    keys[(media_id, profile)] = media_keys[media_id]
+        return keys, rejected
+
+    def variants_for(
+        self,
+        db: Session,
+        media_items: List[PostMedia],
+        platform: str,
+        build_videos: bool = True,
+        heartbeat: Optional[Callable[[], None]] = None
+    ) -> Dict[int, str]:
+        """Return the S3 key to publish for each media item on `platform`, building missing variants.
+
+        Media the platform has no profile for is published as is. With
+        `build_videos` off, a missing video variant raises VariantPending
+        instead of being encoded here, unless the last build fell back to the
+        source; a rejected one raises VariantRejected.
+        """
+        keys: Dict[int, str] = {}
+        jobs = []
+        for media in media_items:
+            profile = PLATFORM_PROFILES.get(platform, {}).get(media.type)
+            if profile is None:
+                keys[media.id] = media.s3_key
+                continue
+            if not build_videos and MEDIA_PROFILES[profile]["kind"] == "video":
+                cached = self._cached_key(media, profile, accept_source=True)
+                if cached is None:
+                    raise VariantPending(f"{platform} video variant of {media.s3_key} is still being prepared")
+                keys[media.id] = cached
+                continue
+            jobs.append((media, profile))
+        built, rejected = self.build_variants(db, jobs, heartbeat=heartbeat)
+        if rejected:
+            raise VariantRejected(next(iter(rejected.values())))
+        for media, profile in jobs:
+            keys[media.id] = built[(media.id, profile)]
+        return keys
+
+    def prepare(
+        self,
+        db: Session,
+        media_items: List[PostMedia],
+        platforms: List[str]
+    ) -> Tuple[Dict[str, Dict[int, str]], Dict[str, str]]:
+        """Build every variant needed to publish `media_items` to `platforms` in one parallel pass.
+
+        Returns the keys per platform and media id, and the rejection reason
+        per platform that cannot take the media.
+        """
+        jobs = [
+            (media, PLATFORM_PROFILES[platform][media.type])
+            for platform in platforms
+            for media in media_items
+            if media.type in PLATFORM_PROFILES.get(platform, {})
+        ]
+        built, rejected = self.build_variants(db, jobs)
+        variants: Dict[str, Dict[int, str]] = {}
+        rejections: Dict[str, str] = {}
+        for platform in platforms:
+            variants[platform] = {}
+            for media in media_items:
+                profile = PLATFORM_PROFILES.get(platform, {}).get(media.type)
+                if profile is None:
+                    variants[platform][media.id] = media.s3_key
+                    continue
+                variants[platform][media.id] = built[(media.id, profile)]
+                if (media.id, profile) in rejected:
+                    rejections[platform] = rejected[(media.id, profile)]
+        return variants, rejections
+
+# Global media variant service instance
+media_variant_service = MediaVariantService()
@@ -0,0 +1,204 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets tuned for API calls and short tasks (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TASK_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per HTTP request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in database queries per HTTP request",
+    ["route"], buckets=LATENCY_BUCKETS
+)
+CELERY_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds", "Time between publishing a task and a worker starting it",
+    ["queue", "task"], buckets=TASK_BUCKETS
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Task run time",
+    ["queue", "task", "state"], buckets=TASK_BUCKETS
+)
+CELERY_TASK_RETRIES = Counter(
+    "celery_task_retries_total", "Task retries", ["queue", "task"]
+)
+PLATFORM_API_LATENCY = Histogram(
+    "platform_api_request_seconds", "Latency of calls to social platform APIs",
+    ["platform", "endpoint", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_STREAMING_CONNECTIONS = Gauge(
+    "http_streaming_connections", "Open server-sent event streams by route",
+    ["route"], multiprocess_mode="livesum"
+)
+S3_UPLOAD_BYTES = Counter("s3_upload_bytes_total", "Bytes uploaded to S3")
+S3_UPLOAD_DURATION = Histogram(
+    "s3_upload_seconds", "S3 upload duration", buckets=LATENCY_BUCKETS
+)
+
+# [query count, query seconds] for the request being handled, if any
+_request_db_stats: ContextVar[Optional[List[float]]] = ContextVar("request_db_stats", default=None)
+
+_stats_sources: Dict[str, Callable[[], Dict[str, int]]] = {}
+
+class _StatsCollector:
+    """Exposes in-process `stats()` dictionaries (log sink, token cache) as gauges."""
+
+    def collect(self):
+        for name, source in list(_stats_sources.items()):
+            family = GaugeMetricFamily(f"{name}_stats", f"{name} internal counters", labels=["stat"])
+            for stat, value in source().items():
+                family.add_metric([stat], value)
+            yield family
+
+REGISTRY.register(_StatsCollector())
+
+def register_stats_source(name: str, source: Callable[[], Dict[str, int]]) -> None:
+    """Publish a component's `stats()` counters on the metrics endpoint."""
+    _stats_sources[name] = source
+
+def instrument_engine(engine: Engine) -> None:
+    """Count queries and query time against the current HTTP request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _request_db_stats.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_db_stats.get()
+        starts = conn.info.get("query_start")
+        if stats is not None and starts:
+            stats[0] += 1
+            stats[1] += time.perf_counter() - starts.pop()
+
+def _route(scope) -> str:
+    return getattr(scope.get("route"), "path", "unmatched")
+
+def _is_event_stream(message) -> bool:
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.split(b";", 1)[0].strip() == b"text/event-stream"
+    return False
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and per-request DB usage.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware to keep the cost on
+    the request path to a couple of timer reads and histogram observations.
+    Routes are labelled by their path template so label cardinality stays
+    bounded. Server-sent event streams stay open for minutes or hours, so
+    they are counted as open connections instead of entering the latency
+    histogram.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+        stream_route = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+                if _is_event_stream(message):
+                    stream_route[0] = _route(scope)
+                    HTTP_STREAMING_CONNECTIONS.labels(stream_route[0]).inc()
+            await send(message)
+
+        db_stats = [0, 0.0]
+        token = _request_db_stats.set(db_stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            _request_db_stats.reset(token)
+            route = _route(scope)
+            if stream_route[0] is not None:
+                HTTP_STREAMING_CONNECTIONS.labels(stream_route[0]).dec()
+            else:
+                HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code[0])).observe(duration)
+            HTTP_REQUEST_DB_QUERIES.labels(route).observe(db_stats[0])
+            HTTP_REQUEST_DB_SECONDS.labels(route).observe(db_stats[1])
+
+def _registry() -> CollectorRegistry:
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not multiproc_dir:
+        return REGISTRY
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def render_metrics() -> bytes:
+    """Serialize all metrics in the Prometheus text format."""
+    return generate_latest(_registry())
+
+def start_metrics_exporter(port: int) -> None:
+    """Serve metrics on a side port, for processes without an HTTP app (workers)."""
+    start_http_server(port, registry=_registry())
+
+def instrument_celery(app) -> None:
+    """Record queue wait, run time and retries for every task of `app`."""
+    from celery.signals import before_task_publish, task_prerun, task_postrun, task_retry
+
+    started: Dict[str, float] = {}
+
+    def _queue(task) -> str:
+        delivery_info = getattr(task.request, "delivery_info", None) or {}
+        return delivery_info.get("routing_key") or "celery"
+
+    @before_task_publish.connect(weak=False)
+    def _stamp_publish_time(headers=None, **kwargs):
+        if headers is not None:
+            headers.setdefault("published_at", time.time())
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id=None, task=None, **kwargs):
+        started[task_id] = time.perf_counter()
+        published_at = getattr(task.request, "published_at", None)
+        if published_at is None:
+            published_at = (getattr(task.request, "headers", None) or {}).get("published_at")
+        # Retries and ETA/countdown tasks wait on purpose; only first deliveries count
+        if published_at is not None and not task.request.retries and not task.request.eta:
+            CELERY_QUEUE_WAIT.labels(_queue(task), task.name).observe(max(time.time() - published_at, 0))
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, task=None, state=None, **kwargs):
+        start = started.pop(task_id, None)
+        if start is not None:
+            CELERY_TASK_DURATION.labels(_queue(task), task.name, state or "UNKNOWN").observe(
+                time.perf_counter() - start
+            )
+
+    @task_retry.connect(weak=False)
+    def _task_retried(sender=None, request=None, **kwargs):
+        delivery_info = getattr(request, "delivery_info", None) or {}
+        CELERY_TASK_RETRIES.labels(delivery_info.get("routing_key") or "celery", sender.name).inc()
@@ -0,0 +1,164 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import REAL, String, and_, cast, column, func, literal_column, or_, select, table, text, type_coerce
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+from models import Post, PostTarget, SocialAccount
+
+# Must match the generated column added by migration d6f1b8c2a947
+TEXT_SEARCH_CONFIG = "simple"
+
+SORTS = ("relevance", "recent")
+
+# SQLite has no tsvector: an external-content FTS5 table over posts.text,
+# kept in sync by triggers
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+    "text, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF text ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_fts(rowid, text) VALUES (new.id, new.text); END",
+    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+)
+
+POSTGRES_SEARCH_DDL = (
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(text, ''))) STORED",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "CREATE INDEX IF NOT EXISTS ix_posts_search ON posts USING gin (user_id, status, created_at, search_vector)",
+)
+
+posts_fts = table("posts_fts", column("rowid"))
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor this search did not issue."""
+
+def ensure_search_index(bind: Any) -> None:
+    """Create the search column/index (PostgreSQL) or FTS5 table (SQLite) on a schema built with create_all.
+
+    Migrated databases already have them; benchmarks and tests that build
+    the schema from the models call this instead.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            ensure_search_index(connection)
+        return
+    statements = SQLITE_SEARCH_DDL if bind.dialect.name == "sqlite" else POSTGRES_SEARCH_DDL
+    for statement in statements:
+        bind.execute(text(statement))
+
+def encode_cursor(sort_key: Any, post_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_key, post_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        sort_key, post_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return sort_key, int(post_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+def _fts5_query(query: str) -> str:
+    # Every word must match; quoting keeps FTS5 operators in user input literal
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+def search_posts(
+    db: Session,
+    user_id: int,
+    query: str,
+    status: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sort: str = "relevance",
+    cursor: Optional[str] = None,
+    limit: int = 20
+) -> Tuple[List[Tuple[Post, float]], Optional[str]]:
+    """Full-text search over a user's posts, with keyset pagination.
+
+    PostgreSQL matches `websearch_to_tsquery` against the generated
+    search_vector column and ranks with ts_rank_cd; the user, status and
+    date filters are columns of the same GIN index. SQLite matches through
+    the posts_fts table and ranks with bm25. Results are ordered by rank (or
+    creation time) and then id, and the cursor carries the last row's pair,
+    so later pages cost the same as the first. Returns (post, rank) pairs
+    and the cursor for the next page, if any.
+    """
+    if not query.split():
+        return [], None
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    if sqlite:
+        rank = (-func.bm25(literal_column("posts_fts"))).label("rank")
+        # created_at is stored as text in whichever format wrote it (with or
+        # without microseconds) and sorts as that text, so pages are keyed
+        # on the stored value rather than a re-rendered datetime
+        created_key = type_coerce(Post.created_at, String)
+        statement = (
+            db.query(Post, rank, created_key)
+            .join(posts_fts, posts_fts.c.rowid == Post.id)
+            .filter(literal_column("posts_fts").op("MATCH")(_fts5_query(query)))
+        )
+    else:
+        search_vector = literal_column("posts.search_vector")
+        tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+        rank = func.ts_rank_cd(search_vector, tsquery).label("rank")
+        created_key = Post.created_at
+        statement = db.query(Post, rank, created_key).filter(search_vector.op("@@")(tsquery))
+
+    statement = statement.filter(Post.user_id == user_id)
+    if status:
+        statement = statement.filter(Post.status == status)
+    if since:
+        statement = statement.filter(Post.created_at >= since)
+    if until:
+        statement = statement.filter(Post.created_at < until)
+    if platform:
+        statement = statement.filter(Post.id.in_(
+            select(PostTarget.post_id)
+            .join(SocialAccount, SocialAccount.id == PostTarget.social_account_id)
+            .where(SocialAccount.user_id == user_id, SocialAccount.provider == platform)
+        ))
+
+    sort_column = rank if sort == "relevance" else created_key
+    if cursor:
+        after, after_id = decode_cursor(cursor)
+        if sort == "recent" and sqlite:
+            if not isinstance(after, str):
+                raise InvalidCursor("recent cursor without a timestamp")
+        elif sort == "recent":
+            try:
+                after = datetime.fromisoformat(after)
+            except (TypeError, ValueError) as e:
+                raise InvalidCursor(str(e))
+        if sort == "relevance":
+            # The rank label can't be referenced in WHERE, so repeat its
+            # expression; ts_rank_cd is a float4 and must compare as one
+            key = rank.element
+            if not sqlite:
+                after = cast(after, REAL)
+        else:
+            key = created_key
+        statement = statement.filter(or_(key < after, and_(key == after, Post.id < after_id)))
+
+    rows = (
+        statement
+        .options(selectinload(Post.media))
+        .order_by(sort_column.desc(), Post.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_rank, last_created = rows[-1]
+        if sort == "relevance":
+            sort_key = last_rank
+        else:
+            sort_key = last_created if sqlite else last_created.isoformat()
+        next_cursor = encode_cursor(sort_key, last.id)
+    return [(post, rank_value) for post, rank_value, _ in rows], next_cursor
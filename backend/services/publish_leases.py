@@ -0,0 +1,156 @@
+import os
+import socket
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from config import PUBLISH_LEASE_SECONDS, LEASE_REAPER_MAX_REAPS
+from models import Post, PostTarget, SocialAccount
+from services.publishing import enqueue_publish, refresh_post_status
+from services.response_cache import bump_list_version
+from services.status_counts import TARGET, adjust_status_counts
+from services.status_events import publish_status_event
+
+class LeaseLost(Exception):
+    """Raised when a target's publishing lease has passed to another worker."""
+
+def lease_owner(task_id: Optional[str]) -> str:
+    """Identify this worker process and task as a lease holder."""
+    return f"{socket.gethostname()}:{os.getpid()}:{task_id}"
+
+def lease_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=PUBLISH_LEASE_SECONDS)
+
+def lease_is_live(target: PostTarget) -> bool:
+    """Whether a worker is still publishing the target under an unexpired lease."""
+    expires_at = target.lease_expires_at
+    if target.platform_status != "publishing" or expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        # SQLite hands timestamps back without their zone
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at > datetime.now(timezone.utc)
+
+def take_lease(target: PostTarget, owner: str) -> bool:
+    """Lease the target to `owner`; True if an earlier attempt died while holding it."""
+    recovered = target.lease_owner is not None
+    target.lease_owner = owner
+    target.lease_expires_at = lease_expiry()
+    return recovered
+
+def release_lease(target: PostTarget) -> None:
+    target.lease_owner = None
+    target.lease_expires_at = None
+
+def renew_leases(db: Session, target_ids: Iterable[int], owner: str) -> int:
+    """Extend `owner`'s leases on the given targets (caller commits); returns how many it still holds."""
+    target_ids = list(target_ids)
+    if not target_ids:
+        return 0
+    result = db.execute(
+        update(PostTarget)
+        .where(
+            PostTarget.id.in_(target_ids),
+            PostTarget.lease_owner == owner,
+            # A reaped target is back to pending, so its old worker stops here
+            PostTarget.platform_status == "publishing"
+        )
+        .values(lease_expires_at=lease_expiry())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def _gave_up_error(reaps: int) -> str:
+    return f"Publishing worker stopped {reaps} times; giving up"
+
+def reap_expired_leases(db: Session, batch_size: int, max_batches: int) -> Dict[str, int]:
+    """Requeue targets whose publishing worker died, oldest lease first.
+
+    Expired leases are found through the partial index on lease_expires_at
+    and handled `batch_size` at a time: each batch goes back to pending with
+    one bulk UPDATE and is then queued again. The dead worker stays recorded
+    as lease_owner, which tells the next attempt to check the platform for a
+    post it may already have made before publishing again. A target reaped
+    LEASE_REAPER_MAX_REAPS times is failed instead, so one that kills every
+    worker that picks it up stops being retried.
+    """
+    requeued = failed = 0
+    for _ in range(max_batches):
+        rows = (
+            db.query(
+                PostTarget.id,
+                PostTarget.post_id,
+                PostTarget.social_account_id,
+                PostTarget.lease_reaps,
+                SocialAccount.provider,
+                SocialAccount.user_id
+            )
+            .join(SocialAccount, SocialAccount.id == PostTarget.social_account_id)
+            .filter(
+                PostTarget.platform_status == "publishing",
+                PostTarget.lease_expires_at < datetime.now(timezone.utc)
+            )
+            .order_by(PostTarget.lease_expires_at)
+            .limit(batch_size)
+            .with_for_update(of=PostTarget, skip_locked=True)
+            .all()
+        )
+        if not rows:
+            break
+        retry = [row for row in rows if row.lease_reaps + 1 < LEASE_REAPER_MAX_REAPS]
+        give_up = [row for row in rows if row.lease_reaps + 1 >= LEASE_REAPER_MAX_REAPS]
+        if retry:
+            db.execute(update(PostTarget), [
+                {
+                    "id": row.id,
+                    "platform_status": "pending",
+                    "last_error": "Publishing worker stopped; requeued",
+                    "lease_reaps": row.lease_reaps + 1
+                }
+                for row in retry
+            ])
+        if give_up:
+            db.execute(update(PostTarget), [
+                {
+                    "id": row.id,
+                    "platform_status": "failed",
+                    "last_error": _gave_up_error(row.lease_reaps + 1),
+                    "lease_reaps": row.lease_reaps + 1,
+                    "upload_state": None
+                }
+                for row in give_up
+            ])
+        deltas: Dict[int, Counter] = {}
+        for reaped, status in ((retry, "pending"), (give_up, "failed")):
+            for row in reaped:
+                user_deltas = deltas.setdefault(row.user_id, Counter())
+                user_deltas["publishing"] -= 1
+                user_deltas[status] += 1
+        # Users are locked in id order, as reconciliation does
+        for user_id, user_deltas in sorted(deltas.items()):
+            adjust_status_counts(db, user_id, TARGET, user_deltas)
+            bump_list_version(db, user_id, "posts")
+        db.commit()
+
+        for row in retry:
+            enqueue_publish(row.id, row.provider, row.user_id, social_account_id=row.social_account_id)
+        if give_up:
+            posts = {post.id: post for post in db.query(Post).filter(Post.id.in_({row.post_id for row in give_up}))}
+            for row in give_up:
+                publish_status_event(
+                    row.user_id,
+                    row.post_id,
+                    posts[row.post_id].status,
+                    target_id=row.id,
+                    platform_status="failed",
+                    error=_gave_up_error(row.lease_reaps + 1)
+                )
+            # The failed target may have been the last one its post was waiting on
+            for post_id in sorted(posts):
+                refresh_post_status(db, posts[post_id])
+        requeued += len(retry)
+        failed += len(give_up)
+        if len(rows) < batch_size:
+            break
+    return {"requeued": requeued, "failed": failed}
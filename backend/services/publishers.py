@@ -0,0 +1,543 @@
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+import requests
+from botocore.exceptions import BotoCoreError, ClientError
+from services.chunked_upload import S3RangeReader, UploadCheckpoint
+from services.metrics import PLATFORM_API_LATENCY
+from config import FACEBOOK_GRAPH_URL, TIKTOK_API_URL, CHUNKED_VIDEO_UPLOADS, VIDEO_UPLOAD_CHUNK_SIZE
+
+GRAPH_API_URL = FACEBOOK_GRAPH_URL
+
+# Instagram processes video containers asynchronously before they can be published
+INSTAGRAM_CONTAINER_POLL_INTERVAL = 5
+INSTAGRAM_CONTAINER_MAX_POLLS = 60
+
+# How long a platform upload session can be resumed (TikTok upload URLs last an hour)
+FACEBOOK_UPLOAD_SESSION_TTL = 6 * 3600
+TIKTOK_UPLOAD_SESSION_TTL = 3600
+
+# TikTok accepts 5-64 MB chunks; the last chunk absorbs the remainder (up to 128 MB)
+TIKTOK_MIN_CHUNK_SIZE = 5 * 1024 * 1024
+TIKTOK_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Engagement metrics: a Graph API batch carries at most 50 operations, and
+# TikTok's video query takes up to 20 ids of one user
+GRAPH_BATCH_SIZE = 50
+TIKTOK_VIDEO_QUERY_SIZE = 20
+
+# Set by shared_http_session() so consecutive publishes reuse one keep-alive connection
+_http_session: ContextVar[Optional[requests.Session]] = ContextVar("publisher_http_session", default=None)
+
+class PublishError(Exception):
+    """Raised when a platform rejects a publish request."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+def _check_response(response: requests.Response) -> Dict[str, Any]:
+    """Return the JSON body or raise PublishError; 429 and 5xx are retryable."""
+    if response.status_code == 429 or response.status_code >= 500:
+        raise PublishError(f"{response.status_code}: {response.text}", retryable=True)
+    if response.status_code >= 400:
+        raise PublishError(f"{response.status_code}: {response.text}")
+    return response.json() if response.content else {}
+
+def _request(platform: str, endpoint: str, method: str, url: str, **kwargs) -> Dict[str, Any]:
+    """Call a platform API, recording its latency under a fixed endpoint label."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = (_http_session.get() or requests).request(method, url, timeout=60, **kwargs)
+        status = str(response.status_code)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise PublishError(str(e), retryable=True)
+    finally:
+        PLATFORM_API_LATENCY.labels(platform, endpoint, status).observe(time.perf_counter() - start)
+    return _check_response(response)
+
+@contextmanager
+def shared_http_session() -> Iterator[requests.Session]:
+    """Send every platform call made inside the block through one pooled session."""
+    session = requests.Session()
+    token = _http_session.set(session)
+    try:
+        yield session
+    finally:
+        _http_session.reset(token)
+        session.close()
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back without their zone
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _graph_batch(platform: str, operations: List[Tuple[str, str]]) -> List[Optional[Dict[str, Any]]]:
+    """GET each (relative_url, access_token) in one Graph API batch call; failed operations come back as None."""
+    batch = [
+        {"method": "GET", "relative_url": f"{relative_url}&{urlencode({'access_token': token})}"}
+        for relative_url, token in operations
+    ]
+    responses = _request(platform, "batch", "POST", f"{GRAPH_API_URL}/", data={
+        # Each operation carries its own token; this one is only the fallback
+        "access_token": operations[0][1],
+        "batch": json.dumps(batch),
+        "include_headers": "false"
+    })
+    return [
+        json.loads(response["body"]) if response and response.get("code") == 200 else None
+        for response in responses
+    ]
+
+def _summary_count(body: Dict[str, Any], edge: str) -> Optional[int]:
+    return ((body.get(edge) or {}).get("summary") or {}).get("total_count")
+
+def _insight_value(body: Dict[str, Any], metric: str) -> Optional[int]:
+    for insight in (body.get("insights") or {}).get("data", []):
+        if insight.get("name") == metric and insight.get("values"):
+            return insight["values"][0].get("value")
+    return None
+
+def _use_chunked_upload(item: Dict[str, str], checkpoint: Optional[UploadCheckpoint]) -> bool:
+    return CHUNKED_VIDEO_UPLOADS and checkpoint is not None and item["type"] == "video" and bool(item.get("s3_key"))
+
+def _object_size(s3_key: str) -> int:
+    from services.s3 import s3_service
+    try:
+        metadata = s3_service.get_file_metadata(s3_key)
+    except BotoCoreError as e:
+        raise PublishError(str(e), retryable=True)
+    if metadata is None:
+        raise PublishError(f"Media {s3_key} not found")
+    return metadata["size"]
+
+def _read_chunk(reader: S3RangeReader, start: int, end: int) -> bytes:
+    try:
+        return reader.read(start, end)
+    except (BotoCoreError, ClientError) as e:
+        raise PublishError(f"Reading {reader.s3_key} from S3 failed: {e}", retryable=True)
+
+def _restart_on_rejection(checkpoint: UploadCheckpoint, e: PublishError) -> PublishError:
+    """A rejected chunk usually means the session expired or drifted: start over on the next attempt."""
+    if not e.retryable:
+        checkpoint.clear()
+        return PublishError(f"Upload session rejected, restarting: {e}", retryable=True)
+    return e
+
+class FacebookPublisher:
+    """Publishes to a Facebook Page."""
+
+    METRICS_BATCH_SIZE = GRAPH_BATCH_SIZE
+    METRICS_BATCH_PER_ACCOUNT = False
+    METRICS_FIELDS = (
+        "reactions.summary(total_count).limit(0),comments.summary(total_count).limit(0),"
+        "shares,insights.metric(post_impressions_unique)"
+    )
+
+    @staticmethod
+    def publish(
+        page_id: str,
+        access_token: str,
+        text: Optional[str],
+        media: List[Dict[str, str]],
+        checkpoint: Optional[UploadCheckpoint] = None
+    ) -> str:
+        """Publish a post and return the platform post id."""
+        if not media:
+            data = _request("facebook", "feed", "POST", f"{GRAPH_API_URL}/{page_id}/feed", data={
+                "message": text or "",
+                "access_token": access_token
+            })
+            return data["id"]
+
+        item = media[0]
+        if _use_chunked_upload(item, checkpoint):
+            return FacebookPublisher._upload_video(page_id, access_token, text, item["s3_key"], checkpoint)
+        if item["type"] == "video":
+            data = _request("facebook", "videos", "POST", f"{GRAPH_API_URL}/{page_id}/videos", data={
+                "file_url": item["url"],
+                "description": text or "",
+                "access_token": access_token
+            })
+            return data["id"]
+
+        data = _request("facebook", "photos", "POST", f"{GRAPH_API_URL}/{page_id}/photos", data={
+            "url": item["url"],
+            "caption": text or "",
+            "access_token": access_token
+        })
+        return data.get("post_id") or data["id"]
+
+    @staticmethod
+    def find_published(
+        page_id: str,
+        access_token: str,
+        text: Optional[str],
+        upload_state: Optional[Dict[str, Any]],
+        since: datetime
+    ) -> Optional[str]:
+        """Return the post an interrupted earlier attempt already made, if the Page has it."""
+        if upload_state and upload_state.get("video_id"):
+            data = _request("facebook", "video_status", "GET", f"{GRAPH_API_URL}/{upload_state['video_id']}", params={
+                "fields": "status",
+                "access_token": access_token
+            })
+            # Processing starts once the finish phase went through; before that the checkpoint resumes the upload
+            if (data.get("status") or {}).get("video_status") in ("processing", "ready"):
+                return upload_state["video_id"]
+            return None
+        if not text:
+            return None  # Nothing to recognise the post by
+        data = _request("facebook", "page_posts", "GET", f"{GRAPH_API_URL}/{page_id}/posts", params={
+            "fields": "id,message",
+            "since": int(_as_utc(since).timestamp()),
+            "limit": 25,
+            "access_token": access_token
+        })
+        for post in data.get("data", []):
+            if post.get("message") == text:
+                return post["id"]
+        return None
+
+    @staticmethod
+    def fetch_metrics(posts: List[Tuple[str, str]]) -> List[Optional[Dict[str, Optional[int]]]]:
+        """Engagement of up to 50 (post id, page token) pairs in one batch request; None where unavailable."""
+        bodies = _graph_batch("facebook", [
+            (f"{post_id}?fields={FacebookPublisher.METRICS_FIELDS}", token) for post_id, token in posts
+        ])
+        return [
+            None if body is None else {
+                "likes": _summary_count(body, "reactions"),
+                "comments": _summary_count(body, "comments"),
+                "shares": (body.get("shares") or {}).get("count", 0),
+                "views": None,
+                "reach": _insight_value(body, "post_impressions_unique"),
+            }
+            for body in bodies
+        ]
+
+    @staticmethod
+    def _upload_video(page_id: str, access_token: str, text: Optional[str], s3_key: str, checkpoint: UploadCheckpoint) -> str:
+        """Upload a video with the start/transfer/finish protocol, resuming a saved session."""
+        url = f"{GRAPH_API_URL}/{page_id}/videos"
+        state = checkpoint.load(s3_key)
+        if state is None:
+            size = _object_size(s3_key)
+            data = _request("facebook", "video_upload_start", "POST", url, data={
+                "upload_phase": "start",
+                "file_size": size,
+                "access_token": access_token
+            })
+            state = {
+                "s3_key": s3_key,
+                "size": size,
+                "upload_session_id": data["upload_session_id"],
+                "video_id": data["video_id"],
+                "start_offset": int(data["start_offset"]),
+                "end_offset": int(data["end_offset"]),
+                "expires_at": time.time() + FACEBOOK_UPLOAD_SESSION_TTL,
+            }
+            checkpoint.save(state)
+
+        # Facebook names the next byte range after each chunk, so transfers
+        # are sequential; the reader keeps S3 downloads ahead of them
+        with S3RangeReader(s3_key, state["size"], offset=state["start_offset"]) as reader:
+            while state["start_offset"] < state["end_offset"]:
+                chunk = _read_chunk(reader, state["start_offset"], state["end_offset"])
+                try:
+                    data = _request("facebook", "video_upload_transfer", "POST", url, data={
+                        "upload_phase": "transfer",
+                        "upload_session_id": state["upload_session_id"],
+                        "start_offset": state["start_offset"],
+                        "access_token": access_token
+                    }, files={"video_file_chunk": ("chunk", chunk, "application/octet-stream")})
+                except PublishError as e:
+                    raise _restart_on_rejection(checkpoint, e)
+                state["start_offset"] = int(data["start_offset"])
+                state["end_offset"] = int(data["end_offset"])
+                checkpoint.save(state)
+
+        try:
+            _request("facebook", "video_upload_finish", "POST", url, data={
+                "upload_phase": "finish",
+                "upload_session_id": state["upload_session_id"],
+                "description": text or "",
+                "access_token": access_token
+            })
+        except PublishError as e:
+            raise _restart_on_rejection(checkpoint, e)
+        checkpoint.clear()
+        return state["video_id"]
+
+class InstagramPublisher:
+    """Publishes to an Instagram Business account via media containers."""
+
+    METRICS_BATCH_SIZE = GRAPH_BATCH_SIZE
+    METRICS_BATCH_PER_ACCOUNT = False
+    METRICS_FIELDS = "like_count,comments_count,insights.metric(reach)"
+
+    @staticmethod
+    def publish(
+        ig_user_id: str,
+        access_token: str,
+        text: Optional[str],
+        media: List[Dict[str, str]],
+        checkpoint: Optional[UploadCheckpoint] = None
+    ) -> str:
+        """Publish a post and return the platform media id.
+
+        Instagram only pulls media from a URL, so `checkpoint` is only used to
+        renew the target's lease while a video container processes.
+        """
+        if not media:
+            raise PublishError("Instagram posts require an image or video")
+
+        item = media[0]
+        params = {"caption": text or "", "access_token": access_token}
+        if item["type"] == "video":
+            params.update({"media_type": "REELS", "video_url": item["url"]})
+        else:
+            params["image_url"] = item["url"]
+        container = _request("instagram", "media", "POST", f"{GRAPH_API_URL}/{ig_user_id}/media", data=params)
+        creation_id = container["id"]
+
+        if item["type"] == "video":
+            InstagramPublisher._wait_for_container(creation_id, access_token, checkpoint)
+
+        data = _request("instagram", "media_publish", "POST", f"{GRAPH_API_URL}/{ig_user_id}/media_publish", data={
+            "creation_id": creation_id,
+            "access_token": access_token
+        })
+        return data["id"]
+
+    @staticmethod
+    def find_published(
+        ig_user_id: str,
+        access_token: str,
+        text: Optional[str],
+        upload_state: Optional[Dict[str, Any]],
+        since: datetime
+    ) -> Optional[str]:
+        """Return the media an interrupted earlier attempt already published, if the account has it."""
+        if not text:
+            return None  # Nothing to recognise the media by
+        data = _request("instagram", "media_list", "GET", f"{GRAPH_API_URL}/{ig_user_id}/media", params={
+            "fields": "id,caption,timestamp",
+            "limit": 25,
+            "access_token": access_token
+        })
+        since = _as_utc(since)
+        for item in data.get("data", []):
+            published_at = datetime.strptime(item["timestamp"], "%Y-%m-%dT%H:%M:%S%z")
+            if item.get("caption") == text and published_at >= since:
+                return item["id"]
+        return None
+
+    @staticmethod
+    def fetch_metrics(media: List[Tuple[str, str]]) -> List[Optional[Dict[str, Optional[int]]]]:
+        """Engagement of up to 50 (media id, token) pairs in one batch request; None where unavailable."""
+        bodies = _graph_batch("instagram", [
+            (f"{media_id}?fields={InstagramPublisher.METRICS_FIELDS}", token) for media_id, token in media
+        ])
+        return [
+            None if body is None else {
+                "likes": body.get("like_count"),
+                "comments": body.get("comments_count"),
+                "shares": None,
+                "views": None,
+                "reach": _insight_value(body, "reach"),
+            }
+            for body in bodies
+        ]
+
+    @staticmethod
+    def _wait_for_container(creation_id: str, access_token: str, checkpoint: Optional[UploadCheckpoint] = None) -> None:
+        for _ in range(INSTAGRAM_CONTAINER_MAX_POLLS):
+            if checkpoint is not None:
+                checkpoint.heartbeat()
+            data = _request("instagram", "container_status", "GET", f"{GRAPH_API_URL}/{creation_id}", params={
+                "fields": "status_code",
+                "access_token": access_token
+            })
+            status_code = data.get("status_code")
+            if status_code == "FINISHED":
+                return
+            if status_code == "ERROR":
+                raise PublishError(f"Instagram could not process media container {creation_id}")
+            time.sleep(INSTAGRAM_CONTAINER_POLL_INTERVAL)
+        raise PublishError(f"Instagram media container {creation_id} not ready", retryable=True)
+
+class TikTokPublisher:
+    """Publishes videos to TikTok with the Content Posting API."""
+
+    METRICS_BATCH_SIZE = TIKTOK_VIDEO_QUERY_SIZE
+    METRICS_BATCH_PER_ACCOUNT = True  # The video query only covers the token owner's videos
+
+    @staticmethod
+    def publish(
+        open_id: str,
+        access_token: str,
+        text: Optional[str],
+        media: List[Dict[str, str]],
+        checkpoint: Optional[UploadCheckpoint] = None
+    ) -> str:
+        """Start a video post and return the publish id."""
+        videos = [item for item in media if item["type"] == "video"]
+        if not videos:
+            raise PublishError("TikTok posts require a video")
+        if _use_chunked_upload(videos[0], checkpoint):
+            return TikTokPublisher._upload_video(access_token, text, videos[0]["s3_key"], checkpoint)
+
+        data = _request(
+            "tiktok",
+            "video_init",
+            "POST",
+            f"{TIKTOK_API_URL}/post/publish/video/init/",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "post_info": {"title": text or "", "privacy_level": "PUBLIC_TO_EVERYONE"},
+                "source_info": {"source": "PULL_FROM_URL", "video_url": videos[0]["url"]}
+            }
+        )
+        TikTokPublisher._check_error(data)
+        return data["data"]["publish_id"]
+
+    @staticmethod
+    def find_published(
+        open_id: str,
+        access_token: str,
+        text: Optional[str],
+        upload_state: Optional[Dict[str, Any]],
+        since: datetime
+    ) -> Optional[str]:
+        """Return the publish id of an interrupted upload TikTok already received in full."""
+        publish_id = (upload_state or {}).get("publish_id")
+        if not publish_id:
+            return None
+        status = TikTokPublisher._publish_status(publish_id, access_token)
+        if status.get("status") in ("PROCESSING_DOWNLOAD", "SEND_TO_USER_INBOX", "PUBLISH_COMPLETE"):
+            return publish_id
+        return None
+
+    @staticmethod
+    def resolve_video_id(publish_id: str, access_token: str) -> Optional[str]:
+        """The public video id behind a completed publish, once TikTok has assigned one."""
+        # (sic) TikTok's spelling of the field
+        video_ids = TikTokPublisher._publish_status(publish_id, access_token).get("publicaly_available_post_id") or []
+        return str(video_ids[0]) if video_ids else None
+
+    @staticmethod
+    def fetch_metrics(videos: List[Tuple[str, str]]) -> List[Optional[Dict[str, Optional[int]]]]:
+        """Engagement of up to 20 (video id, token) pairs of one account in one video query."""
+        data = _request(
+            "tiktok",
+            "video_query",
+            "POST",
+            f"{TIKTOK_API_URL}/video/query/",
+            params={"fields": "id,like_count,comment_count,share_count,view_count"},
+            headers={"Authorization": f"Bearer {videos[0][1]}"},
+            json={"filters": {"video_ids": [video_id for video_id, _ in videos]}}
+        )
+        TikTokPublisher._check_error(data)
+        found = {str(video["id"]): video for video in data.get("data", {}).get("videos", [])}
+        return [
+            None if video_id not in found else {
+                "likes": found[video_id].get("like_count"),
+                "comments": found[video_id].get("comment_count"),
+                "shares": found[video_id].get("share_count"),
+                "views": found[video_id].get("view_count"),
+                "reach": None,
+            }
+            for video_id, _ in videos
+        ]
+
+    @staticmethod
+    def _publish_status(publish_id: str, access_token: str) -> Dict[str, Any]:
+        data = _request(
+            "tiktok",
+            "publish_status",
+            "POST",
+            f"{TIKTOK_API_URL}/post/publish/status/fetch/",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={"publish_id": publish_id}
+        )
+        TikTokPublisher._check_error(data)
+        return data.get("data", {})
+
+    @staticmethod
+    def _check_error(data: Dict[str, Any]) -> None:
+        error = data.get("error") or {}
+        if error.get("code") not in (None, "ok"):
+            raise PublishError(f"TikTok error {error.get('code')}: {error.get('message')}")
+
+    @staticmethod
+    def _chunk_plan(size: int) -> Dict[str, int]:
+        chunk_size = min(max(VIDEO_UPLOAD_CHUNK_SIZE, TIKTOK_MIN_CHUNK_SIZE), TIKTOK_MAX_CHUNK_SIZE)
+        if size <= chunk_size:
+            return {"chunk_size": size, "chunk_count": 1}
+        return {"chunk_size": chunk_size, "chunk_count": size // chunk_size}
+
+    @staticmethod
+    def _upload_video(access_token: str, text: Optional[str], s3_key: str, checkpoint: UploadCheckpoint) -> str:
+        """Upload a video in chunks with FILE_UPLOAD, resuming a saved upload URL."""
+        state = checkpoint.load(s3_key)
+        if state is None:
+            size = _object_size(s3_key)
+            plan = TikTokPublisher._chunk_plan(size)
+            data = _request(
+                "tiktok",
+                "video_init",
+                "POST",
+                f"{TIKTOK_API_URL}/post/publish/video/init/",
+                headers={"Authorization": f"Bearer {access_token}"},
+                json={
+                    "post_info": {"title": text or "", "privacy_level": "PUBLIC_TO_EVERYONE"},
+                    "source_info": {
+                        "source": "FILE_UPLOAD",
+                        "video_size": size,
+                        "chunk_size": plan["chunk_size"],
+                        "total_chunk_count": plan["chunk_count"]
+                    }
+                }
+            )
+            TikTokPublisher._check_error(data)
+            state = {
+                "s3_key": s3_key,
+                "size": size,
+                "publish_id": data["data"]["publish_id"],
+                "upload_url": data["data"]["upload_url"],
+                "next_chunk": 0,
+                "expires_at": time.time() + TIKTOK_UPLOAD_SESSION_TTL,
+                **plan,
+            }
+            checkpoint.save(state)
+
+        # TikTok requires chunks in order; S3 reads are prefetched ahead of them
+        size, chunk_size, chunk_count = state["size"], state["chunk_size"], state["chunk_count"]
+        with S3RangeReader(s3_key, size, offset=state["next_chunk"] * chunk_size, block_size=chunk_size) as reader:
+            while state["next_chunk"] < chunk_count:
+                start = state["next_chunk"] * chunk_size
+                end = size if state["next_chunk"] == chunk_count - 1 else start + chunk_size
+                chunk = _read_chunk(reader, start, end)
+                try:
+                    _request("tiktok", "video_upload_chunk", "PUT", state["upload_url"], data=chunk, headers={
+                        "Content-Type": "video/mp4",
+                        "Content-Range": f"bytes {start}-{end - 1}/{size}"
+                    })
+                except PublishError as e:
+                    raise _restart_on_rejection(checkpoint, e)
+                state["next_chunk"] += 1
+                checkpoint.save(state)
+
+        checkpoint.clear()
+        return state["publish_id"]
+
+PUBLISHERS = {
+    "facebook": FacebookPublisher,
+    "instagram": InstagramPublisher,
+    "tiktok": TikTokPublisher,
+}
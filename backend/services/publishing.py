@@ -0,0 +1,194 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import redis
+from sqlalchemy.orm import Session
+from celery_app import celery_app
+from config import FAIR_SCHEDULING_ENABLED, PUBLISH_BATCHING_ENABLED, MEDIA_VARIANT_TIMEOUT_SECONDS
+from models import Post, PostTarget
+from services.fair_scheduler import FairScheduler
+from services.response_cache import bump_list_version
+from services.status_counts import POST, TARGET, count_transition
+from services.status_events import publish_status_event
+
+PUBLISH_TASKS = {
+    "facebook": "tasks.publish_tasks.publish_to_facebook",
+    "instagram": "tasks.publish_tasks.publish_to_instagram",
+    "tiktok": "tasks.publish_tasks.publish_to_tiktok",
+}
+
+ACCOUNT_BATCH_TASK = "tasks.publish_tasks.publish_account_batch"
+
+FINAL_TARGET_STATUSES = ("published", "failed")
+
+# Scheduler items for account batches are "a<social_account_id>"; plain ids are targets
+ACCOUNT_BATCH_PREFIX = "a"
+# Marks an account batch as queued so a campaign submits it once, not once per target
+ACCOUNT_BATCH_PENDING_TTL = 30 * 60
+# Marks a post's variant build as queued; outlives a build that runs to its timeout
+VARIANTS_PENDING_TTL = 2 * MEDIA_VARIANT_TIMEOUT_SECONDS
+# How long a rejected variant (e.g. a video over the platform's length limit) is remembered
+MEDIA_REJECTION_TTL = 7 * 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+def account_batch_item(social_account_id: int) -> str:
+    return f"{ACCOUNT_BATCH_PREFIX}{social_account_id}"
+
+def _send_publish(provider: str, item: str) -> None:
+    item = str(item)
+    if item.startswith(ACCOUNT_BATCH_PREFIX):
+        # One task name for every platform, so the queue is given explicitly
+        celery_app.send_task(ACCOUNT_BATCH_TASK, args=[int(item[len(ACCOUNT_BATCH_PREFIX):])], queue=provider)
+    else:
+        celery_app.send_task(PUBLISH_TASKS[provider], args=[int(item)])
+
+fair_scheduler = FairScheduler(send=_send_publish)
+
+def _batch_pending_key(social_account_id: int) -> str:
+    return f"{fair_scheduler.key_prefix}:batch-pending:{social_account_id}"
+
+def _submit(item: str, provider: str, user_id: int, lane: str) -> None:
+    if FAIR_SCHEDULING_ENABLED:
+        try:
+            fair_scheduler.submit(provider, user_id, item, lane)
+            fair_scheduler.dispatch(provider)
+            return
+        except redis.RedisError as e:
+            logger.warning("Fair scheduler unavailable, sending %s directly: %s", item, e)
+    _send_publish(provider, item)
+
+def enqueue_publish(
+    target_id: int,
+    provider: str,
+    user_id: int,
+    lane: str = "immediate",
+    social_account_id: Optional[int] = None
+) -> None:
+    """Queue a publish task for one post target.
+
+    With fair scheduling the target waits in its user's queue for `lane` and
+    is released onto the platform queue in round-robin turn with other
+    users'; if Redis is unreachable it is sent straight to Celery instead.
+    With batching enabled the target's account batch is queued instead.
+    """
+    if PUBLISH_BATCHING_ENABLED and social_account_id is not None:
+        enqueue_account_batch(social_account_id, provider, user_id, lane)
+        return
+    _submit(str(target_id), provider, user_id, lane)
+
+def enqueue_account_batch(social_account_id: int, provider: str, user_id: int, lane: str = "immediate") -> None:
+    """Queue one batch execution for an account's pending targets, unless one is already queued."""
+    try:
+        if not fair_scheduler.client.set(_batch_pending_key(social_account_id), 1, nx=True, ex=ACCOUNT_BATCH_PENDING_TTL):
+            return
+    except redis.RedisError as e:
+        # A duplicate batch finds its targets already claimed and exits
+        logger.warning("Cannot mark batch for account %s as queued: %s", social_account_id, e)
+    _submit(account_batch_item(social_account_id), provider, user_id, lane)
+
+def start_account_batch(social_account_id: int) -> None:
+    """Let targets queued from now on submit a follow-up batch for the account."""
+    try:
+        fair_scheduler.client.delete(_batch_pending_key(social_account_id))
+    except redis.RedisError as e:
+        logger.warning("Cannot clear queued batch marker for account %s: %s", social_account_id, e)
+
+def finish_publish(item: str, provider: str, user_id: int) -> None:
+    """Free the user's scheduler slot and refill the platform queue after a publish attempt."""
+    if not FAIR_SCHEDULING_ENABLED:
+        return
+    try:
+        fair_scheduler.release(provider, user_id, str(item))
+        fair_scheduler.dispatch(provider)
+    except redis.RedisError as e:
+        logger.warning("Fair scheduler unavailable after %s: %s", item, e)
+
+def _variants_pending_key(post_id: int) -> str:
+    return f"{fair_scheduler.key_prefix}:variants-pending:{post_id}"
+
+def _media_rejections_key(post_id: int) -> str:
+    return f"{fair_scheduler.key_prefix}:media-rejected:{post_id}"
+
+def enqueue_media_variants(post_id: int) -> None:
+    """Queue building the platform variants of a post's media, unless a build is already queued."""
+    try:
+        if not fair_scheduler.client.set(_variants_pending_key(post_id), 1, nx=True, ex=VARIANTS_PENDING_TTL):
+            return
+    except redis.RedisError as e:
+        # A duplicate build finds the variants in S3 or rebuilds identical ones
+        logger.warning("Cannot mark variants of post %s as queued: %s", post_id, e)
+    celery_app.send_task("tasks.publish_tasks.prepare_media_variants", args=[post_id])
+
+def finish_media_variants(post_id: int, rejections: Dict[str, str]) -> None:
+    """Record which platforms cannot take the post's media, and let later builds be queued."""
+    try:
+        pipeline = fair_scheduler.client.pipeline()
+        if rejections:
+            pipeline.hset(_media_rejections_key(post_id), mapping=rejections)
+            pipeline.expire(_media_rejections_key(post_id), MEDIA_REJECTION_TTL)
+        pipeline.delete(_variants_pending_key(post_id))
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning("Cannot record variant results for post %s: %s", post_id, e)
+
+def media_rejection(post_id: int, provider: str) -> Optional[str]:
+    """Why the post's media cannot be published to `provider`, if its variant build rejected it."""
+    try:
+        return fair_scheduler.client.hget(_media_rejections_key(post_id), provider)
+    except redis.RedisError as e:
+        logger.warning("Cannot read variant results for post %s: %s", post_id, e)
+        return None
+
+def set_target_status(
+    db: Session,
+    target: PostTarget,
+    platform_status: str,
+    platform_post_id: Optional[str] = None,
+    error: Optional[str] = None
+) -> None:
+    """Move a target to a new status, commit, and announce the transition."""
+    post = target.post
+    count_transition(db, post.user_id, TARGET, target.platform_status, platform_status)
+    target.platform_status = platform_status
+    if platform_post_id is not None:
+        target.platform_post_id = platform_post_id
+    if platform_status == "published":
+        # The first engagement metrics sample is taken on the next ingestion run
+        target.published_at = target.metrics_due_at = datetime.now(timezone.utc)
+    target.last_error = error
+    bump_list_version(db, post.user_id, "posts")
+    db.commit()
+    publish_status_event(
+        post.user_id,
+        post.id,
+        post.status,
+        target_id=target.id,
+        platform_status=platform_status,
+        platform_post_id=target.platform_post_id,
+        error=error
+    )
+
+def refresh_post_status(db: Session, post: Post) -> None:
+    """Settle the post status once every target has reached a final state.
+
+    The post row is locked and its status and target statuses re-read first,
+    so workers finishing a post's last targets at the same time settle it
+    exactly once and count the transition from its real previous status.
+    """
+    post = db.query(Post).filter(Post.id == post.id).with_for_update().populate_existing().one()
+    statuses = [
+        status for status, in db.query(PostTarget.platform_status).filter(PostTarget.post_id == post.id)
+    ]
+    if not statuses or any(status not in FINAL_TARGET_STATUSES for status in statuses):
+        db.rollback()
+        return
+    new_status = "published" if all(status == "published" for status in statuses) else "failed"
+    if post.status == new_status:
+        db.rollback()
+        return
+    count_transition(db, post.user_id, POST, post.status, new_status)
+    post.status = new_status
+    bump_list_version(db, post.user_id, "posts")
+    db.commit()
+    publish_status_event(post.user_id, post.id, new_status)
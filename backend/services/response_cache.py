@@ -0,0 +1,89 @@
+import hashlib
+import logging
+from typing import Callable, Optional
+import redis
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from models import User
+from config import REDIS_URL, RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# List name -> User column holding its version
+LIST_VERSION_COLUMNS = {
+    "posts": User.posts_version,
+    "social_accounts": User.social_accounts_version,
+}
+
+def bump_list_version(db: Session, user_id: int, name: str) -> None:
+    """Invalidate a user's list ETag and cached body; commits with the caller's write."""
+    column = LIST_VERSION_COLUMNS[name]
+    db.query(User).filter(User.id == user_id).update({column: column + 1}, synchronize_session=False)
+
+def list_etag(user: User, name: str, request: Request) -> str:
+    """ETag of a list response: user, list version and query string, no row reads."""
+    version = getattr(user, LIST_VERSION_COLUMNS[name].key)
+    query = hashlib.blake2b(str(request.query_params).encode(), digest_size=6).hexdigest()
+    return f'W/"{name}-{user.id}-{version}-{query}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison: W/ prefixes are ignored
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == bare
+        for candidate in candidates
+    )
+
+class ResponseCache:
+    """Optional Redis cache of serialized list bodies keyed by their ETag.
+
+    A write bumps the list version, which changes the ETag and therefore the
+    key, so stale bodies are never read again and simply expire. Redis errors
+    fall through to building the response.
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED, ttl: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.enabled = enabled
+        self.ttl = ttl
+        self._client: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(REDIS_URL)
+        return self._client
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        try:
+            return self.client.get(f"list-cache:{key}")
+        except redis.RedisError as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+
+    def set(self, key: str, body: bytes) -> None:
+        if not self.enabled:
+            return
+        try:
+            self.client.set(f"list-cache:{key}", body, ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning("Response cache write failed: %s", e)
+
+def cached_list_response(request: Request, user: User, name: str, build: Callable[[], bytes]) -> Response:
+    """Answer a list request with 304, a cached body, or a freshly built JSON body."""
+    etag = list_etag(user, name, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = response_cache.get(etag)
+    if body is None:
+        body = build()
+        response_cache.set(etag, body)
+    return Response(body, media_type="application/json", headers=headers)
+
+# Global response cache instance
+response_cache = ResponseCache()
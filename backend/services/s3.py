@@ -1,12 +1,20 @@
 import boto3
-import uuid
-from typing import Optional, Dict, Any
+import hashlib
+import os
+from collections import Counter
+from typing import Optional, Dict, Any, BinaryIO, List
 from fastapi import UploadFile, HTTPException
-from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, S3_BUCKET_NAME
+from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, S3_BUCKET_NAME, S3_ENDPOINT_URL
 from botocore.exceptions import ClientError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 import mimetypes
+import time
 from PIL import Image
-import io
+from models import MediaObject
+from services.metrics import S3_UPLOAD_BYTES, S3_UPLOAD_DURATION
+
+UPLOAD_HASH_CHUNK_SIZE = 1024 * 1024
 
 class S3Service:
     """AWS S3 service for file uploads and management."""
@@ -16,60 +24,92 @@ class S3Service:
             's3',
             aws_access_key_id=AWS_ACCESS_KEY_ID,
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
+            region_name=AWS_REGION,
+            endpoint_url=S3_ENDPOINT_URL
         )
         self.bucket_name = S3_BUCKET_NAME
     
-    def upload_file(self, file: UploadFile, folder: str = "media") -> Dict[str, Any]:
-        """Upload a file to S3 and return metadata."""
+    def upload_file(self, file: UploadFile, db: Session, user_id: int, folder: str = "media") -> Dict[str, Any]:
+        """Upload a file to S3, reusing the stored object when the user uploaded identical bytes before.
+
+        Objects are keyed by owner and the SHA-256 of their content and
+        tracked in `media_objects`; deduplication never crosses users, so an
+        upload says nothing about other users' files. An upload holds no
+        reference of its own: the object is referenced once for every post
+        media row that uses its key.
+        """
         try:
-            # Generate unique filename
-            file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
-            unique_filename = f"{uuid.uuid4()}.{file_extension}"
-            s3_key = f"{folder}/{unique_filename}"
-            
-            # Get file content
-            file_content = file.file.read()
-            file.file.seek(0)  # Reset file pointer
-            
-            # Determine content type
-            content_type = file.content_type or mimetypes.guess_type(file.filename)[0] or 'application/octet-stream'
-            
-            # Upload to S3
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type,
-                ACL='private'  # Private by default for security
-            )
+            # Hash in chunks; the upload is already spooled by the framework
+            digest = hashlib.sha256()
+            file_size = 0
+            for chunk in iter(lambda: file.file.read(UPLOAD_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                file_size += len(chunk)
+            file.file.seek(0)
+            content_sha256 = digest.hexdigest()
+
+            media_object = self._find(db, user_id, content_sha256)
+            deduplicated = media_object is not None
+            if media_object is None:
+                # Determine content type
+                content_type = file.content_type or mimetypes.guess_type(file.filename)[0] or 'application/octet-stream'
+                file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
+                s3_key = f"{folder}/{user_id}/{content_sha256}"
+                if file_extension:
+                    s3_key = f"{s3_key}.{file_extension}"
+
+                # If it's an image, get dimensions (reads only the header)
+                width, height = None, None
+                if content_type.startswith('image/'):
+                    try:
+                        with Image.open(file.file) as image:
+                            width, height = image.size
+                    except Exception:
+                        pass  # If we can't get dimensions, that's okay
+                    file.file.seek(0)
+
+                # Upload to S3, streaming from the spooled file
+                upload_start = time.perf_counter()
+                self.s3_client.upload_fileobj(
+                    file.file,
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs={"ContentType": content_type, "ACL": "private"}  # Private by default for security
+                )
+                S3_UPLOAD_DURATION.observe(time.perf_counter() - upload_start)
+                S3_UPLOAD_BYTES.inc(file_size)
+
+                media_object = MediaObject(
+                    user_id=user_id,
+                    content_sha256=content_sha256,
+                    s3_key=s3_key,
+                    content_type=content_type,
+                    size=file_size,
+                    width=width,
+                    height=height,
+                    ref_count=0
+                )
+                db.add(media_object)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # A concurrent upload of the same bytes won; the key is identical
+                    db.rollback()
+                    media_object = self._find(db, user_id, content_sha256)
+                    deduplicated = True
             
             # Generate presigned URL for access
-            presigned_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': s3_key},
-                ExpiresIn=3600  # 1 hour
-            )
-            
-            # Get file metadata
-            file_size = len(file_content)
-            
-            # If it's an image, get dimensions
-            width, height = None, None
-            if content_type.startswith('image/'):
-                try:
-                    image = Image.open(io.BytesIO(file_content))
-                    width, height = image.size
-                except Exception:
-                    pass  # If we can't get dimensions, that's okay
+            presigned_url = self.get_presigned_url(media_object.s3_key)
             
             return {
-                "s3_key": s3_key,
+                "s3_key": media_object.s3_key,
                 "filename": file.filename,
-                "content_type": content_type,
-                "size": file_size,
-                "width": width,
-                "height": height,
+                "content_type": media_object.content_type,
+                "size": media_object.size,
+                "width": media_object.width,
+                "height": media_object.height,
+                "content_sha256": content_sha256,
+                "deduplicated": deduplicated,
                 "url": presigned_url
             }
             
@@ -78,20 +118,75 @@ class S3Service:
                 status_code=500,
                 detail=f"Failed to upload file to S3: {str(e)}"
             )
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Unexpected error during file upload: {str(e)}"
             )
     
-    def delete_file(self, s3_key: str) -> bool:
-        """Delete a file from S3."""
+    def _find(self, db: Session, user_id: int, content_sha256: str) -> Optional[MediaObject]:
+        """Return the user's stored object with this hash, if there is one."""
+        return db.query(MediaObject).filter(
+            MediaObject.user_id == user_id,
+            MediaObject.content_sha256 == content_sha256
+        ).first()
+    
+    def add_references(self, db: Session, user_id: int, s3_keys: List[str]) -> None:
+        """Count one reference per occurrence of each of the user's keys; the caller commits.
+
+        Keys uploaded before deduplication have no `media_objects` row and
+        are left alone.
+        """
+        for s3_key, count in Counter(s3_keys).items():
+            db.query(MediaObject).filter(
+                MediaObject.user_id == user_id,
+                MediaObject.s3_key == s3_key
+            ).update({MediaObject.ref_count: MediaObject.ref_count + count}, synchronize_session=False)
+    
+    def release_references(self, db: Session, user_id: int, s3_keys: List[str]) -> List[str]:
+        """Drop one reference per occurrence of each of the user's keys; the caller commits.
+
+        Returns the keys nothing refers to any more, for `delete_file` to
+        reclaim once the caller's transaction is committed.
+        """
+        counts = Counter(s3_keys)
+        for s3_key, count in counts.items():
+            db.query(MediaObject).filter(
+                MediaObject.user_id == user_id,
+                MediaObject.s3_key == s3_key
+            ).update({MediaObject.ref_count: MediaObject.ref_count - count}, synchronize_session=False)
+        if not counts:
+            return []
+        return [
+            s3_key for s3_key, in db.query(MediaObject.s3_key).filter(
+                MediaObject.user_id == user_id,
+                MediaObject.s3_key.in_(list(counts)),
+                MediaObject.ref_count <= 0
+            )
+        ]
+    
+    def delete_file(self, s3_key: str, db: Session) -> bool:
+        """Delete a file from S3 unless a post still refers to it."""
+        media_object = db.query(MediaObject).filter(
+            MediaObject.s3_key == s3_key
+        ).with_for_update().first()
+        if media_object is not None and media_object.ref_count > 0:
+            db.rollback()
+            return False
         try:
+            # Delete while holding the row lock so a post created concurrently
+            # cannot start referring to the object mid-delete
             self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
-            return True
         except ClientError as e:
+            db.rollback()
             print(f"Error deleting file {s3_key}: {str(e)}")
             return False
+        if media_object is not None:
+            db.delete(media_object)
+        db.commit()
+        return True
     
     def get_presigned_url(self, s3_key: str, expiration: int = 3600) -> str:
         """Generate a presigned URL for accessing a file."""
@@ -108,6 +203,57 @@ class S3Service:
                 detail=f"Failed to generate presigned URL: {str(e)}"
             )
     
+    def object_exists(self, s3_key: str) -> bool:
+        """Check whether an object exists without downloading it."""
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+    
+    def download_to_file(self, s3_key: str, fileobj: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+        """Stream an object into `fileobj` and return its SHA-256 hex digest."""
+        digest = hashlib.sha256()
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+        for chunk in response["Body"].iter_chunks(chunk_size):
+            digest.update(chunk)
+            fileobj.write(chunk)
+        fileobj.flush()
+        return digest.hexdigest()
+    
+    def get_range(self, s3_key: str, start: int, end: int) -> bytes:
+        """Read bytes `start` to `end` (inclusive) of an object."""
+        response = self.s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            Range=f"bytes={start}-{end}"
+        )
+        return response["Body"].read()
+    
+    def upload_path(self, path: str, s3_key: str, content_type: str) -> None:
+        """Upload a local file (multipart for large files) to `s3_key`."""
+        upload_start = time.perf_counter()
+        self.s3_client.upload_file(
+            path,
+            self.bucket_name,
+            s3_key,
+            ExtraArgs={"ContentType": content_type, "ACL": "private"}
+        )
+        S3_UPLOAD_DURATION.observe(time.perf_counter() - upload_start)
+        S3_UPLOAD_BYTES.inc(os.path.getsize(path))
+    
+    def upload_bytes(self, data: bytes, s3_key: str, content_type: str) -> None:
+        """Store a small in-memory object at `s3_key`."""
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            Body=data,
+            ContentType=content_type,
+            ACL="private"
+        )
+    
     def get_file_metadata(self, s3_key: str) -> Optional[Dict[str, Any]]:
         """Get metadata for a file in S3."""
         try:
@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import Any, Iterable, List, Type
+from pydantic import BaseModel, TypeAdapter
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def dump_list_json(model: Type[BaseModel], rows: Iterable[Any]) -> bytes:
+    """Serialize ORM rows as a JSON array of `model`.
+
+    Rows are validated once, straight from their attributes, and encoded by
+    pydantic-core, skipping FastAPI's second validation pass and the
+    intermediate dicts that jsonable_encoder and json.dumps would build.
+    """
+    adapter = _list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
@@ -0,0 +1,123 @@
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Post, PostTarget, User, UserStatusCount
+
+POST = "post"
+TARGET = "target"
+
+def adjust_status_counts(db: Session, user_id: int, kind: str, deltas: Dict[str, int]) -> None:
+    """Apply per-status count changes for one user; commits with the caller's write."""
+    deltas = {status: delta for status, delta in deltas.items() if status is not None and delta}
+    if not deltas:
+        return
+    # Reconciliation locks the same users row, so it never rebuilds a user
+    # between a status write and its counter update
+    db.query(User.id).filter(User.id == user_id).with_for_update().one()
+    for status, delta in deltas.items():
+        updated = db.query(UserStatusCount).filter(
+            UserStatusCount.user_id == user_id,
+            UserStatusCount.kind == kind,
+            UserStatusCount.status == status
+        ).update({UserStatusCount.count: UserStatusCount.count + delta}, synchronize_session=False)
+        if not updated:
+            db.execute(insert(UserStatusCount).values(user_id=user_id, kind=kind, status=status, count=delta))
+
+def count_transition(db: Session, user_id: int, kind: str, old: Optional[str], new: Optional[str]) -> None:
+    """Move one post or target from `old` to `new` status (None for created rows)."""
+    if old != new:
+        adjust_status_counts(db, user_id, kind, {old: -1, new: 1})
+
+def status_counts(db: Session, user_id: int) -> Dict[str, Dict[str, int]]:
+    """A user's counters, read from their few counter rows rather than by scanning posts."""
+    counts: Dict[str, Dict[str, int]] = {POST: {}, TARGET: {}}
+    rows = db.query(UserStatusCount.kind, UserStatusCount.status, UserStatusCount.count).filter(
+        UserStatusCount.user_id == user_id,
+        UserStatusCount.count != 0
+    )
+    for kind, status, count in rows:
+        counts.setdefault(kind, {})[status] = count
+    return counts
+
+def _actual_counts(db: Session, user_ids: Iterable[int]) -> Dict[Tuple[int, str, str], int]:
+    user_ids = list(user_ids)
+    counts: Dict[Tuple[int, str, str], int] = Counter()
+    posts = (
+        db.query(Post.user_id, Post.status, func.count())
+        .filter(Post.user_id.in_(user_ids), Post.status.isnot(None))
+        .group_by(Post.user_id, Post.status)
+    )
+    for user_id, status, count in posts:
+        counts[(user_id, POST, status)] = count
+    targets = (
+        db.query(Post.user_id, PostTarget.platform_status, func.count())
+        .join(PostTarget, PostTarget.post_id == Post.id)
+        .filter(Post.user_id.in_(user_ids), PostTarget.platform_status.isnot(None))
+        .group_by(Post.user_id, PostTarget.platform_status)
+    )
+    for user_id, status, count in targets:
+        counts[(user_id, TARGET, status)] = count
+    return counts
+
+def reconcile_status_counts(
+    start_after_id: int = 0,
+    batch_size: int = 100,
+    time_budget: float = 600.0,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Dict[str, Any]:
+    """Rebuild the dashboard counters from posts and post_targets.
+
+    Users are visited in id order, `batch_size` per transaction: their rows
+    are locked, their real counts are taken with GROUP BY, and only users
+    whose counters drifted are rewritten. Once `time_budget` seconds have
+    passed the scan stops and reports where it got to, so the caller can
+    resume from `last_id`.
+    """
+    deadline = time.monotonic() + time_budget
+    stats = {"users": 0, "corrected": 0, "last_id": start_after_id, "done": True}
+    db = session_factory()
+    try:
+        while True:
+            user_ids = [
+                row.id for row in
+                db.query(User.id)
+                .filter(User.id > stats["last_id"])
+                .order_by(User.id)
+                .limit(batch_size)
+                .with_for_update()
+            ]
+            if not user_ids:
+                break
+            actual = _actual_counts(db, user_ids)
+            stored = {
+                (row.user_id, row.kind, row.status): row.count
+                for row in db.query(UserStatusCount).filter(UserStatusCount.user_id.in_(user_ids))
+            }
+            drifted = {key[0] for key in set(actual) | set(stored) if actual.get(key, 0) != stored.get(key, 0)}
+            if drifted:
+                db.query(UserStatusCount).filter(
+                    UserStatusCount.user_id.in_(drifted)
+                ).delete(synchronize_session=False)
+                rows = [
+                    {"user_id": user_id, "kind": kind, "status": status, "count": count}
+                    for (user_id, kind, status), count in actual.items()
+                    if user_id in drifted
+                ]
+                if rows:
+                    db.execute(insert(UserStatusCount), rows)
+            db.commit()
+
+            stats["users"] += len(user_ids)
+            stats["corrected"] += len(drifted)
+            stats["last_id"] = user_ids[-1]
+            if len(user_ids) < batch_size:
+                break
+            if time.monotonic() >= deadline:
+                stats["done"] = False
+                break
+    finally:
+        db.close()
+    return stats
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+import redis
+import redis.asyncio as aioredis
+from config import REDIS_URL, STATUS_STREAM_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "post-status"
+
+def channel_for_user(user_id: int) -> str:
+    """Redis pub/sub channel carrying a user's publish status events."""
+    return f"{CHANNEL_PREFIX}:{user_id}"
+
+_redis_client: Optional[redis.Redis] = None
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+def publish_status_event(
+    user_id: int,
+    post_id: int,
+    post_status: str,
+    target_id: Optional[int] = None,
+    platform_status: Optional[str] = None,
+    platform_post_id: Optional[str] = None,
+    error: Optional[str] = None
+) -> None:
+    """Announce a post or target status transition to connected clients.
+
+    Delivery is best effort: the database remains the source of truth, so a
+    Redis outage only delays what dashboards see until their next reload.
+    """
+    event = {
+        "post_id": post_id,
+        "post_status": post_status,
+        "target_id": target_id,
+        "platform_status": platform_status,
+        "platform_post_id": platform_post_id,
+        "error": error,
+        "at": datetime.now(timezone.utc).isoformat()
+    }
+    try:
+        _get_redis().publish(channel_for_user(user_id), json.dumps(event))
+    except redis.RedisError as e:
+        logger.warning("Could not publish status event for post %s: %s", post_id, e)
+
+class StatusBroker:
+    """Fans status events out to the SSE clients connected to this process.
+
+    A single pattern subscription per process receives every user's events;
+    each connected client only owns a bounded asyncio.Queue, so idle
+    connections cost a queue and a suspended coroutine, not a Redis
+    connection. Slow clients lose their oldest events rather than growing
+    memory without bound.
+    """
+
+    def __init__(self, redis_url: str = REDIS_URL, queue_size: int = STATUS_STREAM_QUEUE_SIZE):
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background subscriber on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Register a client queue for a user's events."""
+        self.start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    @property
+    def connections(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def dispatch(self, user_id: int, event: Dict[str, Any]) -> None:
+        """Deliver an event to every queue subscribed to `user_id`."""
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    async def _listen(self) -> None:
+        while True:
+            client = aioredis.from_url(self.redis_url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}:*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    user_id = int(channel.rsplit(":", 1)[1])
+                    if user_id in self._subscribers:
+                        self.dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Status event subscriber disconnected: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+# Global broker instance, one per API process
+status_broker = StatusBroker()
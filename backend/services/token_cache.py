@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+class _Entry:
+    __slots__ = ("digest", "secret", "expires_at")
+
+    def __init__(self, digest: bytes, secret: bytearray, expires_at: float):
+        self.digest = digest
+        self.secret = secret
+        self.expires_at = expires_at
+
+    def wipe(self) -> None:
+        # Best effort: the bytearray is zeroed in place, but str copies handed
+        # out to callers are immutable and live until garbage collected.
+        self.secret[:] = bytes(len(self.secret))
+
+class TokenCache:
+    """In-process LRU cache of decrypted OAuth tokens.
+
+    Entries are keyed by (account id, token type) and remember a hash of the
+    ciphertext they were decrypted from, so a rotated token (new ciphertext)
+    is a miss and evicts the stale plaintext. Entries live for `ttl` seconds
+    at most and never past the account's `token_expires_at`.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(ciphertext: str) -> bytes:
+        return hashlib.blake2b(ciphertext.encode(), digest_size=16).digest()
+
+    def _expiry(self, token_expires_at: Optional[datetime]) -> float:
+        ttl = self.ttl
+        if token_expires_at is not None:
+            if token_expires_at.tzinfo is None:
+                token_expires_at = token_expires_at.replace(tzinfo=timezone.utc)
+            ttl = min(ttl, (token_expires_at - datetime.now(timezone.utc)).total_seconds())
+        return time.monotonic() + ttl
+
+    def _evict(self, key: Tuple[int, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.wipe()
+            self.evictions += 1
+
+    def get_or_decrypt(
+        self,
+        account_id: int,
+        token_type: str,
+        ciphertext: str,
+        token_expires_at: Optional[datetime],
+        decrypt: Callable[[str], str]
+    ) -> str:
+        """Return the cached plaintext for `ciphertext`, decrypting it on a miss."""
+        key = (account_id, token_type)
+        digest = self._digest(ciphertext)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.digest == digest and entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.secret.decode()
+                self._evict(key)
+            self.misses += 1
+
+        plaintext = decrypt(ciphertext)
+        expires_at = self._expiry(token_expires_at)
+        if expires_at <= time.monotonic():
+            return plaintext
+
+        with self._lock:
+            self._evict(key)
+            self._entries[key] = _Entry(digest, bytearray(plaintext.encode()), expires_at)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._evict(oldest)
+        return plaintext
+
+    def invalidate(self, account_id: int) -> None:
+        """Drop every cached token of an account, e.g. after its tokens were replaced."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == account_id]:
+                self._evict(key)
+
+    def clear(self) -> None:
+        """Wipe and drop all entries."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring the cache."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,202 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import SocialAccount
+from oauth import FacebookOAuth, TikTokOAuth, encrypt_token, decrypt_token
+from services.log_sink import log_event
+from config import (
+    TOKEN_REFRESH_WINDOW_HOURS,
+    TOKEN_REFRESH_GIVE_UP_HOURS,
+    TOKEN_REFRESH_CONCURRENCY,
+    TOKEN_REFRESH_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+def _expires_at(expires_in: Optional[Any]) -> Optional[datetime]:
+    if not expires_in:
+        return None
+    return datetime.now(timezone.utc) + timedelta(seconds=int(expires_in))
+
+def _refresh_facebook(access_token: str, refresh_token: Optional[str]) -> Dict[str, Any]:
+    """Facebook and Instagram tokens are extended by exchanging the current token."""
+    data = FacebookOAuth.get_long_lived_token(access_token)
+    return {
+        "access_token": data["access_token"],
+        "refresh_token": refresh_token,
+        "token_expires_at": _expires_at(data.get("expires_in"))
+    }
+
+def _refresh_tiktok(access_token: str, refresh_token: Optional[str]) -> Dict[str, Any]:
+    if not refresh_token:
+        raise ValueError("TikTok account has no refresh token")
+    payload = TikTokOAuth.refresh_access_token(refresh_token)
+    data = payload.get("data", payload)
+    if "access_token" not in data:
+        raise ValueError(f"TikTok refresh failed: {payload.get('message') or data}")
+    return {
+        "access_token": data["access_token"],
+        "refresh_token": data.get("refresh_token") or refresh_token,
+        "token_expires_at": _expires_at(data.get("expires_in"))
+    }
+
+REFRESHERS: Dict[str, Callable[[str, Optional[str]], Dict[str, Any]]] = {
+    "facebook": _refresh_facebook,
+    "instagram": _refresh_facebook,
+    "tiktok": _refresh_tiktok,
+}
+
+_accounts = SocialAccount.__table__
+
+# Compare-and-set: a row whose token changed since it was read (the user
+# re-linked the account mid-run) is left alone
+_write_refreshed = (
+    update(_accounts)
+    .where(
+        _accounts.c.id == bindparam("account_id"),
+        _accounts.c.access_token_encrypted == bindparam("old_access_token_encrypted")
+    )
+    .values(
+        access_token_encrypted=bindparam("new_access_token_encrypted"),
+        refresh_token_encrypted=bindparam("new_refresh_token_encrypted"),
+        token_expires_at=bindparam("new_token_expires_at")
+    )
+)
+
+class TokenRefreshEngine:
+    """Refreshes OAuth tokens that are about to expire, ahead of publishing.
+
+    Accounts are selected per provider through the (provider, token_expires_at)
+    index in batches paginated on (token_expires_at, id). Tokens that expired
+    more than the provider's give-up period ago are skipped as dead. Each batch
+    is refreshed concurrently with at most `concurrency` requests in flight per
+    provider, and the new encrypted tokens are written back with a single
+    executemany UPDATE per batch that skips rows changed since they were read.
+    """
+
+    def __init__(
+        self,
+        windows: Optional[Dict[str, int]] = None,
+        give_up_hours: Optional[Dict[str, int]] = None,
+        concurrency: int = TOKEN_REFRESH_CONCURRENCY,
+        batch_size: int = TOKEN_REFRESH_BATCH_SIZE,
+        refreshers: Optional[Dict[str, Callable[[str, Optional[str]], Dict[str, Any]]]] = None,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.windows = windows or TOKEN_REFRESH_WINDOW_HOURS
+        self.give_up_hours = TOKEN_REFRESH_GIVE_UP_HOURS if give_up_hours is None else give_up_hours
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.refreshers = refreshers or REFRESHERS
+        self.session_factory = session_factory
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+        """Refresh every expiring account. Returns per-provider counters."""
+        now = now or datetime.now(timezone.utc)
+        providers = [provider for provider in self.windows if provider in self.refreshers]
+        with ThreadPoolExecutor(max_workers=max(len(providers), 1)) as executor:
+            futures = {
+                provider: executor.submit(self.refresh_provider, provider, now)
+                for provider in providers
+            }
+            return {provider: future.result() for provider, future in futures.items()}
+
+    def refresh_provider(self, provider: str, now: datetime) -> Dict[str, int]:
+        """Refresh all live accounts of one provider expiring within its window."""
+        horizon = now + timedelta(hours=self.windows[provider])
+        dead_before = now - timedelta(hours=self.give_up_hours.get(provider, 0))
+        stats = {"selected": 0, "refreshed": 0, "failed": 0, "superseded": 0}
+        db = self.session_factory()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                last_expires_at, last_id = dead_before, 0
+                while True:
+                    accounts = db.execute(
+                        select(
+                            SocialAccount.id,
+                            SocialAccount.access_token_encrypted,
+                            SocialAccount.refresh_token_encrypted,
+                            SocialAccount.token_expires_at
+                        )
+                        .where(
+                            SocialAccount.provider == provider,
+                            SocialAccount.token_expires_at <= horizon,
+                            or_(
+                                SocialAccount.token_expires_at > last_expires_at,
+                                and_(
+                                    SocialAccount.token_expires_at == last_expires_at,
+                                    SocialAccount.id > last_id
+                                )
+                            )
+                        )
+                        .order_by(SocialAccount.token_expires_at, SocialAccount.id)
+                        .limit(self.batch_size)
+                    ).all()
+                    if not accounts:
+                        break
+                    last_expires_at, last_id = accounts[-1].token_expires_at, accounts[-1].id
+                    stats["selected"] += len(accounts)
+
+                    results = list(executor.map(lambda account: self._refresh_one(provider, account), accounts))
+                    updates = [result for result in results if result is not None]
+                    stats["failed"] += len(results) - len(updates)
+                    if updates:
+                        db.execute(_write_refreshed, updates)
+                        written = self._count_written(db, updates)
+                        db.commit()
+                        stats["refreshed"] += written
+                        stats["superseded"] += len(updates) - written
+                    if len(accounts) < self.batch_size:
+                        break
+        finally:
+            db.close()
+        return stats
+
+    @staticmethod
+    def _count_written(db: Session, updates: List[Dict[str, Any]]) -> int:
+        """How many rows of an executemany compare-and-set now hold the token it wrote.
+
+        The driver's rowcount is unreliable for executemany (psycopg2 reports
+        -1 or the last batch's count). Every encrypted token is unique, so
+        reading back which accounts carry their new token counts the writes
+        that landed.
+        """
+        return db.execute(
+            select(func.count())
+            .select_from(_accounts)
+            .where(
+                _accounts.c.id.in_([row["account_id"] for row in updates]),
+                _accounts.c.access_token_encrypted.in_([row["new_access_token_encrypted"] for row in updates])
+            )
+        ).scalar()
+
+    def _refresh_one(self, provider: str, account) -> Optional[Dict[str, Any]]:
+        try:
+            access_token = decrypt_token(account.access_token_encrypted)
+            refresh_token = (
+                decrypt_token(account.refresh_token_encrypted)
+                if account.refresh_token_encrypted else None
+            )
+            result = self.refreshers[provider](access_token, refresh_token)
+        except Exception as e:
+            logger.warning("Token refresh failed for social account %s: %s", account.id, e)
+            log_event("social_account", account.id, "error", f"Token refresh failed: {e}")
+            return None
+        return {
+            "account_id": account.id,
+            "old_access_token_encrypted": account.access_token_encrypted,
+            "new_access_token_encrypted": encrypt_token(result["access_token"]),
+            "new_refresh_token_encrypted": (
+                encrypt_token(result["refresh_token"])
+                if result["refresh_token"] else account.refresh_token_encrypted
+            ),
+            "new_token_expires_at": result["token_expires_at"]
+        }
+
+def refresh_expiring_tokens() -> Dict[str, Dict[str, int]]:
+    """Run the refresh engine with the configured windows and limits."""
+    return TokenRefreshEngine().run()
@@ -0,0 +1,73 @@
+import time
+from typing import Any, Callable, Dict, List
+from sqlalchemy import select, bindparam
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import SocialAccount
+from oauth import rotate_encrypted_token
+
+social_accounts = SocialAccount.__table__
+
+# Compare-and-set updates: a row whose token was replaced (e.g. by the refresh
+# engine) after we read it is left alone instead of being overwritten.
+_ROTATE_COLUMNS = ("access_token_encrypted", "refresh_token_encrypted")
+_ROTATE_STATEMENTS = {
+    column: social_accounts.update()
+    .where(
+        social_accounts.c.id == bindparam("b_id"),
+        social_accounts.c[column] == bindparam("b_old")
+    )
+    .values({column: bindparam("b_new")})
+    for column in _ROTATE_COLUMNS
+}
+
+def reencrypt_social_account_tokens(
+    start_after_id: int = 0,
+    batch_size: int = 1000,
+    time_budget: float = 1200.0,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Dict[str, Any]:
+    """Re-encrypt stored tokens under the primary key of the keyring.
+
+    Rows are streamed through a server-side cursor (`yield_per`) so memory
+    stays bounded by `batch_size`, and each batch is written and committed on
+    a separate session. Once `time_budget` seconds have passed the scan stops
+    and reports where it got to, so the caller can resume from `last_id`.
+    """
+    deadline = time.monotonic() + time_budget
+    stats = {"scanned": 0, "rotated": 0, "last_id": start_after_id, "done": True}
+    read_db = session_factory()
+    write_db = session_factory()
+    try:
+        rows = read_db.execute(
+            select(
+                SocialAccount.id,
+                SocialAccount.access_token_encrypted,
+                SocialAccount.refresh_token_encrypted
+            )
+            .where(SocialAccount.id > start_after_id)
+            .order_by(SocialAccount.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for batch in rows.partitions():
+            updates: Dict[str, List[Dict[str, Any]]] = {column: [] for column in _ROTATE_COLUMNS}
+            for row in batch:
+                for column in _ROTATE_COLUMNS:
+                    old = getattr(row, column)
+                    new = rotate_encrypted_token(old) if old else None
+                    if new is not None:
+                        updates[column].append({"b_id": row.id, "b_old": old, "b_new": new})
+            for column, params in updates.items():
+                if params:
+                    write_db.execute(_ROTATE_STATEMENTS[column], params)
+                    stats["rotated"] += len(params)
+            write_db.commit()
+            stats["scanned"] += len(batch)
+            stats["last_id"] = batch[-1].id
+            if time.monotonic() >= deadline:
+                stats["done"] = False
+                break
+    finally:
+        read_db.close()
+        write_db.close()
+    return stats
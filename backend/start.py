@@ -1,19 +1,51 @@
 #!/usr/bin/env python3
 """
-Railway startup script for Multi-Platform Posting System
+Production startup script for Multi-Platform Posting System
+
+Serves main:app with WEB_CONCURRENCY worker processes. Uses gunicorn with
+uvicorn workers (gunicorn.conf.py: preloaded app, graceful drain, worker
+recycling) where available, and uvicorn's own process supervisor otherwise
+(Windows, or WEB_SERVER=uvicorn).
 """
+import importlib.util
 import os
-import uvicorn
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_gunicorn() -> None:
+    os.chdir(BACKEND_DIR)
+    os.execvp(sys.executable, [
+        sys.executable, "-m", "gunicorn",
+        "--config", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+        "main:app",
+    ])
+
+def run_uvicorn(port: int) -> None:
+    import uvicorn
+    from config import WEB_CONCURRENCY, WEB_GRACEFUL_TIMEOUT, WEB_KEEPALIVE, WEB_MAX_REQUESTS
 
-if __name__ == "__main__":
-    port = int(os.environ.get("PORT", 8000))
-    print(f"🚀 Starting Multi-Platform Posting System on port {port}")
-    print("📡 Backend API will be available at the Railway URL")
-    print("✅ Mock login credentials: any email/password combination")
-    
     uvicorn.run(
-        "simple_main:app",
+        "main:app",
         host="0.0.0.0",
         port=port,
+        workers=WEB_CONCURRENCY,
+        loop="auto",
+        http="auto",
+        timeout_keep_alive=WEB_KEEPALIVE,
+        timeout_graceful_shutdown=WEB_GRACEFUL_TIMEOUT,
+        limit_max_requests=WEB_MAX_REQUESTS or None,
         log_level="info"
     )
+
+if __name__ == "__main__":
+    sys.path.insert(0, BACKEND_DIR)
+    port = int(os.environ.get("PORT", 8000))
+    server = os.environ.get("WEB_SERVER", "gunicorn")
+    use_gunicorn = server == "gunicorn" and os.name != "nt" and importlib.util.find_spec("gunicorn") is not None
+    print(f"🚀 Starting Multi-Platform Posting System on port {port} ({'gunicorn' if use_gunicorn else 'uvicorn'})")
+
+    if use_gunicorn:
+        run_gunicorn()
+    else:
+        run_uvicorn(port)
@@ -0,0 +1,497 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+from sqlalchemy import update
+from celery_app import celery_app
+from database import SessionLocal
+from models import Post, PostTarget, SocialAccount
+from oauth import get_decrypted_token
+from config import (
+    LOG_RETENTION_DAYS,
+    LOG_PARTITION_MONTHS_AHEAD,
+    LOG_CLEANUP_BATCH_SIZE,
+    LOG_CLEANUP_MAX_BATCHES,
+    TOKEN_REENCRYPT_BATCH_SIZE,
+    TOKEN_REENCRYPT_TIME_BUDGET_SECONDS,
+    STATUS_COUNTS_RECONCILE_BATCH_SIZE,
+    STATUS_COUNTS_RECONCILE_TIME_BUDGET_SECONDS,
+    FAIR_SCHEDULING_ENABLED,
+    PUBLISH_BATCH_SIZE,
+    LEASE_REAPER_BATCH_SIZE,
+    LEASE_REAPER_MAX_BATCHES,
+    METRICS_INGEST_ENABLED,
+    METRICS_INGEST_BATCH_SIZE,
+    MEDIA_VARIANT_WAIT_SECONDS,
+    MEDIA_VARIANT_MAX_WAITS
+)
+from services.log_partitions import (
+    DEFAULT_PARTITION,
+    is_partitioned,
+    ensure_log_partitions,
+    drop_expired_log_partitions,
+    delete_expired_logs_batched
+)
+from services.token_refresh import refresh_expiring_tokens
+from services.token_rotation import reencrypt_social_account_tokens
+from services.publishers import PUBLISHERS, PublishError, shared_http_session
+from services.chunked_upload import UploadCheckpoint
+from services.publish_leases import (
+    LeaseLost,
+    lease_owner,
+    lease_expiry,
+    lease_is_live,
+    take_lease,
+    release_lease,
+    renew_leases,
+    reap_expired_leases
+)
+from services.publishing import (
+    set_target_status,
+    refresh_post_status,
+    finish_publish,
+    fair_scheduler,
+    PUBLISH_TASKS,
+    account_batch_item,
+    enqueue_account_batch,
+    start_account_batch,
+    enqueue_media_variants,
+    finish_media_variants,
+    media_rejection
+)
+from services.response_cache import bump_list_version
+from services.engagement_metrics import ingest_due_metrics
+from services.status_counts import TARGET, adjust_status_counts, reconcile_status_counts
+from services.status_events import publish_status_event
+from services.log_sink import log_event
+from services.s3 import s3_service
+from services.media_variants import VariantPending, VariantRejected, media_variant_service
+
+logger = logging.getLogger(__name__)
+
+def _platform_media(db, post: Post, provider: str, checkpoint: UploadCheckpoint) -> List[Dict[str, str]]:
+    """The post's media as `provider` takes it; video encodes are left to the media queue."""
+    try:
+        keys = media_variant_service.variants_for(
+            db, post.media, provider, build_videos=False, heartbeat=checkpoint.heartbeat
+        )
+    except VariantRejected as e:
+        raise PublishError(f"{provider} cannot take this post's media: {e}")
+    except VariantPending as e:
+        reason = media_rejection(post.id, provider)
+        if reason:
+            raise PublishError(f"{provider} cannot take this post's media: {reason}")
+        enqueue_media_variants(post.id)
+        raise
+    return [
+        {"type": item.type, "s3_key": keys[item.id], "url": s3_service.get_presigned_url(keys[item.id])}
+        for item in post.media
+    ]
+
+def _retry_platform_error(task, exc: Exception, variant_waits: int):
+    """Retry after a platform error, backing off on the retries spent on platform errors alone."""
+    return task.retry(
+        exc=exc,
+        countdown=60 * 2 ** (task.request.retries - variant_waits),
+        max_retries=task.max_retries + MEDIA_VARIANT_MAX_WAITS
+    )
+
+def _retry_variant_wait(task, exc: Exception, variant_waits: int):
+    """Check back for a video variant later, without using up the platform error retries."""
+    return task.retry(
+        exc=exc,
+        countdown=MEDIA_VARIANT_WAIT_SECONDS,
+        kwargs={**(task.request.kwargs or {}), "variant_waits": variant_waits + 1},
+        max_retries=task.max_retries + MEDIA_VARIANT_MAX_WAITS
+    )
+
+def _variant_wait_error(variant_waits: int, e: Exception) -> str:
+    return f"Media still not ready after {variant_waits} waits: {e}"
+
+def _publish_leased(db, provider: str, account: SocialAccount, token: str, target: PostTarget, owner: str, recovered: bool) -> str:
+    """Publish a leased target, first asking the platform whether a dead earlier attempt got through."""
+    publisher = PUBLISHERS[provider]
+    post = target.post
+    checkpoint = UploadCheckpoint(db, target, lease_owner=owner)
+    if recovered:
+        platform_post_id = publisher.find_published(
+            account.provider_account_id, token, post.text, target.upload_state, target.created_at
+        )
+        if platform_post_id is not None:
+            checkpoint.clear()
+            return platform_post_id
+    return publisher.publish(
+        account.provider_account_id,
+        token,
+        post.text,
+        _platform_media(db, post, provider, checkpoint),
+        checkpoint=checkpoint
+    )
+
+def _publish_target(task, target_id: int, provider: str, variant_waits: int = 0) -> Dict[str, Any]:
+    """Publish one post target, recording each status transition.
+
+    `variant_waits` counts the retries spent waiting for video variants, which
+    have their own budget apart from the retries after platform errors.
+    """
+    db = SessionLocal()
+    try:
+        # Row lock so a duplicate or requeued task cannot claim the target at the same time
+        target = db.query(PostTarget).filter(PostTarget.id == target_id).with_for_update().first()
+        if not target or target.platform_status == "published" or lease_is_live(target):
+            user_id = target.post.user_id if target else None
+            db.rollback()
+            if user_id is not None:
+                # Still free the slot the scheduler took for this item; a
+                # deleted target's slot expires with the in-flight TTL
+                finish_publish(target_id, provider, user_id)
+            return {"target_id": target_id, "skipped": True}
+
+        post = target.post
+        account = target.social_account
+        owner = lease_owner(task.request.id)
+        recovered = take_lease(target, owner)
+        set_target_status(db, target, "publishing")
+        try:
+            platform_post_id = _publish_leased(db, provider, account, get_decrypted_token(account), target, owner, recovered)
+        except LeaseLost:
+            # The reaper gave the target to another worker, which now owns its status
+            return {"target_id": target_id, "lease_lost": True}
+        except VariantPending as e:
+            release_lease(target)
+            if variant_waits < MEDIA_VARIANT_MAX_WAITS:
+                set_target_status(db, target, "pending", error=str(e))
+                raise _retry_variant_wait(task, e, variant_waits)
+            target.upload_state = None
+            set_target_status(db, target, "failed", error=_variant_wait_error(variant_waits, e))
+            log_event("post", post.id, "error", f"{provider} publish failed for target {target.id}: {e}")
+        except PublishError as e:
+            release_lease(target)
+            if e.retryable and task.request.retries - variant_waits < task.max_retries:
+                # Any upload checkpoint is kept so the retry resumes from it
+                set_target_status(db, target, "pending", error=str(e))
+                raise _retry_platform_error(task, e, variant_waits)
+            target.upload_state = None
+            set_target_status(db, target, "failed", error=str(e))
+            log_event("post", post.id, "error", f"{provider} publish failed for target {target.id}: {e}")
+        except Exception as e:
+            # A bug or an unexpected response: fail the target rather than leave
+            # it leased, which would have the reaper hand it to worker after worker
+            logger.exception("Publishing target %s to %s failed", target_id, provider)
+            db.rollback()
+            release_lease(target)
+            target.upload_state = None
+            error = f"Unexpected error: {e.__class__.__name__}: {e}"
+            set_target_status(db, target, "failed", error=error)
+            log_event("post", post.id, "error", f"{provider} publish failed for target {target_id}: {error}")
+        else:
+            release_lease(target)
+            set_target_status(db, target, "published", platform_post_id=platform_post_id)
+            log_event("post", post.id, "info", f"Published to {provider} as {platform_post_id}")
+        finally:
+            # Let the user's next queued target onto the platform queue
+            finish_publish(target_id, provider, post.user_id)
+
+        refresh_post_status(db, post)
+        return {"target_id": target_id, "platform_status": target.platform_status}
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, max_retries=3)
+def publish_to_facebook(self, target_id: int, variant_waits: int = 0) -> Dict[str, Any]:
+    """Publish a post target to a Facebook Page."""
+    return _publish_target(self, target_id, "facebook", variant_waits)
+
+@celery_app.task(bind=True, max_retries=3)
+def publish_to_instagram(self, target_id: int, variant_waits: int = 0) -> Dict[str, Any]:
+    """Publish a post target to an Instagram Business account."""
+    return _publish_target(self, target_id, "instagram", variant_waits)
+
+@celery_app.task(bind=True, max_retries=3)
+def publish_to_tiktok(self, target_id: int, variant_waits: int = 0) -> Dict[str, Any]:
+    """Publish a post target to TikTok."""
+    return _publish_target(self, target_id, "tiktok", variant_waits)
+
+def _write_batch_results(
+    db,
+    account: SocialAccount,
+    targets: List[PostTarget],
+    results: List[Dict[str, Any]],
+    previous_status: str
+) -> None:
+    """Write a batch's target statuses with one bulk UPDATE, then announce them."""
+    if results:
+        db.execute(update(PostTarget), results)
+    deltas = Counter(result["platform_status"] for result in results)
+    deltas[previous_status] -= len(results)
+    adjust_status_counts(db, account.user_id, TARGET, deltas)
+    bump_list_version(db, account.user_id, "posts")
+    db.commit()
+    posts = {target.id: target.post for target in targets}
+    for result in results:
+        post = posts[result["id"]]
+        publish_status_event(
+            account.user_id,
+            post.id,
+            post.status,
+            target_id=result["id"],
+            platform_status=result["platform_status"],
+            platform_post_id=result["platform_post_id"],
+            error=result["last_error"]
+        )
+        if result["platform_status"] == "published":
+            log_event("post", post.id, "info", f"Published to {account.provider} as {result['platform_post_id']}")
+        elif result["platform_status"] == "failed":
+            log_event("post", post.id, "error", f"{account.provider} publish failed for target {result['id']}: {result['last_error']}")
+    for post in {post.id: post for post in posts.values()}.values():
+        refresh_post_status(db, post)
+
+def _publish_account_batch(task, db, account: SocialAccount, variant_waits: int = 0) -> Dict[str, Any]:
+    provider = account.provider
+    # SKIP LOCKED keeps a concurrent batch for the same account off these rows
+    targets = (
+        db.query(PostTarget)
+        .join(Post, Post.id == PostTarget.post_id)
+        .filter(
+            PostTarget.social_account_id == account.id,
+            PostTarget.platform_status == "pending",
+            Post.status == "publishing"
+        )
+        .order_by(PostTarget.id)
+        .limit(PUBLISH_BATCH_SIZE)
+        .with_for_update(of=PostTarget, skip_locked=True)
+        .all()
+    )
+    if not targets:
+        db.rollback()
+        return {"social_account_id": account.id, "targets": 0}
+
+    owner = lease_owner(task.request.id)
+    expires_at = lease_expiry()
+    recovered = {target.id for target in targets if target.lease_owner is not None}
+    claimed = [
+        {
+            "id": target.id,
+            "platform_status": "publishing",
+            "platform_post_id": target.platform_post_id,
+            "last_error": None,
+            "lease_owner": owner,
+            "lease_expires_at": expires_at
+        }
+        for target in targets
+    ]
+    _write_batch_results(db, account, targets, claimed, "pending")
+
+    def result(target: PostTarget, status: str, platform_post_id=None, error=None) -> Dict[str, Any]:
+        published_at = datetime.now(timezone.utc) if status == "published" else None
+        return {
+            "id": target.id,
+            "platform_status": status,
+            "platform_post_id": platform_post_id,
+            "last_error": error,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "published_at": published_at,
+            "metrics_due_at": published_at
+        }
+
+    results: Dict[int, Dict[str, Any]] = {}
+    lost = set()
+    awaiting_media: Dict[int, VariantPending] = {}
+    retry_error, retry_target_id = None, None
+    try:
+        token = get_decrypted_token(account)
+        with shared_http_session():
+            for index, target in enumerate(targets):
+                # Heartbeat for the targets still waiting their turn in this batch
+                renew_leases(db, [waiting.id for waiting in targets[index + 1:] if waiting.id not in lost], owner)
+                db.commit()
+                try:
+                    UploadCheckpoint(db, target, lease_owner=owner).heartbeat()
+                    platform_post_id = _publish_leased(db, provider, account, token, target, owner, target.id in recovered)
+                except LeaseLost:
+                    # Reaped while waiting: the worker that picked it up owns its status now
+                    lost.add(target.id)
+                except VariantPending as e:
+                    if variant_waits < MEDIA_VARIANT_MAX_WAITS:
+                        # Skip it this round; the rest of the batch goes ahead
+                        awaiting_media[target.id] = e
+                        continue
+                    target.upload_state = None
+                    results[target.id] = result(target, "failed", error=_variant_wait_error(variant_waits, e))
+                except PublishError as e:
+                    if e.retryable and task.request.retries - variant_waits < task.max_retries:
+                        # The platform is throttling or down: stop here and retry the rest later
+                        retry_error, retry_target_id = e, target.id
+                        break
+                    target.upload_state = None
+                    results[target.id] = result(target, "failed", error=str(e))
+                else:
+                    results[target.id] = result(target, "published", platform_post_id)
+
+        # Targets not reached go back to pending, keeping any upload checkpoint
+        for target in targets:
+            if target.id not in results and target.id not in lost:
+                error = str(retry_error) if target.id == retry_target_id else None
+                if target.id in awaiting_media:
+                    error = str(awaiting_media[target.id])
+                results[target.id] = result(target, "pending", target.platform_post_id, error)
+    except Exception:
+        # Targets not reached keep their leases, so the reaper requeues them
+        # once those expire; the session may be unusable after a DB error
+        db.rollback()
+        raise
+    finally:
+        # Whatever was published is recorded even if the batch blew up, so a
+        # rerun does not post it a second time
+        _write_batch_results(db, account, targets, list(results.values()), "publishing")
+
+    if retry_error is not None:
+        raise _retry_platform_error(task, retry_error, variant_waits)
+    if awaiting_media:
+        # Run the batch again once the variants have had time to build
+        raise _retry_variant_wait(task, next(iter(awaiting_media.values())), variant_waits)
+    if len(targets) == PUBLISH_BATCH_SIZE:
+        # More may be waiting: queue behind the user's other work rather than looping here
+        enqueue_account_batch(account.id, provider, account.user_id)
+    return {
+        "social_account_id": account.id,
+        "targets": len(targets),
+        "published": sum(1 for row in results.values() if row["platform_status"] == "published"),
+        "failed": sum(1 for row in results.values() if row["platform_status"] == "failed")
+    }
+
+@celery_app.task(bind=True, max_retries=3)
+def publish_account_batch(self, social_account_id: int, variant_waits: int = 0) -> Dict[str, Any]:
+    """Publish a social account's pending targets, in order, in one execution.
+
+    The account's token, the DB session and one HTTP connection are shared by
+    every target in the batch, and the resulting statuses are written back
+    with a single bulk UPDATE. Sent to the account's platform queue.
+    """
+    # Targets queued while this batch runs get a follow-up batch of their own
+    start_account_batch(social_account_id)
+    db = SessionLocal()
+    try:
+        account = db.query(SocialAccount).filter(SocialAccount.id == social_account_id).first()
+        if not account:
+            return {"social_account_id": social_account_id, "skipped": True}
+        try:
+            return _publish_account_batch(self, db, account, variant_waits)
+        finally:
+            finish_publish(account_batch_item(account.id), account.provider, account.user_id)
+    finally:
+        db.close()
+
+@celery_app.task
+def prepare_media_variants(post_id: int) -> Dict[str, Any]:
+    """Build the platform variants of a post's media ahead of publishing."""
+    rejections: Dict[str, str] = {}
+    db = SessionLocal()
+    try:
+        post = db.query(Post).filter(Post.id == post_id).first()
+        if not post or not post.media:
+            return {"post_id": post_id, "variants": {}}
+        platforms = sorted({target.social_account.provider for target in post.targets})
+        variants, rejections = media_variant_service.prepare(db, post.media, platforms)
+        for provider, reason in rejections.items():
+            log_event("post", post.id, "error", f"{provider} cannot take this post's media: {reason}")
+        return {"post_id": post_id, "variants": variants, "rejected": rejections}
+    finally:
+        finish_media_variants(post_id, rejections)
+        db.close()
+
+@celery_app.task
+def dispatch_publish_queues() -> Dict[str, int]:
+    """Top up each platform queue from the per-user fair scheduling queues."""
+    if not FAIR_SCHEDULING_ENABLED:
+        return {}
+    return {provider: fair_scheduler.dispatch(provider) for provider in PUBLISH_TASKS}
+
+@celery_app.task
+def reap_expired_publish_leases() -> Dict[str, int]:
+    """Requeue targets left in publishing by a worker that died (OOM, time limit kill, deploy)."""
+    db = SessionLocal()
+    try:
+        return reap_expired_leases(db, LEASE_REAPER_BATCH_SIZE, LEASE_REAPER_MAX_BATCHES)
+    finally:
+        db.close()
+
+@celery_app.task
+def ingest_engagement_metrics() -> Dict[str, Any]:
+    """Sample likes, reach and views for published targets due for a refresh."""
+    if not METRICS_INGEST_ENABLED:
+        return {}
+    db = SessionLocal()
+    try:
+        return ingest_due_metrics(db, METRICS_INGEST_BATCH_SIZE)
+    finally:
+        db.close()
+
+@celery_app.task
+def cleanup_old_logs() -> Dict[str, Any]:
+    """Apply log retention.
+
+    On PostgreSQL the logs table is partitioned by month, so retention drops
+    whole partitions and pre-creates the upcoming ones. Rows that landed in the
+    default partition, and every row on SQLite, are removed by a bounded
+    batched delete, which keeps each run's cost independent of table size.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=LOG_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        created, dropped, partition = [], [], None
+        if is_partitioned(db):
+            created = ensure_log_partitions(db, now, LOG_PARTITION_MONTHS_AHEAD)
+            dropped = drop_expired_log_partitions(db, cutoff)
+            db.commit()
+            # Live monthly partitions are left to age out and be dropped whole
+            partition = DEFAULT_PARTITION
+        deleted = delete_expired_logs_batched(
+            db, cutoff, LOG_CLEANUP_BATCH_SIZE, LOG_CLEANUP_MAX_BATCHES, partition=partition
+        )
+        return {
+            "created_partitions": created,
+            "dropped_partitions": dropped,
+            "deleted_rows": deleted
+        }
+    finally:
+        db.close()
+
+@celery_app.task
+def refresh_expired_tokens() -> Dict[str, Any]:
+    """Proactively refresh OAuth tokens that expire within each provider's window."""
+    return refresh_expiring_tokens()
+
+@celery_app.task
+def rotate_token_encryption(start_after_id: int = 0) -> Dict[str, Any]:
+    """Re-encrypt stored tokens under the newest key in ENCRYPTION_KEYS.
+
+    Run after prepending a new key to the keyring. Each run is time-boxed and
+    re-queues itself from where it stopped until every row has been visited.
+    """
+    stats = reencrypt_social_account_tokens(
+        start_after_id=start_after_id,
+        batch_size=TOKEN_REENCRYPT_BATCH_SIZE,
+        time_budget=TOKEN_REENCRYPT_TIME_BUDGET_SECONDS
+    )
+    if not stats["done"]:
+        rotate_token_encryption.delay(stats["last_id"])
+    return stats
+
+@celery_app.task
+def reconcile_dashboard_counts(start_after_id: int = 0) -> Dict[str, Any]:
+    """Rebuild drifted dashboard counters from posts and post_targets.
+
+    Each run is time-boxed and re-queues itself from where it stopped until
+    every user has been visited.
+    """
+    stats = reconcile_status_counts(
+        start_after_id=start_after_id,
+        batch_size=STATUS_COUNTS_RECONCILE_BATCH_SIZE,
+        time_budget=STATUS_COUNTS_RECONCILE_TIME_BUDGET_SECONDS
+    )
+    if not stats["done"]:
+        reconcile_dashboard_counts.delay(stats["last_id"])
+    return stats
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# The app reads its settings at import time, so this runs before any test module imports it
+from benchmarks.common import configure_environment
+
+configure_environment(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='multipost-tests-'), 'test.db')}")
+
+import pytest
+
+@pytest.fixture
+def db_engine():
+    """A freshly created schema on the test database."""
+    import models  # noqa: F401  (registers the tables)
+    from database import Base, engine
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
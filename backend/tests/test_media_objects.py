@@ -0,0 +1,72 @@
+import io
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.objects[key] = fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Key']}"
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    from services.s3 import s3_service
+    client = FakeS3Client()
+    monkeypatch.setattr(s3_service, "s3_client", client)
+    return client
+
+def _upload(db, user_id, content):
+    from services.s3 import s3_service
+    file = UploadFile(io.BytesIO(content), filename="photo.jpg", headers=Headers({"content-type": "image/jpeg"}))
+    return s3_service.upload_file(file, db, user_id)
+
+def _create_post(db, user, s3_key):
+    from routes.posts import create_post
+    from schemas import PostCreate
+    post = PostCreate(text="hello", media=[{"s3_key": s3_key, "type": "image"}])
+    return create_post(post, current_user=user, db=db)
+
+def test_dedup_is_per_user_and_deleting_posts_reclaims_objects(db_engine, fake_s3):
+    from database import SessionLocal
+    from models import MediaObject, Post, User
+    from routes.posts import delete_post
+    from services.status_counts import status_counts
+
+    db = SessionLocal()
+    try:
+        alice = User(name="Alice", email="alice@example.com", password_hash="x")
+        bob = User(name="Bob", email="bob@example.com", password_hash="x")
+        db.add_all([alice, bob])
+        db.commit()
+
+        first = _upload(db, alice.id, b"same bytes")
+        again = _upload(db, alice.id, b"same bytes")
+        other = _upload(db, bob.id, b"same bytes")
+        assert again["deduplicated"] and again["s3_key"] == first["s3_key"]
+        # Another user's identical upload reveals nothing and gets its own object
+        assert not other["deduplicated"] and other["s3_key"] != first["s3_key"]
+
+        kept = _create_post(db, alice, first["s3_key"])
+        dropped = _create_post(db, alice, first["s3_key"])
+        _create_post(db, bob, other["s3_key"])
+
+        delete_post(dropped.id, current_user=alice, db=db)
+        assert first["s3_key"] in fake_s3.objects
+
+        delete_post(kept.id, current_user=alice, db=db)
+        assert first["s3_key"] not in fake_s3.objects
+        assert other["s3_key"] in fake_s3.objects
+        assert db.query(MediaObject).filter(MediaObject.user_id == alice.id).count() == 0
+        assert db.query(Post).filter(Post.user_id == alice.id).count() == 0
+        assert status_counts(db, alice.id)["post"] == {}
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = dict(objects)
+
+    def object_exists(self, key):
+        return key in self.objects
+
+    def download_to_file(self, key, fileobj):
+        fileobj.write(self.objects[key])
+        return hashlib.sha256(self.objects[key]).hexdigest()
+
+    def upload_path(self, path, key, content_type):
+        with open(path, "rb") as source:
+            self.objects[key] = source.read()
+
+    def upload_bytes(self, data, key, content_type):
+        self.objects[key] = data
+
+class Media:
+    def __init__(self, media_id, s3_key, content):
+        self.id = media_id
+        self.s3_key = s3_key
+        self.content_sha256 = hashlib.sha256(content).hexdigest()
+        self.type = "video"
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    import services.media_variants as media_variants
+    s3 = FakeS3({"media/clip.mp4": b"clip"})
+    monkeypatch.setattr(media_variants.MediaVariantService, "s3", property(lambda self: s3))
+    monkeypatch.setattr(media_variants, "FFMPEG_BINARY", "/nonexistent/ffmpeg")
+    return s3
+
+def test_publish_uses_the_source_once_a_build_fell_back_to_it(fake_s3):
+    from services.media_variants import MediaVariantService, VariantPending, source_marker_key
+    media = Media(1, "media/clip.mp4", b"clip")
+    db = SimpleNamespace(commit=lambda: None)
+
+    with pytest.raises(VariantPending):
+        MediaVariantService(max_workers=1).variants_for(db, [media], "tiktok", build_videos=False)
+
+    # Without ffmpeg the media worker publishes the source unchanged, and says so in S3
+    variants, rejections = MediaVariantService(max_workers=1).prepare(db, [media], ["tiktok"])
+    assert variants == {"tiktok": {1: "media/clip.mp4"}}
+    assert rejections == {}
+    assert source_marker_key(media.content_sha256, "tiktok_video") in fake_s3.objects
+
+    # A publish task in another process stops waiting for a variant that will never exist
+    publisher_side = MediaVariantService(max_workers=1)
+    assert publisher_side.variants_for(db, [media], "tiktok", build_videos=False) == {1: "media/clip.mp4"}
@@ -0,0 +1,37 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_event_streams_are_counted_as_connections_not_latency():
+    from services.metrics import MetricsMiddleware
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    open_during_stream = []
+
+    @app.get("/metrics-test/plain")
+    def plain():
+        return {"ok": True}
+
+    @app.get("/metrics-test/stream")
+    def stream():
+        def events():
+            open_during_stream.append(_sample("http_streaming_connections", route="/metrics-test/stream"))
+            yield "event: status\ndata: {}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    client = TestClient(app)
+    assert client.get("/metrics-test/plain").status_code == 200
+    assert client.get("/metrics-test/stream").status_code == 200
+
+    assert _sample(
+        "http_request_duration_seconds_count", method="GET", route="/metrics-test/plain", status="200"
+    ) == 1
+    assert _sample(
+        "http_request_duration_seconds_count", method="GET", route="/metrics-test/stream", status="200"
+    ) == 0
+    assert open_during_stream == [1]
+    assert _sample("http_streaming_connections", route="/metrics-test/stream") == 0
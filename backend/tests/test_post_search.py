@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+POSTS = 26
+PAGE = 7
+
+def test_recent_pages_cover_every_post_once(db_engine):
+    from database import SessionLocal
+    from models import Post, User
+    from services.post_search import ensure_search_index, search_posts
+
+    ensure_search_index(db_engine)
+    db = SessionLocal()
+    try:
+        user = User(name="Alice", email="alice@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        # Most posts share a server-default timestamp stored to the second;
+        # the rest were written from Python, with microseconds
+        start = datetime(2026, 1, 1, 12, 0, 0)
+        for i in range(POSTS):
+            created_at = start + timedelta(seconds=i % 3, microseconds=i) if i % 4 == 0 else None
+            db.add(Post(user_id=user.id, text=f"launch update {i}", status="draft", created_at=created_at))
+        db.commit()
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            results, cursor = search_posts(db, user.id, "launch", sort="recent", cursor=cursor, limit=PAGE)
+            seen.extend(post.id for post, _ in results)
+            pages += 1
+            if cursor is None:
+                break
+            assert pages <= POSTS
+
+        assert len(seen) == len(set(seen)) == POSTS
+        assert pages == -(-POSTS // PAGE)
+    finally:
+        db.close()
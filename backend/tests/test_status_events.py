@@ -0,0 +1,129 @@
+import asyncio
+import json
+import tracemalloc
+
+import fakeredis
+import pytest
+
+USERS = 50
+STREAMS_PER_USER = 100
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point the event publisher and the broker's subscriber at one in-memory Redis."""
+    import services.status_events as status_events
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(status_events, "_redis_client", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(status_events.aioredis, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    return server
+
+@pytest.fixture
+def broker(monkeypatch, fake_redis):
+    import routes.events
+    from services.status_events import StatusBroker
+    broker = StatusBroker(redis_url="redis://fake")
+    monkeypatch.setattr(routes.events, "status_broker", broker)
+    return broker
+
+def _seed_users(count):
+    from sqlalchemy import insert
+    from auth import create_access_token
+    from database import SessionLocal
+    from models import User
+    db = SessionLocal()
+    db.execute(insert(User), [
+        {"id": user_id, "name": f"Stream {user_id}", "email": f"stream{user_id}@example.com", "password_hash": "x"}
+        for user_id in range(1, count + 1)
+    ])
+    db.commit()
+    db.close()
+    return {user_id: create_access_token({"sub": f"stream{user_id}@example.com"}) for user_id in range(1, count + 1)}
+
+async def _open_stream(user_id, token, post_id=None):
+    from routes.events import stream_post_status
+    response = await stream_post_status(post_id=post_id, token=token)
+    stream = response.body_iterator
+    assert await stream.__anext__() == ": connected\n\n"
+    return user_id, stream
+
+async def _next_event(stream, timeout=2.0):
+    chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+    assert chunk.startswith("event: status\ndata: ")
+    return json.loads(chunk.split("data: ", 1)[1])
+
+def test_thousands_of_idle_streams_share_one_subscriber(db_engine, fake_redis, broker):
+    from services.status_events import publish_status_event
+    tokens = _seed_users(USERS)
+
+    async def scenario():
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        streams = await asyncio.gather(*(
+            _open_stream(user_id, tokens[user_id])
+            for user_id in tokens
+            for _ in range(STREAMS_PER_USER)
+        ))
+        # Let the broker's subscriber connect before anything is published
+        for _ in range(100):
+            if await fakeredis.FakeAsyncRedis(server=fake_redis).pubsub_numpat() == 1:
+                break
+            await asyncio.sleep(0.01)
+        per_stream = sum(
+            stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename")
+        ) / len(streams)
+        tracemalloc.stop()
+
+        assert broker.connections == USERS * STREAMS_PER_USER
+        # One Redis subscription for the whole process, however many clients are connected
+        assert await fakeredis.FakeAsyncRedis(server=fake_redis).pubsub_numpat() == 1
+        assert per_stream < 32 * 1024
+
+        # An event reaches every stream of its user and no other
+        publish_status_event(7, 42, "publishing", target_id=3, platform_status="published")
+        user_streams = [stream for user_id, stream in streams if user_id == 7]
+        events = await asyncio.gather(*(_next_event(stream) for stream in user_streams))
+        assert {(event["post_id"], event["target_id"], event["platform_status"]) for event in events} == {
+            (42, 3, "published")
+        }
+        assert all(queue.empty() for user_id, queues in broker._subscribers.items() if user_id != 7 for queue in queues)
+
+        await asyncio.gather(*(stream.aclose() for _, stream in streams))
+        assert broker.connections == 0
+        await broker.stop()
+
+    asyncio.run(scenario())
+
+def test_post_filter_and_slow_clients(db_engine, fake_redis, broker):
+    from services.status_events import publish_status_event
+    tokens = _seed_users(1)
+
+    async def scenario():
+        from database import SessionLocal
+        from models import Post
+        db = SessionLocal()
+        db.add_all([Post(id=1, user_id=1, text="one"), Post(id=2, user_id=1, text="two")])
+        db.commit()
+        db.close()
+
+        _, only_post_2 = await _open_stream(1, tokens[1], post_id=2)
+        for _ in range(100):
+            if await fakeredis.FakeAsyncRedis(server=fake_redis).pubsub_numpat() == 1:
+                break
+            await asyncio.sleep(0.01)
+        publish_status_event(1, 1, "publishing")
+        publish_status_event(1, 2, "published")
+        assert (await _next_event(only_post_2))["post_id"] == 2
+
+        # A client that stops reading keeps only the newest queue_size events
+        queue = broker.subscribe(1)
+        for index in range(broker.queue_size + 10):
+            broker.dispatch(1, {"post_id": 2, "n": index})
+        assert queue.qsize() == broker.queue_size
+        assert queue.get_nowait()["n"] == 10
+        assert broker.dropped >= 10
+        broker.unsubscribe(1, queue)
+
+        await only_post_2.aclose()
+        await broker.stop()
+
+    asyncio.run(scenario())
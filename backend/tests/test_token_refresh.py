@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+LIVE_ACCOUNTS = 3000
+DEAD_ACCOUNTS = 200
+LATER_ACCOUNTS = 200
+CONCURRENCY = 8
+
+class StubGraphHandler(BaseHTTPRequestHandler):
+    """Answers Facebook's fb_exchange_token grant with a long-lived token."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests += 1
+        try:
+            time.sleep(0.002)
+            token = parse_qs(urlparse(self.path).query)["fb_exchange_token"][0]
+            if token.startswith("revoked"):
+                self.send_response(400)
+                body = {"error": {"message": "Error validating access token", "code": 190}}
+            else:
+                self.send_response(200)
+                body = {"access_token": f"long-{token}", "token_type": "bearer", "expires_in": 5184000}
+            payload = json.dumps(body).encode()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_graph(monkeypatch):
+    import oauth
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGraphHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(oauth, "FACEBOOK_GRAPH_URL", f"http://127.0.0.1:{server.server_port}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_refreshes_thousands_of_accounts_against_stub_oauth(db_engine, stub_graph):
+    from sqlalchemy import insert
+    from database import SessionLocal
+    from models import SocialAccount, User
+    from oauth import decrypt_token, encrypt_token
+    from services.token_refresh import REFRESHERS, TokenRefreshEngine
+
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    db.execute(insert(User), [{"id": 1, "name": "Refresh", "email": "refresh@example.com", "password_hash": "x"}])
+    rows = []
+    for index in range(LIVE_ACCOUNTS):
+        # Many accounts share an expiry, so pagination must break ties on id
+        rows.append(("live", index, now + timedelta(hours=1 + index % 100)))
+    for index in range(DEAD_ACCOUNTS):
+        rows.append(("dead", index, now - timedelta(days=1 + index % 10)))
+    for index in range(LATER_ACCOUNTS):
+        rows.append(("later", index, now + timedelta(days=30)))
+    rows.append(("revoked", 0, now + timedelta(hours=2)))
+    rows.append(("relinked", 0, now + timedelta(hours=2)))
+    db.execute(insert(SocialAccount), [
+        {
+            "user_id": 1,
+            "provider": "facebook",
+            "provider_account_id": f"{kind}-{index}",
+            "access_token_encrypted": encrypt_token(f"{kind}-{index}"),
+            "token_expires_at": expires_at
+        }
+        for kind, index, expires_at in rows
+    ])
+    db.commit()
+
+    def relink_during_refresh(access_token, refresh_token):
+        if access_token == "relinked-0":
+            # The user re-links the account while its refresh is in flight
+            other = SessionLocal()
+            other.query(SocialAccount).filter(SocialAccount.provider_account_id == "relinked-0").update(
+                {SocialAccount.access_token_encrypted: encrypt_token("user-relinked")},
+                synchronize_session=False
+            )
+            other.commit()
+            other.close()
+        return REFRESHERS["facebook"](access_token, refresh_token)
+
+    engine = TokenRefreshEngine(
+        windows={"facebook": 168},
+        give_up_hours={"facebook": 0},
+        concurrency=CONCURRENCY,
+        batch_size=250,
+        refreshers={"facebook": relink_during_refresh}
+    )
+    stats = engine.run(now=now)["facebook"]
+
+    assert stats == {
+        "selected": LIVE_ACCOUNTS + 2,
+        "refreshed": LIVE_ACCOUNTS,
+        "failed": 1,
+        "superseded": 1
+    }
+    # Dead and not-yet-due tokens never reach the platform
+    assert stub_graph.requests == LIVE_ACCOUNTS + 2
+    assert 1 < stub_graph.max_in_flight <= CONCURRENCY
+
+    tokens = {
+        account.provider_account_id: (decrypt_token(account.access_token_encrypted), account.token_expires_at)
+        for account in db.query(SocialAccount)
+    }
+    db.close()
+    for index in range(LIVE_ACCOUNTS):
+        token, expires_at = tokens[f"live-{index}"]
+        assert token == f"long-live-{index}"
+        assert expires_at.replace(tzinfo=timezone.utc) > now + timedelta(days=59)
+    for index in range(DEAD_ACCOUNTS):
+        assert tokens[f"dead-{index}"][0] == f"dead-{index}"
+    for index in range(LATER_ACCOUNTS):
+        assert tokens[f"later-{index}"][0] == f"later-{index}"
+    assert tokens["revoked-0"][0] == "revoked-0"
+    assert tokens["relinked-0"][0] == "user-relinked"
+
+def test_second_run_skips_refreshed_accounts(db_engine, stub_graph):
+    from sqlalchemy import insert
+    from database import SessionLocal
+    from models import SocialAccount, User
+    from oauth import encrypt_token
+    from services.token_refresh import TokenRefreshEngine
+
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    db.execute(insert(User), [{"id": 1, "name": "Refresh", "email": "refresh@example.com", "password_hash": "x"}])
+    db.execute(insert(SocialAccount), [
+        {
+            "user_id": 1,
+            "provider": "facebook",
+            "provider_account_id": f"live-{index}",
+            "access_token_encrypted": encrypt_token(f"live-{index}"),
+            "token_expires_at": now + timedelta(hours=1)
+        }
+        for index in range(500)
+    ])
+    db.commit()
+    db.close()
+
+    engine = TokenRefreshEngine(windows={"facebook": 168}, give_up_hours={"facebook": 0}, batch_size=100)
+    assert engine.run(now=now)["facebook"]["refreshed"] == 500
+    assert engine.run(now=now)["facebook"]["selected"] == 0
+    assert stub_graph.requests == 500